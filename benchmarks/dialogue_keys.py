@@ -0,0 +1,102 @@
+"""
+Compare keying posts by the bigint IDs of dialogues against the 10
+character nanoids they used to be keyed by. Copies the seeded posts into
+two unpartitioned tables, one referencing dialogues by ID and the other
+by slug, and prints the size of their dialogue indexes along with the
+execution time reported by EXPLAIN ANALYZE for a join of dialogues with
+their posts. Requires PostgreSQL.
+
+    python -m benchmarks.dialogue_keys [--dialogues 1000] [--posts 200]
+"""
+
+import argparse
+import json
+
+from .utils import benchmark_database, create_dialogue
+
+from django.db import connection  # noqa: E402
+
+from ludwig.dialogues.models import Dialogue, Post  # noqa: E402
+
+# a scratch copy of the posts per type of key, and the column of
+# dialogues it references
+KEYS = {
+    "bigint": ("benchmark_post_bigint", "id"),
+    "varchar(10)": ("benchmark_post_varchar", "slug"),
+}
+
+JOIN_SQL = """
+    SELECT d.id, COUNT(*), MAX(p.id)
+    FROM {dialogue_table} d JOIN {post_table} p ON p.dialogue_key = d.{key}
+    WHERE d.is_visible
+    GROUP BY d.id
+"""
+
+
+def execution_time(sql):
+    """Get the execution time of `sql` in ms as reported by PostgreSQL."""
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")
+        plan = cursor.fetchone()[0]
+
+    # depending on the driver, the plan is returned as text or parsed
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return plan[0]["Execution Time"]
+
+
+def index_size(name):
+    """Get the size of an index in MB."""
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_relation_size(%s)", [name])
+        return cursor.fetchone()[0] / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dialogues", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if connection.vendor != "postgresql":
+        parser.error("index size benchmarks require PostgreSQL")
+
+    with benchmark_database():
+        for i in range(args.dialogues):
+            create_dialogue(args.posts, is_visible=i % 2 == 0)
+
+        dialogue_table = Dialogue._meta.db_table
+        with connection.cursor() as cursor:
+            for post_table, key in KEYS.values():
+                cursor.execute(
+                    f"""
+                    CREATE TABLE {post_table} AS
+                        SELECT p.id, d.{key} AS dialogue_key, p.author_id,
+                            p.body, p.created_on
+                        FROM {Post._meta.db_table} p
+                        JOIN {dialogue_table} d ON d.id = p.dialogue_id;
+                    CREATE INDEX {post_table}_dialogue_key
+                        ON {post_table} (dialogue_key, id);
+                    ANALYZE {post_table};
+                    """
+                )
+            cursor.execute(f"ANALYZE {dialogue_table}")
+
+        for label, (post_table, key) in KEYS.items():
+            sql = JOIN_SQL.format(
+                dialogue_table=dialogue_table, post_table=post_table, key=key
+            )
+            # the first run warms the cache
+            times = [execution_time(sql) for _ in range(args.repeat + 1)][1:]
+            print(
+                f"{label:<12} index {index_size(f'{post_table}_dialogue_key'):>8.2f} MB"
+                f" join {min(times):>10.3f} ms best of {args.repeat}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Measure the polling query against the partitioned post table and an
+unpartitioned copy of the same rows. Prints the number of partitions
+scanned by each query plan to confirm partition pruning, along with
+the execution time reported by EXPLAIN ANALYZE. Requires PostgreSQL.
+
+    python -m benchmarks.partitions [--dialogues 1000] [--posts 200]
+"""
+
+import argparse
+import json
+import random
+
+from .utils import benchmark_database, create_dialogue
+
+from django.db import connection  # noqa: E402
+
+from ludwig.dialogues.models import Post  # noqa: E402
+
+UNPARTITIONED_TABLE = "benchmark_post_unpartitioned"
+
+
+def explain(sql, params):
+    """Get the JSON query plan of `sql` as executed by PostgreSQL."""
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+
+    # depending on the driver, the plan is returned as text or parsed
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return plan[0]
+
+
+def scanned_relations(plan):
+    """Get the names of all relations scanned in a query plan node."""
+
+    relations = {plan["Relation Name"]} if "Relation Name" in plan else set()
+
+    for child in plan.get("Plans", []):
+        relations |= scanned_relations(child)
+
+    return relations
+
+
+def report(label, plan):
+    """Print the number of post tables scanned and the execution time."""
+
+    post_tables = {
+        relation
+        for relation in scanned_relations(plan["Plan"])
+        if relation.startswith((Post._meta.db_table, UNPARTITIONED_TABLE))
+    }
+    print(
+        f"{label:<16} {len(post_tables):>3} post table(s) scanned"
+        f" {plan['Execution Time']:>10.3f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dialogues", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=200)
+    args = parser.parse_args()
+
+    if connection.vendor != "postgresql":
+        parser.error("partitioning benchmarks require PostgreSQL")
+
+    with benchmark_database():
+        dialogues = [create_dialogue(args.posts) for _ in range(args.dialogues)]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                CREATE TABLE {UNPARTITIONED_TABLE} AS TABLE {Post._meta.db_table};
+                CREATE INDEX ON {UNPARTITIONED_TABLE} (dialogue_id);
+                ANALYZE {Post._meta.db_table};
+                ANALYZE {UNPARTITIONED_TABLE};
+                """
+            )
+
+        # the update query for an up-to-date poller of a random dialogue
+        dialogue = random.choice(dialogues)
+        last_id = dialogue.posts.order_by("id").last().id
+        posts = (
+            Post.objects.filter(dialogue=dialogue, id__gt=last_id)
+            .select_related("author")
+            .order_by("created_on")
+        )
+        sql, params = posts.query.sql_with_params()
+
+        report("partitioned", explain(sql, params))
+        report(
+            "unpartitioned",
+            explain(sql.replace(Post._meta.db_table, UNPARTITIONED_TABLE), params),
+        )
+
+
+if __name__ == "__main__":
+    main()
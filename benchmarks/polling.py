@@ -0,0 +1,90 @@
+"""
+Compare the throughput of the dialogue polling endpoint when served
+through the WSGI handler, with a fixed pool of worker threads, against
+the ASGI handler, with every poller as a coroutine on one event loop.
+Prints the share of polls that were coalesced with an identical poll
+or answered from the short-lived result cache.
+
+    python -m benchmarks.polling [--pollers 500] [--workers 8]
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .utils import benchmark_database, create_dialogue, timer
+
+from django.core.cache import cache  # noqa: E402
+from django.test import AsyncClient, Client  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from ludwig.dialogues.views import (  # noqa: E402
+    get_poll_coalescing_ratio,
+    poll_stats,
+)
+
+
+def run_wsgi(url, pollers, workers):
+    """Poll `url` once per poller through a pool of WSGI workers."""
+
+    def poll(_):
+        return Client().get(url).status_code
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(poll, range(pollers)))
+
+
+async def run_asgi(url, pollers):
+    """Poll `url` once per poller concurrently through ASGI."""
+
+    client = AsyncClient()
+    responses = await asyncio.gather(*(client.get(url) for _ in range(pollers)))
+    return [response.status_code for response in responses]
+
+
+def reset_poll_results():
+    """Drop cached poll results and reset the poll counters."""
+
+    cache.clear()
+    poll_stats.clear()
+
+
+def report_poll_results():
+    """Print the poll counters and the coalescing ratio."""
+
+    counts = ", ".join(f"{source}: {count}" for source, count in poll_stats.items())
+    print(f"{'':<40} {counts} ({get_poll_coalescing_ratio():.1%} shared)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pollers", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        dialogue = create_dialogue(post_count=20)
+
+        # an up-to-date poller, which is by far the most common request
+        url = (
+            reverse("dialogues:dialogue_detail_update", args=(dialogue.slug,))
+            + f"?seq={dialogue.change_seq}"
+        )
+
+        print(f"{args.pollers} pollers, {args.workers} WSGI workers")
+
+        reset_poll_results()
+        with timer("WSGI (thread pool)", args.pollers):
+            statuses = run_wsgi(url, args.pollers, args.workers)
+        assert set(statuses) == {200}
+        report_poll_results()
+
+        reset_poll_results()
+        with timer("ASGI (event loop)", args.pollers):
+            statuses = asyncio.run(run_asgi(url, args.pollers))
+        assert set(statuses) == {200}
+        report_poll_results()
+
+
+if __name__ == "__main__":
+    main()
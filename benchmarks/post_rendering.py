@@ -0,0 +1,78 @@
+"""
+Compare rendering a list of posts with an `{% include %}` per post and
+a new markdown converter per post, as the dialogue templates used to,
+against the `render_posts` tag with a reused markdown converter. Posts
+are built in memory, so no database is needed.
+
+    python -m benchmarks.post_rendering [--repeat 3]
+"""
+
+import argparse
+from datetime import timedelta
+from unittest import mock
+
+import markdown
+
+from .utils import timer
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.contrib.auth.models import AnonymousUser  # noqa: E402
+from django.template import Context, Template  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from ludwig.dialogues.models import Post  # noqa: E402
+
+POST_COUNTS = (100, 1_000, 10_000)
+
+INCLUDE_TEMPLATE = Template(
+    """
+    {% for post in posts %}
+        {% include "dialogues/partials/post_detail.html" %}
+    {% endfor %}
+    """
+)
+
+RENDER_POSTS_TEMPLATE = Template("{% load post_tags %}{% render_posts posts %}")
+
+
+def build_posts(count):
+    """Build unsaved posts alternating between two authors."""
+
+    User = get_user_model()
+    authors = [User(id=1, username="ludwig"), User(id=2, username="bertrand")]
+    now = timezone.now()
+
+    return [
+        Post(
+            id=i,
+            author=authors[i % 2],
+            body=f"Post number {i} with *some* **markdown** and a [link](/).",
+            created_on=now - timedelta(minutes=count - i),
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for count in POST_COUNTS:
+        context = {"posts": build_posts(count), "user": AnonymousUser()}
+
+        with timer(f"include per post ({count} posts)", args.repeat):
+            with mock.patch(
+                "ludwig.dialogues.templatetags.markdown_extras.get_markdown_converter",
+                markdown.Markdown,
+            ):
+                for _ in range(args.repeat):
+                    INCLUDE_TEMPLATE.render(Context(context))
+
+        with timer(f"render_posts ({count} posts)", args.repeat):
+            for _ in range(args.repeat):
+                RENDER_POSTS_TEMPLATE.render(Context(context))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compare loading and rendering the posts of a long dialogue as `Post`
+model instances with their authors, as the dialogue page used to,
+against compact `PostRow`s streamed in chunks. Reports the time and the
+peak memory allocated by Python while the posts are loaded, and while
+they're loaded and rendered.
+
+    python -m benchmarks.post_rows [--posts 10000] [--repeat 3]
+"""
+
+import argparse
+import tracemalloc
+
+from .utils import benchmark_database, create_dialogue, timer
+
+from django.contrib.auth.models import AnonymousUser  # noqa: E402
+from django.template import Context, Template  # noqa: E402
+
+from ludwig.dialogues.changes import get_posts_at  # noqa: E402
+from ludwig.dialogues.rows import iter_post_rows  # noqa: E402
+
+RENDER_POSTS_TEMPLATE = Template("{% load post_tags %}{% render_posts posts %}")
+
+
+def load_instances(dialogue):
+    return list(get_posts_at(dialogue, dialogue.change_seq))
+
+
+def load_rows(dialogue):
+    return iter_post_rows(get_posts_at(dialogue, dialogue.change_seq))
+
+
+def consume(posts):
+    for _ in posts:
+        pass
+
+
+def render(posts):
+    RENDER_POSTS_TEMPLATE.render(Context({"posts": posts, "user": AnonymousUser()}))
+
+
+def peak_memory(func):
+    """Get the peak memory in MB allocated while running `func`."""
+
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with benchmark_database():
+        dialogue = create_dialogue(args.posts)
+
+        cases = {
+            "instances": load_instances,
+            "rows": load_rows,
+        }
+
+        for name, load in cases.items():
+            with timer(f"load {name} ({args.posts} posts)", args.repeat):
+                for _ in range(args.repeat):
+                    consume(load(dialogue))
+
+            with timer(f"load and render {name}", args.repeat):
+                for _ in range(args.repeat):
+                    render(load(dialogue))
+
+        for name, load in cases.items():
+            loaded = peak_memory(lambda: consume(load(dialogue)))
+            rendered = peak_memory(lambda: render(load(dialogue)))
+            print(
+                f"{name:<12} peak memory {loaded:>8.1f} MB loaded"
+                f" {rendered:>8.1f} MB rendered"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Shared helpers for the benchmark scripts. Each benchmark runs against a
+throwaway test database created from the configured settings, so it can
+be run safely against a development environment:
+
+    python -m benchmarks.<name>
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from ludwig.dialogues.models import Dialogue, Post, PostChange  # noqa: E402
+
+
+@contextmanager
+def benchmark_database():
+    """Create a test database for the duration of the benchmark."""
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def create_dialogue(post_count, is_visible=True):
+    """Create a dialogue between two users with `post_count` posts."""
+
+    User = get_user_model()
+    author = User.objects.create_user(
+        username=f"author{time.monotonic_ns()}",
+        email=f"author{time.monotonic_ns()}@example.com",
+    )
+    dialogue = Dialogue.objects.create(
+        title="Benchmark dialogue", author=author, is_visible=is_visible
+    )
+
+    # bulk_create skips `Post.save`, so validation doesn't dominate
+    # the seeding time of large dialogues, and the change log is
+    # written in one go as well
+    posts = Post.objects.bulk_create(
+        Post(author=author, dialogue=dialogue, body=f"**Post** number {i}")
+        for i in range(post_count)
+    )
+    if posts:
+        PostChange.objects.record(
+            dialogue.id, [post.id for post in posts], PostChange.Kind.INSERT
+        )
+    dialogue.refresh_from_db()
+
+    return dialogue
+
+
+@contextmanager
+def timer(label, iterations=1):
+    """Print the total and per-iteration time of the wrapped block."""
+
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{label:<40} {elapsed * 1000:>10.1f} ms total"
+        f" {elapsed * 1000 / iterations:>10.3f} ms/iter"
+    )
@@ -26,11 +26,14 @@ INSTALLED_APPS = [
     "ludwig.accounts",
     "ludwig.dashboard",
     "ludwig.dialogues",
+    "ludwig.jobs",
+    "ludwig.api",
 ]
 
 # project middleware
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "ludwig.base.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -88,10 +91,64 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 STATIC_URL = "staticfiles/"
 STATIC_ROOT = BASE_DIR / "static_root"
 
+# static file bundles, loaded as a single minified file per bundle when
+# bundling is enabled and as separate source files otherwise
+STATIC_BUNDLING = False
+STATIC_BUNDLES = {
+    "base.css": ["css/base.css"],
+    "accounts.css": ["accounts/css/accounts.css"],
+    "dashboard.css": ["dashboard/css/dashboard.css"],
+    "create_dialogue.css": ["dialogues/css/dialogue_create.css"],
+    "dialogue_detail.css": [
+        "dialogues/css/dialogue_detail.css",
+        "dialogues/css/markdown.css",
+    ],
+    "htmx.js": ["js/htmx.js"],
+    "relative_time.js": ["js/relative_time.js"],
+    "create_dialogue.js": ["dialogues/js/user_selection.js"],
+    "dialogue_detail.js": [
+        "dialogues/js/listeners.js",
+        "dialogues/js/hx_config.js",
+    ],
+}
+
 # uploaded files
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media_root"
 
+# cache, local to each process by default, which is enough for the
+# development server and a single worker
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+}
+
+# keep sessions in the cache and only read them from the database on a
+# cache miss, sessions are still written to the database so they
+# survive cache evictions and restarts
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+# response compression, higher levels trade CPU time for bandwidth
+COMPRESSION_MIN_LENGTH = 200  # bytes
+COMPRESSION_GZIP_LEVEL = 6  # 1-9
+COMPRESSION_BROTLI_QUALITY = 5  # 0-11
+# gzip headers are padded with up to this many random bytes against
+# BREACH, as Django's GZipMiddleware does
+COMPRESSION_MAX_RANDOM_BYTES = 100
+
+# static snapshots of dormant dialogues
+SNAPSHOT_ROOT = BASE_DIR / "snapshot_root"
+
+# databases the posts of dialogues are spread across, each dialogue's
+# posts are kept on one of them, see `ludwig.dialogues.sharding`. To
+# retire a shard, take it out of `DIALOGUE_SHARDS`, move its dialogues
+# with the `rebalance_dialogues` command and only then remove it from
+# `DATABASES`
+DATABASE_ROUTERS = ["ludwig.dialogues.sharding.DialogueShardRouter"]
+DIALOGUE_SHARDS = ["default"]
+
 # default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -15,3 +15,24 @@ DATABASES = {
         "HOST": env.str("DB_HOST"),
     }
 }
+
+# shards of posts, as a comma separated list of names of databases on
+# the default database's server, each migrated with
+# `migrate --database shard1` and so on. New dialogues are placed on all
+# databases unless `DIALOGUE_SHARDS` lists the aliases to use, like
+# `default` to run the tests of single databases alongside the tests of
+# sharding
+for number, name in enumerate(env.list("DB_SHARD_NAMES", []), start=1):
+    DATABASES[f"shard{number}"] = {**DATABASES["default"], "NAME": name}
+DIALOGUE_SHARDS = env.list("DIALOGUE_SHARDS", list(DATABASES))
+
+# the local memory cache of the base settings isn't shared between
+# processes, so views and held-back read cursor advances counted by the
+# web server only reach the jobs run by workers through a shared cache
+if env.str("REDIS_URL", ""):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": env.str("REDIS_URL"),
+        }
+    }
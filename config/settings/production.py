@@ -8,9 +8,33 @@ env.read_env()
 DEBUG = env.bool("DEBUG")
 ALLOWED_HOSTS = env.list("ALLOWED_HOSTS")
 
-# use whitenoise for static files
+# use whitenoise for static files, which serves fingerprinted files
+# with immutable cache headers
 MIDDLEWARE.insert(1, "whitenoise.middleware.WhiteNoiseMiddleware")
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+
+# bundle, minify, fingerprint and compress static files on collectstatic
+STATIC_BUNDLING = True
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "ludwig.base.storage.BundledStaticFilesStorage",
+    },
+}
+
+# share the cache between all worker processes and hosts, so version
+# bumps of a dialogue are seen by every worker. Redis adds and
+# increments keys atomically, which the throttles and counters kept in
+# the cache rely on, and evicts keys by itself when it's run with a
+# `maxmemory` limit and the `allkeys-lru` policy, instead of scanning
+# the cache on writes
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": env.str("REDIS_URL", "redis://127.0.0.1:6379/0"),
+    }
+}
 
 # database configuration
 DATABASES = {
@@ -24,6 +48,14 @@ DATABASES = {
     }
 }
 
+# shards of posts, as a comma separated list of `host/name` pairs of
+# databases with the default database's credentials, each migrated with
+# `migrate --database shard1` and so on
+for number, shard in enumerate(env.list("DB_SHARDS", []), start=1):
+    host, name = shard.split("/")
+    DATABASES[f"shard{number}"] = {**DATABASES["default"], "HOST": host, "NAME": name}
+DIALOGUE_SHARDS = list(DATABASES)
+
 # redirect all non-HTTPS requests to HTTPS
 SECURE_SSL_REDIRECT = True
 
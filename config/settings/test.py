@@ -0,0 +1,10 @@
+from .local import *
+
+# the tests of sharding need a database besides the default one, so a
+# second database on the default database's server is added when no
+# shards are configured, without placing new dialogues on it
+if len(DATABASES) == 1:
+    DATABASES["shard1"] = {
+        **DATABASES["default"],
+        "NAME": f"{DATABASES['default']['NAME']}_shard1",
+    }
@@ -6,6 +6,7 @@ from .views import IndexView
 urlpatterns = [
     path("", IndexView.as_view(), name="index"),
     path("admin/", admin.site.urls),
+    path("api/", include("ludwig.api.urls")),
     path("auth/", include("ludwig.accounts.urls")),
     path("dashboard/", include("ludwig.dashboard.urls")),
     path("dialogue/", include("ludwig.dialogues.urls")),
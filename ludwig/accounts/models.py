@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -10,6 +11,15 @@ class User(AbstractUser):
 
     display_name = models.CharField(max_length=100, blank=True)
     email = models.EmailField(unique=True)
+    # deleted users are deactivated right away and purged with their
+    # posts in the background by the `purge_deleted` command
+    deleted_on = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return self.username
+
+    def soft_delete(self):
+        """Deactivate the user and mark them to be purged."""
+        self.is_active = False
+        self.deleted_on = timezone.now()
+        self.save(update_fields=["is_active", "deleted_on"])
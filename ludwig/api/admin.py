@@ -0,0 +1,5 @@
+from django.contrib import admin
+
+from .models import APIKey
+
+admin.site.register(APIKey)
@@ -0,0 +1,24 @@
+# number of items per page of a list, and the most a client may ask for
+# with the `limit` parameter
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# fields sent for each resource, unless the client selects some of them
+# with the `fields` parameter
+DIALOGUE_FIELDS = (
+    "id",
+    "title",
+    "summary",
+    "is_open",
+    "is_visible",
+    "created_on",
+    "seq",
+)
+POST_FIELDS = ("id", "author", "body", "created_on", "modified_on")
+
+# formats post bodies can be sent in, raw or rendered as on the pages
+BODY_FORMATS = ("markdown", "html")
+
+# seconds between writes of the last use of an API key, so that every
+# request doesn't write to the key
+API_KEY_USE_INTERVAL = 60 * 60
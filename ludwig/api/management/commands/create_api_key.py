@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from ludwig.api.models import APIKey
+
+
+class Command(BaseCommand):
+    help = (
+        "Create an API key for a user. The key is printed once and can't be "
+        "shown again, only revoked by deleting it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="User the key authenticates as.")
+        parser.add_argument("name", help="What the key is used for.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+
+        try:
+            user = User.objects.get(username=options["username"], is_active=True)
+        except User.DoesNotExist:
+            raise CommandError(f"No active user {options['username']!r}.")
+
+        _, key = APIKey.objects.create_key(user, options["name"])
+        self.stdout.write(key)
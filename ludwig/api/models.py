@@ -0,0 +1,74 @@
+import hashlib
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from ludwig.base.models import TimeStampedModel
+
+from .constants import API_KEY_USE_INTERVAL
+
+
+def hash_api_key(key):
+    """
+    Hash an API key for storage. Keys are long random strings rather
+    than passwords, so a fast hash is as hard to reverse as a slow one.
+    """
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class APIKeyQuerySet(models.QuerySet):
+    def create_key(self, user, name):
+        """
+        Create an API key for a user. Returns the `APIKey` and the key
+        itself, which isn't stored and can't be shown again.
+        """
+        key = secrets.token_urlsafe(32)
+        api_key = self.create(user=user, name=name, key_hash=hash_api_key(key))
+        return api_key, key
+
+    def authenticate(self, key):
+        """Get the API key of an active user matching `key`, or None."""
+        return (
+            self.select_related("user")
+            .filter(key_hash=hash_api_key(key), user__is_active=True)
+            .first()
+        )
+
+
+class APIKey(TimeStampedModel):
+    """
+    A key that authenticates requests to the API as its user, for
+    clients without a browser session, like internal tools and apps.
+    Only a hash of the key is stored, and deleting it revokes it.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="api_keys"
+    )
+    name = models.CharField(max_length=100)
+    key_hash = models.CharField(max_length=64, unique=True, editable=False)
+    last_used_on = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = APIKeyQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "API key"
+
+    def __str__(self):
+        return f"{self.name} ({self.user})"
+
+    def touch(self):
+        """
+        Record a use of the key, at most once every
+        `API_KEY_USE_INTERVAL` seconds.
+        """
+        now = timezone.now()
+
+        if self.last_used_on is None or now - self.last_used_on >= timedelta(
+            seconds=API_KEY_USE_INTERVAL
+        ):
+            self.last_used_on = now
+            APIKey.objects.filter(id=self.id).update(last_used_on=now)
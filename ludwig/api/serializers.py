@@ -0,0 +1,72 @@
+"""
+Serialization of dialogues and posts for the JSON API.
+
+Resources are turned into plain dicts of the fields a client selected,
+with times as ISO 8601 strings, and encoded with orjson when it's
+installed, which is several times faster than the standard library
+encoder for lists of posts. Both encoders produce the same compact JSON,
+so clients can't tell which one is used.
+"""
+
+import json
+
+from ludwig.dialogues.templatetags.markdown_extras import markdown
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data):
+    """Encode data as compact JSON bytes."""
+
+    if orjson is not None:
+        return orjson.dumps(data)
+
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def loads(content):
+    """Decode JSON bytes, raising `ValueError` if they aren't valid."""
+
+    if orjson is not None:
+        return orjson.loads(content)
+
+    return json.loads(content)
+
+
+def _get_dialogue_field(dialogue, field):
+    # dialogues are identified by their slug, as in the URLs of the site
+    if field == "id":
+        return dialogue.slug
+    if field == "seq":
+        return dialogue.change_seq
+    if field == "created_on":
+        return dialogue.created_on.isoformat()
+    return getattr(dialogue, field)
+
+
+def serialize_dialogue(dialogue, fields):
+    """Get the selected fields of a dialogue."""
+
+    return {field: _get_dialogue_field(dialogue, field) for field in fields}
+
+
+def _get_post_field(post, field, body_format):
+    if field == "author":
+        return {"id": post.author_id, "username": post.author.username}
+    if field == "body":
+        return markdown(post.body) if body_format == "html" else post.body
+    if field in ("created_on", "modified_on"):
+        return getattr(post, field).isoformat()
+    return getattr(post, field)
+
+
+def serialize_post(post, fields, body_format):
+    """
+    Get the selected fields of a post, with the body as raw markdown or
+    rendered to HTML as on the dialogue pages.
+    """
+
+    return {field: _get_post_field(post, field, body_format) for field in fields}
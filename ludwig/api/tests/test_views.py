@@ -0,0 +1,464 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ludwig.api.models import APIKey
+from ludwig.api.views import DialogueListView, PostListView, SyncView
+from ludwig.dialogues.models import Dialogue, Post
+
+User = get_user_model()
+
+
+class APITestCase(TestCase):
+    """Base class with a public and a private dialogue."""
+
+    def setUp(self):
+        """
+        Initial setup for the testing suite.
+        """
+        cache.clear()
+        self.user1 = User.objects.create_user(
+            username="testuser1",
+            email="testuser1@example.com",
+            password="testpassword",
+        )
+        self.user2 = User.objects.create_user(
+            username="testuser2",
+            email="testuser2@example.com",
+            password="testpassword",
+        )
+        self.public_dialogue = Dialogue.objects.create(
+            title="Public", author=self.user1, is_visible=True
+        )
+        self.private_dialogue = Dialogue.objects.create(
+            title="Private", author=self.user1, is_visible=False
+        )
+
+    def _get(self, name, dialogue=None, **params):
+        args = (dialogue.slug,) if dialogue else ()
+        response = self.client.get(reverse(f"api:v1:{name}", args=args), params)
+        return response, json.loads(response.content)
+
+    def _create_posts(self, dialogue, count):
+        return [
+            Post.objects.create(dialogue=dialogue, author=self.user1, body=f"Post {i}")
+            for i in range(count)
+        ]
+
+
+class DialogueListViewTests(APITestCase):
+    """
+    Testing suite for listing dialogues through the API.
+
+    Tests included:
+        1. Anonymous users are asked to authenticate
+        2. Dialogues of the user are listed a page at a time
+        3. Selected fields are the only ones sent
+        4. Unknown fields are rejected
+    """
+
+    def test_authentication_required(self):
+        """
+        Anonymous users should get a 401 response.
+        """
+        response, data = self._get("dialogue_list")
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(data["detail"], "Authentication required.")
+
+    def test_pages(self):
+        """
+        The dialogues of the user should be listed newest first, with a
+        cursor to the next page while there is one.
+        """
+        # dialogues created in the same instant are ordered by ID
+        Dialogue.objects.update(created_on=self.public_dialogue.created_on)
+        Dialogue.objects.create(title="Other", author=self.user2)
+        self.client.force_login(self.user1)
+
+        response, first_page = self._get("dialogue_list", limit=1)
+        _, second_page = self._get("dialogue_list", limit=1, after=first_page["next"])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        listed = [first_page["dialogues"][0]["id"], second_page["dialogues"][0]["id"]]
+        self.assertEqual(
+            listed,
+            sorted(
+                [self.public_dialogue.slug, self.private_dialogue.slug], reverse=True
+            ),
+        )
+        self.assertIsNone(second_page["next"])
+
+    def test_field_selection(self):
+        """
+        Only the fields selected with the `fields` parameter should be
+        sent.
+        """
+        self.client.force_login(self.user1)
+
+        _, data = self._get("dialogue_list", fields="id,seq")
+
+        self.assertEqual(
+            data["dialogues"][0], {"id": self.private_dialogue.slug, "seq": 0}
+        )
+
+    def test_unknown_fields(self):
+        """
+        Selecting a field that doesn't exist should get a 400 response.
+        """
+        self.client.force_login(self.user1)
+
+        response, data = self._get("dialogue_list", fields="id,password")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("password", data["detail"])
+
+
+class PostListViewTests(APITestCase):
+    """
+    Testing suite for reading and adding posts through the API.
+
+    Tests included:
+        1. Posts are listed a page at a time with the dialogue's sequence
+        2. Bodies are sent as markdown or rendered HTML
+        3. Private dialogues are only readable by participants
+        4. Missing dialogues get a JSON 404 response
+        5. Participants can add posts with a JSON body
+        6. Non-participants can't add posts
+        7. Empty posts are rejected
+        8. Reading and posting stay within the query budgets
+    """
+
+    def test_pages(self):
+        """
+        Posts should be listed by ID after the `after` cursor, along
+        with the sequence number of the dialogue to sync from.
+        """
+        posts = self._create_posts(self.public_dialogue, 3)
+
+        _, first_page = self._get("post_list", self.public_dialogue, limit=2)
+        _, second_page = self._get(
+            "post_list", self.public_dialogue, after=first_page["next"]
+        )
+
+        self.assertEqual(first_page["seq"], 3)
+        self.assertEqual(
+            [post["id"] for post in first_page["posts"]], [posts[0].id, posts[1].id]
+        )
+        self.assertEqual([post["id"] for post in second_page["posts"]], [posts[2].id])
+        self.assertIsNone(second_page["next"])
+        self.assertEqual(
+            first_page["posts"][0]["author"],
+            {"id": self.user1.id, "username": "testuser1"},
+        )
+
+    def test_body_formats(self):
+        """
+        Post bodies should be sent as raw markdown by default and as
+        HTML when asked for, and other formats should be rejected.
+        """
+        Post.objects.create(
+            dialogue=self.public_dialogue, author=self.user1, body="**Bold**"
+        )
+
+        _, markdown = self._get("post_list", self.public_dialogue, fields="body")
+        _, html = self._get(
+            "post_list", self.public_dialogue, fields="body", format="html"
+        )
+        response, _ = self._get("post_list", self.public_dialogue, format="pdf")
+
+        self.assertEqual(markdown["posts"], [{"body": "**Bold**"}])
+        self.assertEqual(html["posts"], [{"body": "<p><strong>Bold</strong></p>"}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_private_dialogue(self):
+        """
+        Posts of a private dialogue should only be readable by its
+        participants.
+        """
+        response, data = self._get("post_list", self.private_dialogue)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(data["detail"], "Permission denied.")
+
+        self.client.force_login(self.user2)
+        response, _ = self._get("post_list", self.private_dialogue)
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(self.user1)
+        response, _ = self._get("post_list", self.private_dialogue)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_dialogue(self):
+        """
+        A dialogue that doesn't exist should get a JSON 404 response.
+        """
+        response = self.client.get(reverse("api:v1:post_list", args=("missing",)))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.content), {"detail": "Not found."})
+
+    def test_create_post(self):
+        """
+        A participant should be able to add a post with a JSON body and
+        get it back with a 201 response.
+        """
+        self.client.force_login(self.user1)
+
+        response = self.client.post(
+            reverse("api:v1:post_list", args=(self.public_dialogue.slug,)),
+            {"body": " New post "},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        post = Post.objects.get(dialogue=self.public_dialogue)
+        data = json.loads(response.content)
+        self.assertEqual(data["post"]["id"], post.id)
+        self.assertEqual(data["post"]["body"], "New post")
+
+    def test_create_post_as_non_participant(self):
+        """
+        A user who doesn't participate in a dialogue shouldn't be able
+        to post in it, even if it's public.
+        """
+        self.client.force_login(self.user2)
+
+        response = self.client.post(
+            reverse("api:v1:post_list", args=(self.public_dialogue.slug,)),
+            {"body": "New post"},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Post.objects.exists())
+
+    def test_create_empty_post(self):
+        """
+        Posts without a body, and bodies that aren't valid JSON, should
+        get a 400 response.
+        """
+        self.client.force_login(self.user1)
+        url = reverse("api:v1:post_list", args=(self.public_dialogue.slug,))
+
+        empty = self.client.post(url, {"body": "  "}, content_type="application/json")
+        invalid = self.client.post(url, "{", content_type="application/json")
+
+        self.assertEqual(empty.status_code, 400)
+        self.assertEqual(invalid.status_code, 400)
+        self.assertFalse(Post.objects.exists())
+
+    def test_query_budgets(self):
+        """
+        Reading a page of posts and adding a post should run no more
+        queries than their budgets, however many posts there are.
+        """
+        self._create_posts(self.private_dialogue, 20)
+        self.client.force_login(self.user1)
+
+        with CaptureQueriesContext(connection) as queries:
+            self._get("post_list", self.private_dialogue)
+        self.assertLessEqual(len(queries), PostListView.query_budgets["get"])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(
+                reverse("api:v1:post_list", args=(self.private_dialogue.slug,)),
+                {"body": "New post"},
+            )
+        self.assertLessEqual(len(queries), PostListView.query_budgets["post"])
+
+
+class SyncViewTests(APITestCase):
+    """
+    Testing suite for syncing dialogues through the API.
+
+    Tests included:
+        1. Added and edited posts are sent with the IDs of deleted ones
+        2. Syncs without changes keep the sequence number
+        3. Syncs stay within the query budget
+        4. Requests over the query budget are logged
+    """
+
+    def test_sync(self):
+        """
+        Posts added or edited after `seq` should be sent in `posts`, and
+        posts deleted after it by their IDs in `deleted`.
+        """
+        edited, deleted = self._create_posts(self.public_dialogue, 2)
+        edited.body = "Edited post"
+        edited.save()
+        deleted_id = deleted.id
+        deleted.delete()
+        added = self._create_posts(self.public_dialogue, 1)[0]
+
+        _, data = self._get("sync", self.public_dialogue, seq=2, fields="id,body")
+
+        self.assertEqual(data["seq"], 5)
+        self.assertEqual(
+            data["posts"],
+            [
+                {"id": edited.id, "body": "Edited post"},
+                {"id": added.id, "body": "Post 0"},
+            ],
+        )
+        self.assertEqual(data["deleted"], [deleted_id])
+
+    def test_sync_without_changes(self):
+        """
+        A sync from the latest change should send no posts and the same
+        sequence number.
+        """
+        self._create_posts(self.public_dialogue, 1)
+
+        _, data = self._get("sync", self.public_dialogue, seq=1)
+
+        self.assertEqual(data, {"seq": 1, "posts": [], "deleted": []})
+
+    def test_query_budget(self):
+        """
+        A sync of a private dialogue should run no more queries than
+        the budget, however many posts changed.
+        """
+        self._create_posts(self.private_dialogue, 20)
+        self.client.force_login(self.user1)
+
+        with CaptureQueriesContext(connection) as queries:
+            self._get("sync", self.private_dialogue, seq=0)
+
+        self.assertLessEqual(len(queries), SyncView.query_budgets["get"])
+
+    def test_over_budget_logged(self):
+        """
+        A request that runs more queries than its endpoint's budget
+        should be logged as a warning.
+        """
+        self.client.force_login(self.user1)
+
+        with mock.patch.object(DialogueListView, "query_budgets", {"get": 0}):
+            with self.assertLogs("ludwig.api.views", "WARNING") as logs:
+                self._get("dialogue_list")
+
+        self.assertIn("over its budget of 0", logs.output[0])
+
+
+class APIKeyTests(APITestCase):
+    """
+    Testing suite for authenticating with API keys.
+
+    Tests included:
+        1. Requests with a key are authenticated as its user
+        2. Unknown keys are rejected
+        3. Posts with a key don't need a CSRF token
+        4. Posts with a session need a CSRF token
+        5. Keys of deleted users are rejected
+        6. Keys are created by the `create_api_key` command
+    """
+
+    def setUp(self):
+        """
+        Initial setup with an API key of the first user and a client
+        that checks CSRF tokens like browsers' requests are checked.
+        """
+        super().setUp()
+        self.api_key, self.key = APIKey.objects.create_key(self.user1, "Tool")
+        self.client = Client(enforce_csrf_checks=True)
+
+    def _post(self, **headers):
+        return self.client.post(
+            reverse("api:v1:post_list", args=(self.public_dialogue.slug,)),
+            {"body": "New post"},
+            content_type="application/json",
+            headers=headers,
+        )
+
+    def test_authenticate(self):
+        """
+        A request with a key should be authenticated as the user of the
+        key, whose last use is recorded.
+        """
+        response = self.client.get(
+            reverse("api:v1:dialogue_list"),
+            headers={"authorization": f"Bearer {self.key}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)["dialogues"]), 2)
+        self.api_key.refresh_from_db()
+        self.assertIsNotNone(self.api_key.last_used_on)
+
+    def test_invalid_key(self):
+        """
+        A request with an unknown key should get a 401 response rather
+        than being treated as anonymous.
+        """
+        response = self.client.get(
+            reverse("api:v1:dialogue_list"),
+            headers={"authorization": "Bearer invalid"},
+        )
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(json.loads(response.content)["detail"], "Invalid API key.")
+
+    def test_post_without_csrf_token(self):
+        """
+        A post authenticated by a key should be added without a CSRF
+        token, which clients without a browser don't have.
+        """
+        response = self._post(authorization=f"Bearer {self.key}")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Post.objects.get().author, self.user1)
+
+    def test_session_post_without_csrf_token(self):
+        """
+        A post authenticated by a session should be rejected without a
+        CSRF token, and added with one.
+        """
+        self.client.force_login(self.user1)
+
+        response = self._post()
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Post.objects.exists())
+
+        # a GET sets the CSRF cookie the token is read from
+        self.client.get(reverse("dialogues:create_dialogue"))
+        response = self._post(x_csrftoken=self.client.cookies["csrftoken"].value)
+
+        self.assertEqual(response.status_code, 201)
+
+    def test_deleted_user(self):
+        """
+        The keys of a deleted user should stop working right away.
+        """
+        self.user1.soft_delete()
+
+        response = self.client.get(
+            reverse("api:v1:dialogue_list"),
+            headers={"authorization": f"Bearer {self.key}"},
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_create_api_key_command(self):
+        """
+        The command should print a new key of the user, which is stored
+        only as a hash.
+        """
+        out = StringIO()
+
+        call_command("create_api_key", "testuser2", "Mobile", stdout=out)
+
+        key = out.getvalue().strip()
+        api_key = APIKey.objects.authenticate(key)
+        self.assertEqual(api_key.user, self.user2)
+        self.assertEqual(api_key.name, "Mobile")
+        self.assertNotEqual(api_key.key_hash, key)
@@ -0,0 +1,19 @@
+from django.urls import include, path
+
+from . import views
+
+app_name = "api"
+
+v1_patterns = [
+    path("dialogues/", views.DialogueListView.as_view(), name="dialogue_list"),
+    path(
+        "dialogues/<str:slug>/posts/",
+        views.PostListView.as_view(),
+        name="post_list",
+    ),
+    path("dialogues/<str:slug>/sync/", views.SyncView.as_view(), name="sync"),
+]
+
+urlpatterns = [
+    path("v1/", include((v1_patterns, "v1"))),
+]
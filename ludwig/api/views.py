@@ -0,0 +1,429 @@
+import base64
+import logging
+from contextlib import ExitStack
+from datetime import datetime
+
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+from django.http import Http404, HttpResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.generic.base import View
+
+from ludwig.dialogues.changes import get_changes_since, get_posts_at
+from ludwig.dialogues.models import Dialogue
+from ludwig.dialogues.views import get_seq
+
+from .constants import (
+    BODY_FORMATS,
+    DIALOGUE_FIELDS,
+    MAX_PAGE_SIZE,
+    PAGE_SIZE,
+    POST_FIELDS,
+)
+from .models import APIKey
+from .serializers import dumps, loads, serialize_dialogue, serialize_post
+
+logger = logging.getLogger(__name__)
+
+
+class APIError(Exception):
+    """An error that is sent to the client as a JSON response."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def json_response(data, status=200):
+    """Get a response with data encoded as JSON."""
+
+    return HttpResponse(dumps(data), status=status, content_type="application/json")
+
+
+def get_fields(params, available):
+    """
+    Get the fields selected by the comma-separated `fields` parameter,
+    in the order of `available`, or all of them if none are selected.
+    """
+
+    if not params.get("fields"):
+        return available
+
+    selected = set(params["fields"].split(","))
+    unknown = selected.difference(available)
+
+    if unknown:
+        raise APIError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+
+    return tuple(field for field in available if field in selected)
+
+
+def get_body_format(params):
+    """Get the format post bodies are sent in from the `format` parameter."""
+
+    body_format = params.get("format", BODY_FORMATS[0])
+
+    if body_format not in BODY_FORMATS:
+        raise APIError(f"Format has to be one of: {', '.join(BODY_FORMATS)}.")
+
+    return body_format
+
+
+def get_limit(params):
+    """Get the number of items per page from the `limit` parameter."""
+
+    try:
+        limit = int(params.get("limit", PAGE_SIZE))
+    except ValueError:
+        raise APIError("Limit has to be a number.")
+
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def get_post_cursor(params):
+    """Get the ID of the post a page of posts starts after."""
+
+    try:
+        return max(int(params.get("after", 0)), 0)
+    except ValueError:
+        raise APIError("Invalid cursor.")
+
+
+def encode_cursor(dialogue):
+    """Encode the position of a dialogue in a list as an opaque cursor."""
+
+    position = f"{dialogue.created_on.isoformat()}|{dialogue.slug}"
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a cursor into the creation time and slug it points after."""
+
+    try:
+        created_on, slug = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_on), slug
+    except ValueError:
+        raise APIError("Invalid cursor.")
+
+
+def can_read(user, dialogue):
+    """
+    Check if a user may read a dialogue, under the same rules as the
+    dialogue pages: public dialogues are readable by anyone, private
+    ones by their participants only.
+    """
+
+    return dialogue.is_visible or is_participant(user, dialogue)
+
+
+def is_participant(user, dialogue):
+    """Check if a user participates in a dialogue."""
+
+    return user.is_authenticated and dialogue.participants.filter(id=user.id).exists()
+
+
+class QueryCounter:
+    """Database execute wrapper that counts the queries it runs."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class APIView(View):
+    """
+    Base view of the JSON API. Errors are sent as JSON with a `detail`
+    message, and requests that run more queries than the budget of their
+    method in `query_budgets` are logged, so endpoints that start to
+    query per item are caught in the logs before they're caught in
+    latency.
+
+    Clients without a browser, like internal tools and apps, send an
+    API key created by the `create_api_key` command in an
+    `Authorization: Bearer <key>` header. Requests without one are
+    authenticated by the session of the HTML views, which clients get by
+    logging in at `/auth/login/`, so unsafe requests need the value of
+    the `csrftoken` cookie in an `X-CSRFToken` header as well.
+    """
+
+    # most database queries a request should run, by request method
+    query_budgets = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        counter = QueryCounter()
+
+        # queries are counted on every database, posts may be read from
+        # any of the shards
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(counter))
+            try:
+                self.authenticate(request)
+                response = super().dispatch(request, *args, **kwargs)
+            except APIError as error:
+                response = json_response({"detail": error.message}, error.status)
+            except Http404:
+                response = json_response({"detail": "Not found."}, 404)
+            except PermissionDenied:
+                response = json_response({"detail": "Permission denied."}, 403)
+
+        budget = self.get_query_budget(request)
+
+        if budget is not None and counter.count > budget:
+            logger.warning(
+                "%s %s ran %d queries, over its budget of %d",
+                request.method,
+                request.path,
+                counter.count,
+                budget,
+            )
+
+        return response
+
+    def authenticate(self, request):
+        """
+        Authenticate the request by its API key, or check the CSRF token
+        of requests authenticated by their session.
+        """
+
+        scheme, _, key = request.headers.get("Authorization", "").partition(" ")
+
+        if scheme.lower() == "bearer":
+            api_key = APIKey.objects.authenticate(key.strip())
+
+            if api_key is None:
+                raise APIError("Invalid API key.", status=401)
+
+            api_key.touch()
+            request.user = api_key.user
+            return
+
+        # the view is exempt from the CSRF middleware so that requests
+        # with API keys don't need a token, the check runs here instead
+        if CsrfViewMiddleware(lambda request: None).process_view(request, None, (), {}):
+            raise APIError("CSRF token missing or incorrect.", status=403)
+
+    def get_query_budget(self, request):
+        """Get the most database queries the request should have run."""
+
+        return self.query_budgets.get(request.method.lower())
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        response = json_response({"detail": "Method not allowed."}, 405)
+        response.headers["Allow"] = ", ".join(self._allowed_methods())
+        return response
+
+    def get_user(self):
+        """Get the user, who has to be logged in."""
+
+        user = self.request.user
+
+        if not user.is_authenticated:
+            raise APIError("Authentication required.", status=401)
+
+        return user
+
+    def get_dialogue(self, slug):
+        """Get a dialogue the user may read."""
+
+        dialogue = get_object_or_404(Dialogue, slug=slug)
+
+        if not can_read(self.request.user, dialogue):
+            raise PermissionDenied
+
+        return dialogue
+
+
+class DialogueListView(APIView):
+    """
+    List the dialogues of the user, newest first, a page at a time.
+    Pages are keyed by the opaque cursor in the `next` field of the
+    previous page, passed as the `after` parameter.
+    """
+
+    query_budgets = {"get": 3}
+
+    def get(self, request, *args, **kwargs):
+        user = self.get_user()
+        fields = get_fields(request.GET, DIALOGUE_FIELDS)
+        limit = get_limit(request.GET)
+
+        dialogues = user.dialogues.order_by("-created_on", "-slug")
+
+        if request.GET.get("after"):
+            created_on, slug = decode_cursor(request.GET["after"])
+            dialogues = dialogues.filter(
+                Q(created_on__lt=created_on) | Q(created_on=created_on, slug__lt=slug)
+            )
+
+        # one more dialogue than the page holds tells if there's a next
+        # page without counting
+        dialogues = list(dialogues[: limit + 1])
+        page = dialogues[:limit]
+
+        return json_response(
+            {
+                "dialogues": [
+                    serialize_dialogue(dialogue, fields) for dialogue in page
+                ],
+                "next": encode_cursor(page[-1]) if len(dialogues) > limit else None,
+            }
+        )
+
+
+class PostListView(APIView):
+    """
+    List the posts of a dialogue in the order they were added, a page at
+    a time, or add a post to it. Pages are keyed by the ID of the last
+    post on the previous page, passed as the `after` parameter. The
+    `seq` of the response is the number of the dialogue's last change
+    before the posts were read, from which the client syncs once it has
+    all pages.
+    """
+
+    # adding a post also validates its relations and appends it to the
+    # change log of the dialogue, in a transaction whose savepoint counts
+    # as queries too
+    query_budgets = {"get": 5, "post": 12}
+
+    # a post added to a dialogue on another shard takes its ID from the
+    # default database, opens a transaction on the shard as well and
+    # checks the change log on the shard for changes lost with a failed
+    # commit
+    sharded_post_queries = 3
+
+    # the shard of the dialogue a post is added to, set by `post`
+    shard = DEFAULT_DB_ALIAS
+
+    def authenticate(self, request):
+        """
+        Authenticate the request by its API key, or check the CSRF token
+        of requests authenticated by their session.
+        """
+
+        scheme, _, key = request.headers.get("Authorization", "").partition(" ")
+
+        if scheme.lower() == "bearer":
+            api_key = APIKey.objects.authenticate(key.strip())
+
+            if api_key is None:
+                raise APIError("Invalid API key.", status=401)
+
+            api_key.touch()
+            request.user = api_key.user
+            return
+
+        # the view is exempt from the CSRF middleware so that requests
+        # with API keys don't need a token, the check runs here instead
+        if CsrfViewMiddleware(lambda request: None).process_view(request, None, (), {}):
+            raise APIError("CSRF token missing or incorrect.", status=403)
+
+    def get_query_budget(self, request):
+        budget = super().get_query_budget(request)
+
+        if request.method == "POST" and self.shard != DEFAULT_DB_ALIAS:
+            budget += self.sharded_post_queries
+
+        return budget
+
+    def get(self, request, *args, **kwargs):
+        dialogue = self.get_dialogue(kwargs["slug"])
+        fields = get_fields(request.GET, POST_FIELDS)
+        body_format = get_body_format(request.GET)
+        limit = get_limit(request.GET)
+        after = get_post_cursor(request.GET)
+
+        posts = get_posts_at(dialogue, dialogue.change_seq).filter(id__gt=after)
+
+        if "author" not in fields:
+            posts = posts.select_related(None).prefetch_related(None)
+
+        posts = list(posts[: limit + 1])
+        page = posts[:limit]
+
+        return json_response(
+            {
+                "seq": dialogue.change_seq,
+                "posts": [serialize_post(post, fields, body_format) for post in page],
+                "next": page[-1].id if len(posts) > limit else None,
+            }
+        )
+
+    def post(self, request, *args, **kwargs):
+        """
+        Add a post with the `body` of a JSON object or form, as a
+        participant of the dialogue. The post is sent back, and reaches
+        the client's other views of the dialogue with their next sync.
+        """
+
+        user = self.get_user()
+        dialogue = get_object_or_404(Dialogue, slug=kwargs["slug"])
+        self.shard = dialogue.shard
+
+        if not is_participant(user, dialogue):
+            raise PermissionDenied
+
+        if request.content_type == "application/json":
+            try:
+                data = loads(request.body)
+            except ValueError:
+                raise APIError("Invalid JSON.")
+        else:
+            data = request.POST
+
+        body = data.get("body", "") if hasattr(data, "get") else ""
+        body = body.strip() if isinstance(body, str) else ""
+
+        if not body:
+            raise APIError("Body is required.")
+
+        try:
+            post = dialogue.posts.create(author=user, body=body)
+        except ValidationError as error:
+            raise APIError(" ".join(error.messages))
+
+        fields = get_fields(request.GET, POST_FIELDS)
+        body_format = get_body_format(request.GET)
+
+        return json_response(
+            {"post": serialize_post(post, fields, body_format)}, status=201
+        )
+
+
+class SyncView(APIView):
+    """
+    Get the changes to the posts of a dialogue after the change numbered
+    by the `seq` parameter. Added and edited posts are both sent in
+    `posts`, for the client to insert or replace by ID, and deleted posts
+    by their IDs in `deleted`. The `seq` of the response is the one to
+    sync from next.
+    """
+
+    query_budgets = {"get": 6}
+
+    def get(self, request, *args, **kwargs):
+        dialogue = self.get_dialogue(kwargs["slug"])
+        fields = get_fields(request.GET, POST_FIELDS)
+        body_format = get_body_format(request.GET)
+
+        changes = get_changes_since(dialogue, get_seq(request.GET))
+        posts = sorted(
+            changes["new_posts"] + changes["edited_posts"], key=lambda post: post.id
+        )
+
+        return json_response(
+            {
+                "seq": changes["seq"],
+                "posts": [serialize_post(post, fields, body_format) for post in posts],
+                "deleted": changes["deleted_post_ids"],
+            }
+        )
@@ -0,0 +1,3 @@
+def get_bundle_path(name):
+    """Get the static path of a bundle in `settings.STATIC_BUNDLES`."""
+    return f"bundles/{name}"
@@ -0,0 +1,213 @@
+import gzip
+import re
+import secrets
+import struct
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# content types worth compressing, anything else (images, archives) is
+# usually compressed already
+COMPRESSIBLE_CONTENT_TYPES = re.compile(
+    r"^(text/|application/(json|javascript|xml)|image/svg\+xml)"
+)
+ACCEPT_ENCODING_ITEM = re.compile(r"^\s*([^;\s]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?")
+
+
+def get_accepted_encodings(accept_encoding):
+    """
+    Get the set of content codings accepted by the client according to
+    an `Accept-Encoding` header, leaving out codings with `q=0`.
+    """
+    encodings = set()
+
+    for item in accept_encoding.split(","):
+        match = ACCEPT_ENCODING_ITEM.match(item)
+        if not match:
+            continue
+
+        coding, quality = match.groups()
+        try:
+            if quality is not None and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+
+        encodings.add(coding.lower())
+
+    return encodings
+
+
+def get_gzip_header(max_random_bytes=0):
+    """
+    Get a gzip header without a modification time, padded with a file
+    name of a random length below `max_random_bytes` if it's set.
+    """
+    # magic number, deflate method, flags, modification time, extra
+    # flags and an unknown operating system
+    header = b"\x1f\x8b\x08%c\x00\x00\x00\x00\x00\xff"
+
+    if not max_random_bytes:
+        return header % 0
+
+    file_name = b"a" * secrets.randbelow(max_random_bytes)
+    return header % gzip.FNAME + file_name + b"\x00"
+
+
+class Compressor:
+    """
+    Incremental compressor for a single content coding. Every chunk is
+    flushed as soon as it's compressed, so streamed events reach the
+    client immediately instead of waiting in the compression buffer.
+
+    The gzip header is padded with a file name of up to
+    `max_random_bytes` random bytes, so that the length of a response
+    doesn't reveal how well secrets in it compress along with text from
+    the request (BREACH).
+    """
+
+    def __init__(self, encoding, max_random_bytes=0):
+        self.encoding = encoding
+
+        if encoding == "br":
+            self._compressor = brotli.Compressor(
+                quality=settings.COMPRESSION_BROTLI_QUALITY
+            )
+        else:
+            # raw deflate, with the gzip header and trailer written here
+            # so that the header can be padded
+            self._compressor = zlib.compressobj(
+                settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS
+            )
+            self._header = get_gzip_header(max_random_bytes)
+            self._crc = 0
+            self._size = 0
+
+    def compress(self, data):
+        """Compress a chunk and flush it to a complete block."""
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        return (
+            self._pop_header()
+            + self._compressor.compress(data)
+            + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        )
+
+    def finish(self):
+        """Get the end of the compressed stream."""
+        if self.encoding == "br":
+            return self._compressor.finish()
+
+        # the trailer holds the CRC-32 and the size modulo 2^32
+        return (
+            self._pop_header()
+            + self._compressor.flush(zlib.Z_FINISH)
+            + struct.pack("<2L", self._crc, self._size & 0xFFFFFFFF)
+        )
+
+    def _pop_header(self):
+        header, self._header = self._header, b""
+        return header
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with Brotli or gzip, depending on what the client
+    accepts. Brotli is only used when the `brotli` package is installed,
+    and not for requests with a session cookie, whose responses can mix
+    secrets with text from the request. Brotli streams can't be padded
+    like gzip headers, so those responses get padded gzip instead.
+
+    Responses shorter than `settings.COMPRESSION_MIN_LENGTH`, such as
+    empty polling updates, are sent as they are, since compressing them
+    would only add overhead. Streaming responses are compressed chunk by
+    chunk and flushed after every chunk, so server-sent events are
+    delivered one by one.
+    """
+
+    def process_response(self, request, response):
+        # skip responses that are already encoded or not worth encoding
+        if response.has_header("Content-Encoding"):
+            return response
+        if not COMPRESSIBLE_CONTENT_TYPES.match(response.get("Content-Type", "")):
+            return response
+        if (
+            not response.streaming
+            and len(response.content) < settings.COMPRESSION_MIN_LENGTH
+        ):
+            return response
+
+        # the response depends on the accepted encodings from here on,
+        # which is added to any existing vary headers like HX-Request
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoding = self._get_encoding(request)
+        if encoding is None:
+            return response
+
+        compressor = Compressor(encoding, settings.COMPRESSION_MAX_RANDOM_BYTES)
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._compress_async_stream(
+                    compressor, response.streaming_content
+                )
+            else:
+                response.streaming_content = self._compress_stream(
+                    compressor, response.streaming_content
+                )
+            # the length is unknown until the stream ends
+            del response["Content-Length"]
+        else:
+            compressed = compressor.compress(response.content) + compressor.finish()
+            # sending the compressed content only pays off if it's shorter
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(response.content))
+
+        # a strong ETag would claim that the compressed content is
+        # byte-for-byte identical to the uncompressed one
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    def _get_encoding(self, request):
+        """Get the preferred content coding accepted by the client."""
+        accepted = get_accepted_encodings(request.headers.get("Accept-Encoding", ""))
+
+        if (
+            brotli is not None
+            and "br" in accepted
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        ):
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _compress_stream(self, compressor, streaming_content):
+        for chunk in streaming_content:
+            # don't send empty blocks for empty chunks
+            if chunk:
+                yield compressor.compress(chunk)
+        yield compressor.finish()
+
+    async def _compress_async_stream(self, compressor, streaming_content):
+        async for chunk in streaming_content:
+            if chunk:
+                yield compressor.compress(chunk)
+        yield compressor.finish()
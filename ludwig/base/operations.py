@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class AlterFieldExceptOnPostgreSQL(migrations.AlterField):
+    """
+    Alter a field in the migration state and on every database backend
+    but PostgreSQL, where the migration makes the change online with raw
+    SQL instead. Django alters a column in a single statement that holds
+    an exclusive lock on the table, and on the tables that reference it,
+    while they are rewritten.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
@@ -0,0 +1,34 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent async calls with the same key into one call.
+    The first caller of a key runs the call, and everyone else calling
+    with the same key while it's in flight awaits the same result.
+
+    Calls are only shared within an event loop, so requests are
+    coalesced per ASGI worker process. Requests served by a WSGI worker
+    each run on their own event loop and never share a call.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, func):
+        """
+        Get the result of awaiting `func()`, or of the call in flight
+        for `key`. Returns the result and whether the call was shared.
+        """
+        key = (asyncio.get_running_loop(), key)
+        future = self._calls.get(key)
+        shared = future is not None
+
+        if not shared:
+            future = asyncio.ensure_future(func())
+            self._calls[key] = future
+            future.add_done_callback(lambda _: self._calls.pop(key, None))
+
+        # a cancelled caller, like a disconnected client, mustn't cancel
+        # the call for everyone else sharing it
+        return await asyncio.shield(future), shared
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from .bundles import get_bundle_path
+
+try:
+    from rcssmin import cssmin
+except ImportError:
+    cssmin = None
+
+try:
+    from rjsmin import jsmin
+except ImportError:
+    jsmin = None
+
+
+def minify(name, content):
+    """
+    Minify CSS or JavaScript content if the matching minifier is
+    installed, otherwise return the content unchanged.
+    """
+    if name.endswith(".css") and cssmin:
+        return cssmin(content)
+    if name.endswith(".js") and jsmin:
+        return jsmin(content)
+    return content
+
+
+class BundledStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Static files storage that concatenates and minifies the bundles in
+    `settings.STATIC_BUNDLES` during `collectstatic`. The bundles are
+    then fingerprinted and compressed with gzip and Brotli like any
+    other static file, so they can be served with immutable caching.
+    """
+
+    def post_process(self, paths, *args, **kwargs):
+        if not kwargs.get("dry_run"):
+            for name, sources in settings.STATIC_BUNDLES.items():
+                bundle_path = get_bundle_path(name)
+                self._save_bundle(bundle_path, sources, paths)
+                paths[bundle_path] = (self, bundle_path)
+
+        yield from super().post_process(paths, *args, **kwargs)
+
+    def _save_bundle(self, bundle_path, sources, paths):
+        """Concatenate and minify the source files of a bundle."""
+        contents = []
+
+        for source in sources:
+            storage, path = paths[source]
+            with storage.open(path) as file:
+                contents.append(minify(source, file.read().decode()))
+
+        # separate scripts with a semicolon in case a source doesn't
+        # end with one
+        separator = ";\n" if bundle_path.endswith(".js") else "\n"
+
+        if self.exists(bundle_path):
+            self.delete(bundle_path)
+
+        self.save(bundle_path, ContentFile(separator.join(contents).encode()))
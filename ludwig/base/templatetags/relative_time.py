@@ -0,0 +1,22 @@
+from django import template
+from django.utils import formats, timezone
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def relative_time(value):
+    """
+    Render a time as a `<time>` element with its absolute ISO 8601
+    timestamp, which `relative_time.js` formats relative to the current
+    time in the browser. The element only changes with the time itself,
+    so pages and fragments containing it can be cached, and the date is
+    shown as is when JavaScript is disabled.
+    """
+    return format_html(
+        '<time datetime="{}" title="{}" data-relative-time>{}</time>',
+        value.isoformat(),
+        formats.date_format(timezone.localtime(value), "DATETIME_FORMAT"),
+        formats.date_format(timezone.localtime(value), "DATE_FORMAT"),
+    )
@@ -0,0 +1,53 @@
+from functools import cache
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from ludwig.base.bundles import get_bundle_path
+
+register = template.Library()
+
+
+@register.simple_tag
+def static_bundle(name):
+    """
+    Render the stylesheet links or deferred scripts of a static bundle.
+    With `settings.STATIC_BUNDLING` enabled a single minified bundle is
+    loaded, otherwise each source file is loaded separately so changes
+    show up without running `collectstatic`.
+    """
+    if settings.STATIC_BUNDLING:
+        paths = [get_bundle_path(name)]
+    else:
+        paths = settings.STATIC_BUNDLES[name]
+
+    if name.endswith(".css"):
+        html = '<link rel="stylesheet" href="{}">'
+    else:
+        html = '<script src="{}" defer></script>'
+
+    return format_html_join("\n", html, ((static(path),) for path in paths))
+
+
+@register.simple_tag
+def inline_static_bundle(name):
+    """
+    Render a CSS bundle inline, which saves a request for critical
+    styles that every page needs before it can render. Falls back to
+    `static_bundle` when bundling is disabled.
+    """
+    if not settings.STATIC_BUNDLING:
+        return static_bundle(name)
+
+    return format_html("<style>{}</style>", mark_safe(_read_bundle(name)))
+
+
+@cache
+def _read_bundle(name):
+    """Read the collected content of a bundle once per process."""
+    with staticfiles_storage.open(get_bundle_path(name)) as file:
+        return file.read().decode()
@@ -0,0 +1,195 @@
+import gzip
+import unittest
+import zlib
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ludwig.base.middleware import CompressionMiddleware, brotli
+
+CONTENT = b"<p>A dialogue post with some markdown.</p>\n" * 20
+
+
+@override_settings(
+    COMPRESSION_MIN_LENGTH=200,
+    COMPRESSION_GZIP_LEVEL=6,
+    COMPRESSION_BROTLI_QUALITY=5,
+    COMPRESSION_MAX_RANDOM_BYTES=100,
+)
+class CompressionMiddlewareTests(SimpleTestCase):
+    """
+    Testing suite for the `CompressionMiddleware`.
+
+    Tests included:
+        1. Responses are compressed with gzip
+        2. Brotli is preferred when accepted
+        3. Responses aren't compressed without a matching encoding
+        4. Tiny responses aren't compressed
+        5. Already encoded responses aren't compressed again
+        6. Accept-Encoding is added to existing vary headers
+        7. Strong ETags are weakened
+        8. Streaming responses are flushed per chunk
+        9. Async streaming responses are flushed per chunk
+        10. Gzip responses are padded to random lengths
+        11. Requests with a session cookie get gzip instead of Brotli
+    """
+
+    def setUp(self):
+        """
+        Initial setup for the testing suite.
+        """
+        self.factory = RequestFactory()
+
+    def _get_response(self, response, accept_encoding="gzip", cookies=None):
+        request = self.factory.get("/", headers={"accept-encoding": accept_encoding})
+        request.COOKIES.update(cookies or {})
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_gzip(self):
+        """
+        Responses should be compressed with gzip when the client accepts
+        gzip.
+        """
+        response = self._get_response(HttpResponse(CONTENT))
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertEqual(gzip.decompress(response.content), CONTENT)
+
+    @unittest.skipIf(brotli is None, "brotli isn't installed")
+    def test_brotli_preferred(self):
+        """
+        Responses should be compressed with Brotli when the client
+        accepts both Brotli and gzip.
+        """
+        response = self._get_response(HttpResponse(CONTENT), "gzip, deflate, br")
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.content), CONTENT)
+
+    def test_no_accepted_encoding(self):
+        """
+        Responses shouldn't be compressed when the client doesn't accept
+        a supported encoding, but should still vary on it.
+        """
+        for accept_encoding in ["", "identity", "gzip;q=0"]:
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self._get_response(HttpResponse(CONTENT), accept_encoding)
+
+                self.assertFalse(response.has_header("Content-Encoding"))
+                self.assertEqual(response.content, CONTENT)
+                self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_tiny_response(self):
+        """
+        Responses shorter than the minimum length, such as empty polling
+        updates, shouldn't be compressed.
+        """
+        response = self._get_response(HttpResponse(b"\n  \n"))
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertFalse(response.has_header("Vary"))
+
+    def test_already_encoded(self):
+        """
+        Responses that already have a content encoding shouldn't be
+        compressed again.
+        """
+        content = gzip.compress(CONTENT)
+        original = HttpResponse(content)
+        original["Content-Encoding"] = "gzip"
+        response = self._get_response(original)
+
+        self.assertEqual(response.content, content)
+
+    def test_vary_headers(self):
+        """
+        Accept-Encoding should be added to the existing vary headers.
+        """
+        original = HttpResponse(CONTENT)
+        original["Vary"] = "HX-Request"
+        response = self._get_response(original)
+
+        self.assertEqual(response["Vary"], "HX-Request, Accept-Encoding")
+
+    def test_weak_etag(self):
+        """
+        Strong ETags should be weakened on compressed responses.
+        """
+        original = HttpResponse(CONTENT)
+        original["ETag"] = '"abc"'
+        response = self._get_response(original)
+
+        self.assertEqual(response["ETag"], 'W/"abc"')
+
+    def test_streaming_flushed_per_chunk(self):
+        """
+        Every chunk of a streaming response, such as a server-sent event,
+        should be decompressible as soon as it's received.
+        """
+        events = [b"data: first\n\n", b"data: second\n\n"]
+        original = StreamingHttpResponse(iter(events), content_type="text/event-stream")
+        response = self._get_response(original)
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertFalse(response.has_header("Content-Length"))
+
+        decompressor = zlib.decompressobj(31)
+        chunks = iter(response.streaming_content)
+        for event in events:
+            self.assertEqual(decompressor.decompress(next(chunks)), event)
+
+        decompressor.decompress(b"".join(chunks))
+        self.assertTrue(decompressor.eof)
+
+    def test_async_streaming_flushed_per_chunk(self):
+        """
+        Every chunk of an async streaming response should be
+        decompressible as soon as it's received.
+        """
+        events = [b"data: first\n\n", b"data: second\n\n"]
+
+        async def stream():
+            for event in events:
+                yield event
+
+        original = StreamingHttpResponse(stream(), content_type="text/event-stream")
+        response = self._get_response(original)
+
+        async def read_chunks():
+            return [chunk async for chunk in response.streaming_content]
+
+        chunks = async_to_sync(read_chunks)()
+        decompressor = zlib.decompressobj(31)
+        for chunk, event in zip(chunks, events):
+            self.assertEqual(decompressor.decompress(chunk), event)
+
+    def test_gzip_padded(self):
+        """
+        Compressed responses to the same content should vary in length,
+        so that their lengths don't reveal secrets in them.
+        """
+        lengths = set()
+        for _ in range(10):
+            response = self._get_response(HttpResponse(CONTENT))
+            self.assertEqual(gzip.decompress(response.content), CONTENT)
+            lengths.add(len(response.content))
+
+        self.assertGreater(len(lengths), 1)
+
+    @unittest.skipIf(brotli is None, "brotli isn't installed")
+    def test_session_gzip(self):
+        """
+        Responses to requests with a session cookie should be compressed
+        with padded gzip rather than Brotli.
+        """
+        response = self._get_response(
+            HttpResponse(CONTENT),
+            "gzip, deflate, br",
+            cookies={settings.SESSION_COOKIE_NAME: "session"},
+        )
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), CONTENT)
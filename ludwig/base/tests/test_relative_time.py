@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+
+@override_settings(TIME_ZONE="UTC")
+class RelativeTimeTests(SimpleTestCase):
+    """
+    Testing suite for the `relative_time` template tag.
+
+    Tests included:
+        1. Times are rendered with their ISO 8601 timestamp
+        2. The date is shown for browsers without JavaScript
+    """
+
+    def setUp(self):
+        """
+        Initial setup for the testing suite.
+        """
+        self.template = Template("{% load relative_time %}{% relative_time value %}")
+        self.value = datetime(2025, 3, 14, 15, 9, 26, tzinfo=timezone.utc)
+
+    def test_iso_timestamp(self):
+        """
+        The time should be rendered as a `<time>` element with its ISO
+        8601 timestamp, for the script to format relative to now.
+        """
+        html = self.template.render(Context({"value": self.value}))
+
+        self.assertIn('datetime="2025-03-14T15:09:26+00:00"', html)
+        self.assertIn("data-relative-time", html)
+
+    def test_fallback_date(self):
+        """
+        The element should contain the date and have the full time as
+        its title, so it reads well without JavaScript.
+        """
+        html = self.template.render(Context({"value": self.value}))
+
+        self.assertIn(">March 14, 2025</time>", html)
+        self.assertIn('title="March 14, 2025, 3:09 p.m."', html)
@@ -0,0 +1,78 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from ludwig.base.singleflight import SingleFlight
+
+
+class SingleFlightTests(SimpleTestCase):
+    """
+    Testing suite for `SingleFlight`.
+
+    Tests included:
+        1. Concurrent calls with the same key share one call
+        2. Calls with different keys aren't shared
+        3. Calls after the shared call is done run again
+        4. Cancelling one caller doesn't cancel the shared call
+    """
+
+    def setUp(self):
+        """
+        Initial setup for the testing suite.
+        """
+        self.flight = SingleFlight()
+        self.calls = 0
+
+    async def _call(self, result="result"):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return result
+
+    async def test_concurrent_calls_shared(self):
+        """
+        Concurrent calls with the same key should run once and all get
+        the result, with every call but the first marked as shared.
+        """
+        results = await asyncio.gather(
+            *(self.flight.do("key", self._call) for _ in range(5))
+        )
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual([result for result, _ in results], ["result"] * 5)
+        self.assertEqual([shared for _, shared in results].count(False), 1)
+
+    async def test_different_keys(self):
+        """
+        Concurrent calls with different keys should each run.
+        """
+        await asyncio.gather(
+            self.flight.do("key1", self._call), self.flight.do("key2", self._call)
+        )
+
+        self.assertEqual(self.calls, 2)
+
+    async def test_sequential_calls(self):
+        """
+        A call made after the previous call with the same key is done
+        should run again.
+        """
+        await self.flight.do("key", self._call)
+        result, shared = await self.flight.do("key", self._call)
+
+        self.assertEqual(self.calls, 2)
+        self.assertFalse(shared)
+
+    async def test_cancelled_caller(self):
+        """
+        Cancelling the caller that started a call shouldn't cancel the
+        call for the other callers sharing it.
+        """
+        first = asyncio.ensure_future(self.flight.do("key", self._call))
+        second = asyncio.ensure_future(self.flight.do("key", self._call))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        result, shared = await second
+
+        self.assertEqual(result, "result")
+        self.assertTrue(shared)
@@ -0,0 +1,109 @@
+import tempfile
+import unittest
+from importlib.util import find_spec
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+
+class StaticBundleTagTests(SimpleTestCase):
+    """
+    Testing suite for the `static_bundle` template tag.
+
+    Tests included:
+        1. Source files are loaded separately without bundling
+        2. A single bundle is loaded with bundling
+        3. Stylesheets and scripts are rendered with matching elements
+    """
+
+    def _render(self, name):
+        return Template(
+            '{% load static_bundles %}{% static_bundle name %}'
+        ).render(Context({"name": name}))
+
+    @override_settings(STATIC_BUNDLING=False)
+    def test_sources_without_bundling(self):
+        """
+        Each source file of a bundle should be loaded separately when
+        bundling is disabled.
+        """
+        html = self._render("dialogue_detail.js")
+        for source in settings.STATIC_BUNDLES["dialogue_detail.js"]:
+            self.assertIn(source, html)
+        self.assertNotIn("bundles/", html)
+
+    @override_settings(STATIC_BUNDLING=True)
+    def test_single_bundle_with_bundling(self):
+        """
+        A single bundle file should be loaded when bundling is enabled.
+        """
+        html = self._render("dialogue_detail.js")
+        self.assertEqual(html.count("<script"), 1)
+        self.assertIn("bundles/dialogue_detail.js", html)
+
+    @override_settings(STATIC_BUNDLING=True)
+    def test_element_types(self):
+        """
+        CSS bundles should render stylesheet links and JavaScript
+        bundles should render deferred scripts.
+        """
+        self.assertIn('<link rel="stylesheet"', self._render("dashboard.css"))
+        self.assertIn("defer></script>", self._render("htmx.js"))
+
+
+@unittest.skipUnless(find_spec("whitenoise"), "requires production dependencies")
+class BundledStaticFilesStorageTests(SimpleTestCase):
+    """
+    Testing suite for BundledStaticFilesStorage.
+
+    Tests included:
+        1. Bundles are concatenated from their source files
+        2. Bundles are fingerprinted and precompressed
+    """
+
+    def setUp(self):
+        """
+        Collect static files into a temporary directory.
+        """
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        self.static_root = Path(static_root.name)
+
+        settings_override = override_settings(
+            STATIC_ROOT=self.static_root,
+            STORAGES={
+                **settings.STORAGES,
+                "staticfiles": {
+                    "BACKEND": "ludwig.base.storage.BundledStaticFilesStorage",
+                },
+            },
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        call_command("collectstatic", interactive=False, stdout=StringIO())
+
+    def test_bundle_concatenates_sources(self):
+        """
+        A bundle should contain the code of each of its source files.
+        """
+        bundle = (self.static_root / "bundles/dialogue_detail.js").read_text()
+        self.assertIn("setPostFormListeners", bundle)
+        self.assertIn("scrollIntoViewOnBoost", bundle)
+
+    def test_bundle_fingerprinted_and_compressed(self):
+        """
+        Bundles should have fingerprinted copies with gzip variants.
+        """
+        hashed_bundles = [
+            path.name
+            for path in (self.static_root / "bundles").iterdir()
+            if path.name.startswith("dialogue_detail.")
+        ]
+        self.assertTrue(
+            any(name.endswith(".js.gz") and name.count(".") == 3 for name in hashed_bundles)
+        )
@@ -2,4 +2,13 @@ from enum import StrEnum
 
 
 class TemplateName(StrEnum):
+    # full page templates
     DASHBOARD = "dashboard/dashboard.html"
+    INBOX = "dashboard/inbox.html"
+
+    # partial templates
+    ACTIVITY = "dashboard/partials/activity.html"
+
+
+# seconds between polls for new activity in the user's dialogues
+ACTIVITY_POLLING_INTERVAL = 30
@@ -4,7 +4,7 @@ from django.test import TestCase
 from django.test.client import Client
 from django.urls import reverse
 
-from ludwig.dialogues.models import Dialogue, Post
+from ludwig.dialogues.models import Dialogue, Post, ReadCursor
 
 from ..constants import TemplateName
 
@@ -21,6 +21,8 @@ class DashboardViewTest(TestCase):
         4. Posts should modify the order of the list of user dialogues
         5. Non-participant dialogues should not show up in list of user
            dialogues
+        6. Unread counts include posts by others after the read cursor
+        7. Viewing a dialogue marks its posts as read
     """
 
     def setUp(self):
@@ -219,3 +221,195 @@ class DashboardViewTest(TestCase):
             '<p class="dialogue-title">Secret dialogue</p>',
             dialogue_titles
         )
+
+    def test_unread_counts(self):
+        """
+        Unread counts should include posts by other participants after
+        the user's read cursor, and exclude the user's own posts.
+        """
+        self.client.post(self.login_url, self.good_login_credentials)
+
+        User = get_user_model()
+        other_user = User.objects.create_user(
+            username="testuser2",
+            email="testuser2@example.com",
+            password="testpassword456",
+        )
+        self.dialogue1.participants.add(other_user)
+
+        read_post = Post.objects.create(
+            dialogue=self.dialogue1, body="Read post", author=other_user
+        )
+        ReadCursor.objects.advance(self.test_user1, self.dialogue1, read_post.id)
+        for body in ("Unread post", "Another unread post"):
+            Post.objects.create(
+                dialogue=self.dialogue1, body=body, author=other_user
+            )
+        Post.objects.create(
+            dialogue=self.dialogue1, body="Own post", author=self.test_user1
+        )
+        Post.objects.create(
+            dialogue=self.dialogue2, body="Own post", author=self.test_user1
+        )
+
+        response = self.client.get(self.dashboard_url)
+        unread_counts = {
+            dialogue.id: dialogue.unread_count
+            for dialogue in response.context["user_dialogues"]
+        }
+        self.assertEqual(unread_counts[self.dialogue1.id], 2)
+        self.assertEqual(unread_counts[self.dialogue2.id], 0)
+        self.assertIn("2 unread", response.text)
+
+    def test_viewing_dialogue_marks_posts_read(self):
+        """
+        Viewing a dialogue should reset its unread count.
+        """
+        self.client.post(self.login_url, self.good_login_credentials)
+
+        User = get_user_model()
+        other_user = User.objects.create_user(
+            username="testuser2",
+            email="testuser2@example.com",
+            password="testpassword456",
+        )
+        self.dialogue1.participants.add(other_user)
+        Post.objects.create(
+            dialogue=self.dialogue1, body="Unread post", author=other_user
+        )
+
+        self.client.get(
+            reverse("dialogues:dialogue_detail", args=(self.dialogue1.slug,))
+        )
+        response = self.client.get(self.dashboard_url)
+        self.assertNotIn("unread", response.text)
+
+
+class DashboardActivityViewTest(TestCase):
+    """
+    Test suite for the dashboard activity view.
+
+    Tests included:
+        1. Redirect unauthenticated users to login page
+        2. Dialogues with new posts are marked as active
+        3. Dialogues without new posts are not marked as active
+        4. Non-participant dialogues are never marked as active
+        5. Activity of all dialogues is checked with one query per shard
+    """
+
+    def setUp(self):
+        """
+        Initial set up for the testing suite.
+        """
+        self.client = Client()
+
+        User = get_user_model()
+        self.test_user1 = User.objects.create_user(
+            username="testuser1",
+            email="testuser1@example.com",
+            password="testpassword123",
+        )
+        self.test_user2 = User.objects.create_user(
+            username="testuser2",
+            email="testuser2@example.com",
+            password="testpassword456",
+        )
+
+        self.dialogue1 = Dialogue.objects.create(
+            title="Dialogue #1",
+            author=self.test_user1
+        )
+        self.dialogue2 = Dialogue.objects.create(
+            title="Dialogue #2",
+            author=self.test_user1
+        )
+        self.other_user_dialogue = Dialogue.objects.create(
+            title="Secret dialogue",
+            author=self.test_user2
+        )
+
+        self.activity_url = reverse("dashboard:activity")
+
+    def _get_activity(self, known_last_ids):
+        """
+        Request activity for a mapping of dialogues to last post IDs.
+        """
+        return self.client.get(
+            self.activity_url,
+            {
+                "dialogue": [
+                    f"{dialogue.slug}:{last_id}"
+                    for dialogue, last_id in known_last_ids.items()
+                ]
+            }
+        )
+
+    def test_redirect_for_unauthenticated_user(self):
+        """
+        Unauthenticated users should be redirected to login page.
+        """
+        response = self.client.get(self.activity_url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_new_posts_marked_active(self):
+        """
+        Dialogues with posts newer than the known last post ID should
+        be marked as active.
+        """
+        self.client.force_login(self.test_user1)
+        post = Post.objects.create(
+            dialogue=self.dialogue1,
+            body="Test post",
+            author=self.test_user1
+        )
+        response = self._get_activity({self.dialogue1: post.id - 1})
+        self.assertEqual(
+            response.context["active_dialogue_slugs"], [self.dialogue1.slug]
+        )
+        self.assertIn(f'id="activity_{self.dialogue1.slug}"', response.text)
+
+    def test_known_posts_not_marked_active(self):
+        """
+        Dialogues without posts newer than the known last post ID
+        should not be marked as active.
+        """
+        self.client.force_login(self.test_user1)
+        post = Post.objects.create(
+            dialogue=self.dialogue1,
+            body="Test post",
+            author=self.test_user1
+        )
+        response = self._get_activity({self.dialogue1: post.id, self.dialogue2: 0})
+        self.assertEqual(response.context["active_dialogue_slugs"], [])
+
+    def test_nonparticipant_dialogues_not_marked_active(self):
+        """
+        Dialogues the user doesn't participate in should never be
+        marked as active.
+        """
+        self.client.force_login(self.test_user1)
+        Post.objects.create(
+            dialogue=self.other_user_dialogue,
+            body="Test post",
+            author=self.test_user2
+        )
+        response = self._get_activity({self.other_user_dialogue: 0})
+        self.assertEqual(response.context["active_dialogue_slugs"], [])
+
+    def test_single_query_for_all_dialogues(self):
+        """
+        Activity of every requested dialogue should be checked with a
+        single query of the shard of their posts, on top of the user
+        lookup and the lookup of the dialogues. The session is read from
+        the cache.
+        """
+        self.client.force_login(self.test_user1)
+        for dialogue in (self.dialogue1, self.dialogue2):
+            Post.objects.create(
+                dialogue=dialogue,
+                body="Test post",
+                author=self.test_user1
+            )
+        with self.assertNumQueries(3):
+            response = self._get_activity({self.dialogue1: 0, self.dialogue2: 0})
+        self.assertEqual(len(response.context["active_dialogue_slugs"]), 2)
@@ -1,7 +1,11 @@
 from django.urls import path
 
-from .views import DashboardView
+from .views import DashboardActivityView, DashboardView, InboxView
 
 app_name = "dashboard"
 
-urlpatterns = [path("", DashboardView.as_view(), name="home")]
+urlpatterns = [
+    path("", DashboardView.as_view(), name="home"),
+    path("activity/", DashboardActivityView.as_view(), name="activity"),
+    path("inbox/", InboxView.as_view(), name="inbox"),
+]
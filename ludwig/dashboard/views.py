@@ -1,12 +1,20 @@
+from functools import reduce
+from operator import or_
+from urllib.parse import urlencode
+
 from django.contrib.auth import get_user
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Max, query
+from django.db.models import Count, F, FilteredRelation, Max, Q, query
+from django.db.models.functions import Coalesce
 from django.db.models.query import Prefetch
 from django.views.generic.base import TemplateView
 
 from ludwig.accounts.models import User
+from ludwig.dialogues.inbox import get_inbox
+from ludwig.dialogues.models import Post
+from ludwig.dialogues.sharding import query_shards
 
-from .constants import TemplateName
+from .constants import ACTIVITY_POLLING_INTERVAL, TemplateName
 
 
 class DashboardView(LoginRequiredMixin, TemplateView):
@@ -17,15 +25,189 @@ class DashboardView(LoginRequiredMixin, TemplateView):
     template_name = TemplateName.DASHBOARD
 
     def _get_recent_user_dialogues(self):
-        """Get recent user dialogues, sorted by most recent post"""
+        """
+        Get recent user dialogues, sorted by most recent post, with the
+        number of posts by other users since the user's read cursor.
+        The read cursor is joined rather than queried per dialogue, and
+        the posts of all dialogues are aggregated with one query per
+        shard, run in parallel, and counted with another.
+        """
         user = get_user(self.request)
-        user_dialogues = user.dialogues.annotate(
-            latest_post_date=Max("posts__created_on")
-        ).order_by("-latest_post_date", "-created_on")
+        user_dialogues = list(
+            user.dialogues.annotate(
+                read_cursor=FilteredRelation(
+                    "read_cursors", condition=Q(read_cursors__user=user)
+                )
+            ).annotate(
+                last_read_post_id=Coalesce(F("read_cursor__last_read_post_id"), 0)
+            )
+        )
+        last_read_post_ids = {
+            dialogue.id: dialogue.last_read_post_id for dialogue in user_dialogues
+        }
+
+        def aggregate_posts(shard, dialogue_ids):
+            posts = Post.objects.using(shard)
+            latest_posts = (
+                posts.filter(dialogue_id__in=dialogue_ids)
+                .values("dialogue_id")
+                .annotate(latest_post_date=Max("created_on"), last_post_id=Max("id"))
+                .values_list("dialogue_id", "latest_post_date", "last_post_id")
+                .order_by()
+            )
+
+            # only the posts after the read cursor of each dialogue are
+            # counted, so the index on the dialogue and ID of posts is
+            # range scanned instead of every post being counted
+            after_read_cursors = reduce(
+                or_,
+                (
+                    Q(dialogue_id=dialogue_id, id__gt=last_read_post_ids[dialogue_id])
+                    for dialogue_id in dialogue_ids
+                ),
+            )
+            unread_counts = dict(
+                posts.filter(after_read_cursors)
+                .exclude(author=user)
+                .values("dialogue_id")
+                .annotate(unread_count=Count("id"))
+                .values_list("dialogue_id", "unread_count")
+                .order_by()
+            )
+
+            return [
+                (dialogue_id, *values, unread_counts.get(dialogue_id, 0))
+                for dialogue_id, *values in latest_posts
+            ]
+
+        aggregates = {
+            dialogue_id: values
+            for dialogue_id, *values in query_shards(user_dialogues, aggregate_posts)
+        }
+        for dialogue in user_dialogues:
+            (
+                dialogue.latest_post_date,
+                dialogue.last_post_id,
+                dialogue.unread_count,
+            ) = aggregates.get(dialogue.id, (None, None, 0))
+
+        # dialogues without posts come first, then the ones with the
+        # latest posts, each by creation time
+        user_dialogues.sort(
+            key=lambda dialogue: (
+                dialogue.latest_post_date is None,
+                dialogue.latest_post_date or dialogue.created_on,
+                dialogue.created_on,
+            ),
+            reverse=True,
+        )
         return user_dialogues
 
+    def _get_activity_query(self, user_dialogues):
+        """
+        Encode the slug of each dialogue with the ID of its last post, so
+        the activity endpoint can tell which dialogues have new posts.
+        """
+        return urlencode(
+            [
+                ("dialogue", f"{dialogue.slug}:{dialogue.last_post_id or 0}")
+                for dialogue in user_dialogues
+            ]
+        )
+
     def get_context_data(self, **kwargs):
         """Add user's recent dialogues to the view context"""
         context = super().get_context_data(**kwargs)
-        context["user_dialogues"] = self._get_recent_user_dialogues()
+        user_dialogues = self._get_recent_user_dialogues()
+        context.update(
+            {
+                "user_dialogues": user_dialogues,
+                "activity_query": self._get_activity_query(user_dialogues),
+                "activity_polling_interval": ACTIVITY_POLLING_INTERVAL,
+            }
+        )
+        return context
+
+
+class DashboardActivityView(LoginRequiredMixin, TemplateView):
+    """
+    Mark the user's dialogues that have new posts since the dashboard
+    was loaded. The dashboard polls this view once for all of its
+    dialogues, which are checked with a single grouped query per shard.
+    """
+
+    template_name = TemplateName.ACTIVITY
+
+    def _get_known_last_ids(self):
+        """
+        Get a mapping of dialogue slugs to the last post ID known to the
+        dashboard from the `dialogue` request parameters, each formatted
+        as `<slug>:<last_post_id>`. Malformed values are ignored.
+        """
+        known_last_ids = {}
+
+        for value in self.request.GET.getlist("dialogue"):
+            slug, _, last_id = value.partition(":")
+            try:
+                known_last_ids[slug] = int(last_id)
+            except ValueError:
+                continue
+
+        return known_last_ids
+
+    def get_context_data(self, **kwargs):
+        """Pass the slugs of dialogues with new posts to context data."""
+        context = super().get_context_data(**kwargs)
+        known_last_ids = self._get_known_last_ids()
+
+        # get the last post ID of each requested dialogue that the
+        # user participates in, using the user already loaded by the
+        # auth middleware to save a query on this polled view
+        dialogues = self.request.user.dialogues.filter(slug__in=known_last_ids)
+        dialogues = dialogues.only("id", "slug", "shard")
+        slugs = {dialogue.id: dialogue.slug for dialogue in dialogues}
+
+        def get_last_ids(shard, dialogue_ids):
+            return (
+                Post.objects.using(shard)
+                .filter(dialogue_id__in=dialogue_ids)
+                .values("dialogue_id")
+                .annotate(last_post_id=Max("id"))
+                .values_list("dialogue_id", "last_post_id")
+                .order_by()
+            )
+
+        last_ids = [
+            (slugs[dialogue_id], last_post_id)
+            for dialogue_id, last_post_id in query_shards(dialogues, get_last_ids)
+        ]
+
+        context["active_dialogue_slugs"] = [
+            slug
+            for slug, last_post_id in last_ids
+            if last_post_id > known_last_ids[slug]
+        ]
+        return context
+
+
+class InboxView(LoginRequiredMixin, TemplateView):
+    """
+    Display the newest posts in the dialogues the user is subscribed to,
+    a page at a time. Pages are keyed by the ID of the last post on the
+    previous page, passed as the `before` parameter.
+    """
+
+    template_name = TemplateName.INBOX
+
+    def get_context_data(self, **kwargs):
+        """Pass a page of the user's inbox to context data."""
+        context = super().get_context_data(**kwargs)
+
+        try:
+            before = int(self.request.GET["before"])
+        except (KeyError, ValueError):
+            before = None
+
+        posts, next_before = get_inbox(self.request.user, before=before)
+        context.update({"posts": posts, "next_before": next_before})
         return context
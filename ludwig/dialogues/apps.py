@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DialoguesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "ludwig.dialogues"
+
+    def ready(self):
+        from . import signals  # noqa: F401
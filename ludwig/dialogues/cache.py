@@ -0,0 +1,114 @@
+"""
+Versioned cache keys for data derived from a dialogue.
+
+Every dialogue has a version number stored in the cache, and the keys
+of all cached data derived from the dialogue include it. Bumping the
+version when the dialogue changes invalidates all of that data at once,
+without having to know which keys exist. Entries stored under an old
+version are never read again and expire or get evicted on their own.
+
+Versions start from the current time in nanoseconds instead of zero, so
+if a version is evicted, the version that replaces it doesn't collide
+with one that was used before.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .constants import DIALOGUE_CACHE_TIMEOUT
+
+
+def _get_version_key(dialogue_id):
+    return f"dialogue_version:{dialogue_id}"
+
+
+def get_dialogue_version(dialogue_id):
+    """Get the current cache version of a dialogue."""
+
+    key = _get_version_key(dialogue_id)
+    version = cache.get(key)
+
+    if version is None:
+        # another process may set the version at the same time, so
+        # only add it if it's still missing and read back the winner
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+
+    return version
+
+
+async def aget_dialogue_version(dialogue_id):
+    """Get the current cache version of a dialogue."""
+
+    key = _get_version_key(dialogue_id)
+    version = await cache.aget(key)
+
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key)
+
+    return version
+
+
+def bump_dialogue_version(dialogue_id):
+    """
+    Invalidate all cached data of a dialogue. The version is bumped
+    right away and again when the current transaction commits, so data
+    cached from a read between the change and the commit is dropped too.
+    """
+
+    key = _get_version_key(dialogue_id)
+
+    def bump():
+        # a new timestamp instead of incrementing the version keeps two
+        # concurrent bumps from ending up with the same version
+        cache.set(key, time.time_ns(), timeout=None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def make_dialogue_key(dialogue_id, name, version):
+    """Make the cache key of data derived from a dialogue."""
+
+    return f"dialogue:{dialogue_id}:{version}:{name}"
+
+
+def get_or_set_dialogue_data(
+    dialogue_id, name, default, timeout=DIALOGUE_CACHE_TIMEOUT
+):
+    """
+    Get cached data of a dialogue, or cache the value returned by the
+    `default` callable under the current version of the dialogue.
+    """
+
+    key = make_dialogue_key(dialogue_id, name, get_dialogue_version(dialogue_id))
+    value = cache.get(key)
+
+    if value is None:
+        value = default()
+        cache.set(key, value, timeout)
+
+    return value
+
+
+async def aget_or_set_dialogue_data(
+    dialogue_id, name, default, timeout=DIALOGUE_CACHE_TIMEOUT
+):
+    """
+    Get cached data of a dialogue, or cache the value returned by
+    awaiting the `default` coroutine function under the current version
+    of the dialogue.
+    """
+
+    version = await aget_dialogue_version(dialogue_id)
+    key = make_dialogue_key(dialogue_id, name, version)
+    value = await cache.aget(key)
+
+    if value is None:
+        value = await default()
+        await cache.aset(key, value, timeout)
+
+    return value
@@ -0,0 +1,131 @@
+"""
+Incremental sync of dialogues from their change log.
+
+Every insert, edit and deletion of a post is appended to the change log
+of its dialogue with the next number of the dialogue's sequence. A
+client keeps the number of the last change it has applied, and syncs by
+loading the changes after it, so catching up costs as much as the
+number of changes rather than the size of the dialogue. Changes are
+collapsed per post before the posts are loaded, so a post that was
+edited several times is only loaded once, and a post that was added
+and deleted since the last sync isn't sent at all.
+"""
+
+from .models import PostChange
+
+
+def make_changes(seq, new_posts=(), edited_posts=(), deleted_post_ids=()):
+    """
+    Make the changes to a dialogue up to `seq`, keyed as they're passed
+    to the update templates.
+    """
+
+    return {
+        "seq": seq,
+        "new_posts": list(new_posts),
+        "edited_posts": list(edited_posts),
+        "deleted_post_ids": list(deleted_post_ids),
+    }
+
+
+def collapse_changes(changes):
+    """
+    Reduce `(post_id, kind)` changes, in sequence order, to the last
+    kind of change of each post. Edits of posts added in the same span
+    stay inserts, and posts added and deleted in the same span are left
+    out, since the client never had them.
+    """
+
+    kinds = {}
+
+    for post_id, kind in changes:
+        previous = kinds.get(post_id)
+
+        if kind == PostChange.Kind.DELETE and previous == PostChange.Kind.INSERT:
+            del kinds[post_id]
+        elif kind != PostChange.Kind.EDIT or previous is None:
+            kinds[post_id] = kind
+
+    return kinds
+
+
+def _get_change_log(dialogue, seq):
+    return (
+        dialogue.changes.filter(seq__gt=seq)
+        .order_by("seq")
+        .values_list("seq", "post_id", "kind")
+    )
+
+
+def _get_changed_posts(dialogue, post_ids):
+    return dialogue.posts.filter(id__in=post_ids).with_authors().order_by("id")
+
+
+def _sort_changes(seq, kinds, posts):
+    """Sort the changed posts into new and edited ones."""
+
+    return make_changes(
+        seq,
+        new_posts=[post for post in posts if kinds[post.id] == PostChange.Kind.INSERT],
+        edited_posts=[post for post in posts if kinds[post.id] == PostChange.Kind.EDIT],
+        deleted_post_ids=sorted(
+            post_id for post_id, kind in kinds.items() if kind == PostChange.Kind.DELETE
+        ),
+    )
+
+
+def get_changes_since(dialogue, seq):
+    """Get the changes to the posts of a dialogue after `seq`."""
+
+    log = list(_get_change_log(dialogue, seq))
+
+    if not log:
+        return make_changes(seq)
+
+    kinds = collapse_changes((post_id, kind) for _, post_id, kind in log)
+    changed_ids = [
+        post_id for post_id, kind in kinds.items() if kind != PostChange.Kind.DELETE
+    ]
+    posts = list(_get_changed_posts(dialogue, changed_ids)) if changed_ids else []
+
+    return _sort_changes(log[-1][0], kinds, posts)
+
+
+async def aget_changes_since(dialogue, seq):
+    """
+    Get the changes to the posts of a dialogue after `seq`. The posts
+    are loaded here since templates can't run database queries from an
+    async context.
+    """
+
+    log = [change async for change in _get_change_log(dialogue, seq)]
+
+    if not log:
+        return make_changes(seq)
+
+    kinds = collapse_changes((post_id, kind) for _, post_id, kind in log)
+    changed_ids = [
+        post_id for post_id, kind in kinds.items() if kind != PostChange.Kind.DELETE
+    ]
+    posts = (
+        [post async for post in _get_changed_posts(dialogue, changed_ids)]
+        if changed_ids
+        else []
+    )
+
+    return _sort_changes(log[-1][0], kinds, posts)
+
+
+def get_posts_at(dialogue, seq):
+    """
+    Get the posts of a dialogue as of its change `seq`, which is read
+    before the posts. Posts added after it are left out, so they're sent
+    with the next sync rather than twice. Edits and deletions after it
+    may already show, and applying them again is harmless.
+    """
+
+    later_inserts = dialogue.changes.filter(
+        seq__gt=seq, kind=PostChange.Kind.INSERT
+    ).values("post_id")
+
+    return dialogue.posts.exclude(id__in=later_inserts).with_authors().order_by("id")
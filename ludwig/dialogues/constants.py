@@ -5,6 +5,7 @@ class TemplateName(StrEnum):
     # full page templates
     CREATE_DIALOGUE = "dialogues/create_dialogue.html"
     DIALOGUE_DETAIL = "dialogues/dialogue_detail.html"
+    DISCOVER = "dialogues/discover.html"
 
     # partial templates
     PERMISSION_DENIED = "dialogues/partials/403.html"
@@ -12,5 +13,87 @@ class TemplateName(StrEnum):
     DIALOGUE_DETAIL_UPDATE = "dialogues/partials/update.html"
     POST_DETAIL = "dialogues/partials/post_detail.html"
     POST_FORM = "dialogues/partials/post_form.html"
+    SUBSCRIPTION = "dialogues/partials/subscription.html"
     TOGGLE_VISIBILITY = "dialogues/partials/toggle_visibility.html"
     USER_SEARCH_RESULTS = "dialogues/partials/user_search_results.html"
+
+
+# steps of the dialogue polling interval in seconds, so that the interval
+# of a dialogue doesn't change, and its polling element isn't re-rendered,
+# until its inactivity reaches the next step
+POLLING_INTERVALS = (1, 2, 5, 10, 30, 60)
+MIN_POLLING_INTERVAL = POLLING_INTERVALS[0]
+MAX_POLLING_INTERVAL = POLLING_INTERVALS[-1]
+
+# seconds of dialogue inactivity per second of polling interval
+POLLING_INACTIVITY_RATIO = 10
+
+# minimum seconds between read cursor writes per user and dialogue
+READ_CURSOR_WRITE_INTERVAL = 30
+
+# seconds to keep read cursor advances that are held back by the write
+# interval in the cache, long enough to outlast a backlog of jobs
+READ_CURSOR_PENDING_TIMEOUT = 60 * 60
+
+# days without posts after which public dialogues are served from a
+# static snapshot
+SNAPSHOT_DORMANT_DAYS = 90
+
+# seconds to keep data derived from a dialogue in the cache, entries are
+# invalidated by a version bump whenever the dialogue changes
+DIALOGUE_CACHE_TIMEOUT = 60 * 60
+
+# seconds to keep rendered poll results, long enough to answer polls that
+# arrive just after an identical one, and short enough for the polling
+# interval to follow the inactivity of the dialogue
+POLL_RESULT_CACHE_TIMEOUT = 2
+
+# maximum number of rows removed per statement when purging deleted
+# dialogues and users
+PURGE_BATCH_SIZE = 1000
+
+# number of subscribers above which a dialogue's posts are merged into
+# inboxes when they're read, instead of being added to every inbox
+FAN_OUT_LIMIT = 1000
+
+# maximum number of inbox rows inserted per statement
+FAN_OUT_BATCH_SIZE = 1000
+
+# number of posts per page of the inbox
+INBOX_PAGE_SIZE = 30
+
+# seconds between refreshes of the dialogue rankings of the discovery
+# page, which is also how long its pages are cached
+RANKING_REFRESH_INTERVAL = 5 * 60
+
+# days of posts that count towards the activity of a dialogue
+RANKING_WINDOW_DAYS = 7
+
+# seconds between flushes of the views counted in the cache to the
+# dialogues, which is also the length of the windows views are counted in
+VIEW_FLUSH_INTERVAL = 60
+
+# number of dialogues whose counted views are read from the cache at a
+# time when they're flushed
+VIEW_FLUSH_BATCH_SIZE = 1000
+
+# seconds the views counted in a window are kept in the cache, after
+# which they're dropped if no worker has flushed them
+VIEW_COUNT_TIMEOUT = 60 * 60
+
+# number of views that weigh as much as a recent post in the ranking
+VIEWS_PER_POST = 10
+
+# exponent of the hours since the last post by which scores decay
+RANKING_GRAVITY = 1.5
+
+# number of dialogues per page of the discovery page
+DISCOVER_PAGE_SIZE = 20
+
+# number of post rows fetched from the database at a time while a
+# dialogue page is rendered
+POST_ROW_CHUNK_SIZE = 500
+
+# maximum number of posts or change log entries copied per statement
+# when a dialogue is moved to another shard
+REBALANCE_BATCH_SIZE = 1000
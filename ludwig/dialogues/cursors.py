@@ -0,0 +1,72 @@
+"""
+Throttled writes of read cursors from polls.
+
+Polls of a live dialogue would advance the read cursor of every viewer
+about once a second, so the cursor of a user in a dialogue is written
+at most once every `READ_CURSOR_WRITE_INTERVAL` seconds. The first
+advance in an interval is written right away, while later ones are held
+back in the cache, and the highest of them is written by a job once the
+interval has passed, so posts read at the end of an interval are never
+left unread.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from .constants import READ_CURSOR_PENDING_TIMEOUT, READ_CURSOR_WRITE_INTERVAL
+from .models import Dialogue, ReadCursor
+
+
+def _get_pending_key(user_id, dialogue_id):
+    return f"read_cursor_pending:{user_id}:{dialogue_id}"
+
+
+async def advance_read_cursor(user, dialogue, post_id):
+    """
+    Advance the read cursor of an authenticated user from a polling
+    request, or hold the advance back until the current interval of
+    the cursor has passed.
+    """
+    # imported here since the jobs module imports this one
+    from .jobs import write_read_cursor
+
+    if not user.is_authenticated:
+        return
+
+    throttle_key = f"read_cursor:{user.id}:{dialogue.id}"
+
+    if await cache.aadd(throttle_key, True, READ_CURSOR_WRITE_INTERVAL):
+        await ReadCursor.objects.aadvance(user, dialogue, post_id)
+        return
+
+    pending_key = _get_pending_key(user.id, dialogue.id)
+    pending_post_id = await cache.aget(pending_key)
+
+    if pending_post_id is None or pending_post_id < post_id:
+        await cache.aset(pending_key, post_id, READ_CURSOR_PENDING_TIMEOUT)
+
+    # a single write is scheduled for the advances of an interval
+    scheduled_key = f"read_cursor_scheduled:{user.id}:{dialogue.id}"
+
+    if await cache.aadd(scheduled_key, True, READ_CURSOR_WRITE_INTERVAL):
+        await sync_to_async(write_read_cursor.enqueue)(
+            delay=READ_CURSOR_WRITE_INTERVAL,
+            user_id=user.id,
+            dialogue_id=dialogue.id,
+        )
+
+
+def write_pending_read_cursor(user_id, dialogue_id):
+    """Write the highest advance of a read cursor that was held back."""
+    post_id = cache.get(_get_pending_key(user_id, dialogue_id))
+
+    if post_id is None:
+        return
+
+    # the user or dialogue may have been deleted in the meantime
+    user = get_user_model().objects.filter(id=user_id).first()
+    dialogue = Dialogue.objects.filter(id=dialogue_id).first()
+
+    if user is not None and dialogue is not None:
+        ReadCursor.objects.advance(user, dialogue, post_id)
@@ -0,0 +1,108 @@
+"""
+Inboxes of the posts in the dialogues a user is subscribed to.
+
+Posts are fanned out on write: a background job adds a row to the inbox
+of every subscriber, so reading an inbox is a single range scan over
+the user's rows, however many dialogues they follow. Dialogues with more
+than `FAN_OUT_LIMIT` subscribers would write too many rows per post, so
+their posts are fanned out on read instead, by merging the latest posts
+of those dialogues into the inbox when it's read.
+"""
+
+from .constants import FAN_OUT_BATCH_SIZE, FAN_OUT_LIMIT, INBOX_PAGE_SIZE
+from .models import Dialogue, InboxEntry, Post, Subscription
+from .sharding import query_shards
+
+
+def is_fanned_out_on_write(dialogue):
+    """Check if posts in a dialogue are added to subscriber inboxes."""
+    return 0 < dialogue.subscriber_count <= FAN_OUT_LIMIT
+
+
+def fan_out_post(post):
+    """
+    Add a post to the inbox of every subscriber of its dialogue, except
+    its author, in batches of `FAN_OUT_BATCH_SIZE` rows. Posts that are
+    already in an inbox are skipped, so a retried fan-out only adds the
+    missing rows.
+    """
+    subscriber_ids = (
+        Subscription.objects.filter(dialogue_id=post.dialogue_id)
+        .exclude(user_id=post.author_id)
+        .values_list("user_id", flat=True)
+        .order_by("user_id")
+    )
+
+    batch = []
+    for user_id in subscriber_ids.iterator(chunk_size=FAN_OUT_BATCH_SIZE):
+        batch.append(
+            InboxEntry(
+                user_id=user_id,
+                dialogue_id=post.dialogue_id,
+                post_id=post.id,
+                created_on=post.created_on,
+            )
+        )
+
+        if len(batch) == FAN_OUT_BATCH_SIZE:
+            InboxEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+
+    if batch:
+        InboxEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def get_inbox(user, before=None, limit=INBOX_PAGE_SIZE):
+    """
+    Get the newest `limit` posts in the dialogues a user is subscribed
+    to, with IDs below `before` if given, newest first. Returns the
+    posts and the `before` value of the next page, or None if this is
+    the last page.
+    """
+    entries = InboxEntry.objects.filter(user=user)
+    popular_dialogues = Dialogue.objects.filter(
+        subscriptions__user=user, subscriber_count__gt=FAN_OUT_LIMIT
+    ).only("id", "shard")
+
+    if before is not None:
+        entries = entries.filter(post_id__lt=before)
+
+    def get_popular_posts(shard, dialogue_ids):
+        posts = (
+            Post.objects.using(shard)
+            .filter(dialogue_id__in=dialogue_ids)
+            .exclude(author=user)
+        )
+        if before is not None:
+            posts = posts.filter(id__lt=before)
+        return posts.order_by("-id").values_list("id", "dialogue_id")[:limit]
+
+    # the dialogue of each post, which tells the shard it's on
+    post_dialogue_ids = dict(
+        [
+            *entries.order_by("-post_id").values_list("post_id", "dialogue_id")[:limit],
+            *query_shards(popular_dialogues, get_popular_posts),
+        ]
+    )
+    page_ids = sorted(post_dialogue_ids, reverse=True)[:limit]
+
+    # dialogues may have been hidden or deleted since the posts were
+    # fanned out
+    dialogues = Dialogue.objects.filter(
+        id__in={post_dialogue_ids[post_id] for post_id in page_ids},
+        is_visible=True,
+    ).in_bulk()
+
+    def get_posts(shard, dialogue_ids):
+        return (
+            Post.objects.using(shard)
+            .filter(id__in=page_ids, dialogue_id__in=dialogue_ids)
+            .with_authors()
+        )
+
+    posts = query_shards(dialogues.values(), get_posts)
+    for post in posts:
+        post.dialogue = dialogues[post.dialogue_id]
+    posts.sort(key=lambda post: post.id, reverse=True)
+
+    return posts, page_ids[-1] if len(page_ids) == limit else None
@@ -0,0 +1,53 @@
+from django.core.management import call_command
+
+from ludwig.jobs.registry import job
+
+from . import inbox
+from .constants import RANKING_REFRESH_INTERVAL, VIEW_FLUSH_INTERVAL
+from .cursors import write_pending_read_cursor
+from .models import Dialogue, Post
+from .ranking import flush_views, refresh_rankings
+
+
+@job()
+def fan_out_post(post_id, dialogue_id=None):
+    """Add a new post to the inboxes of its dialogue's subscribers."""
+    # posts are looked up on the shard of their dialogue, jobs enqueued
+    # without the dialogue only ever had the default database
+    dialogue = Dialogue.all_objects.filter(id=dialogue_id).first()
+    posts = dialogue.posts if dialogue is not None else Post.objects
+    post = posts.filter(id=post_id).first()
+
+    # the post is gone if its dialogue was purged in the meantime
+    if post is not None:
+        inbox.fan_out_post(post)
+
+
+@job()
+def write_read_cursor(user_id, dialogue_id):
+    """Write the advance of a read cursor held back by its interval."""
+    write_pending_read_cursor(user_id, dialogue_id)
+
+
+@job(every=60 * 60)
+def purge_deleted():
+    """Purge soft-deleted dialogues and users."""
+    call_command("purge_deleted")
+
+
+@job(every=24 * 60 * 60)
+def snapshot_dormant_dialogues():
+    """Render snapshots of public dialogues that have gone dormant."""
+    call_command("snapshot_dormant_dialogues")
+
+
+@job(every=RANKING_REFRESH_INTERVAL)
+def refresh_dialogue_rankings():
+    """Rank public dialogues for the discovery page."""
+    refresh_rankings()
+
+
+@job(every=VIEW_FLUSH_INTERVAL)
+def flush_dialogue_views():
+    """Add the views of dialogue pages counted in the cache to them."""
+    flush_views()
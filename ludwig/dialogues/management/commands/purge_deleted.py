@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from ludwig.dialogues.constants import PURGE_BATCH_SIZE
+from ludwig.dialogues.models import Dialogue
+from ludwig.dialogues.purge import purge_dialogue, purge_user
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove soft-deleted dialogues and users along with their posts in "
+        "batches. An interrupted purge continues where it stopped when the "
+        "command is run again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=PURGE_BATCH_SIZE,
+            help="Maximum number of rows removed per statement.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Seconds to pause between batches.",
+        )
+
+    def handle(self, *args, **options):
+        purge_options = {
+            "batch_size": options["batch_size"],
+            "pause": options["pause"],
+            "progress": self._report_progress,
+        }
+
+        dialogues = list(
+            Dialogue.all_objects.filter(deleted_on__isnull=False).order_by("deleted_on")
+        )
+        for dialogue in dialogues:
+            self.stdout.write(f"Purging dialogue {dialogue.id}")
+            purge_dialogue(dialogue, **purge_options)
+
+        users = list(
+            get_user_model()
+            .objects.filter(deleted_on__isnull=False)
+            .order_by("deleted_on")
+        )
+        for user in users:
+            self.stdout.write(f"Purging user {user.id}")
+            purge_user(user, **purge_options)
+
+        self.stdout.write(
+            f"Purged {len(dialogues)} dialogue(s) and {len(users)} user(s)."
+        )
+
+    def _report_progress(self, model, deleted):
+        """Report the number of rows of a model deleted so far."""
+        self.stdout.write(f"  {deleted} {model._meta.verbose_name_plural} deleted")
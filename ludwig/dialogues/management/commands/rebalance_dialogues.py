@@ -0,0 +1,153 @@
+from itertools import batched
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from ludwig.dialogues.constants import REBALANCE_BATCH_SIZE
+from ludwig.dialogues.models import Dialogue, Post, PostChange
+from ludwig.dialogues.purge import delete_in_batches
+from ludwig.dialogues.sharding import get_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the posts and change logs of dialogues to the shards that "
+        "DIALOGUE_SHARDS places them on, after shards were added or retired. "
+        "Posting to a dialogue fails while it's moved. An interrupted run "
+        "continues where it stopped when the command is run again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=REBALANCE_BATCH_SIZE,
+            help="Maximum number of rows copied or removed per statement.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only list the dialogues that would be moved.",
+        )
+        parser.add_argument(
+            "--clean",
+            action="store_true",
+            help="Also remove rows left behind on shards by interrupted moves.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        # soft-deleted dialogues are moved too, so that retired shards
+        # are emptied before their purge
+        misplaced = []
+        dialogues = Dialogue.all_objects.values_list("id", "slug", "shard")
+        for dialogue_id, slug, shard in dialogues.iterator():
+            target = get_shard(slug)
+            if target != shard:
+                misplaced.append((dialogue_id, shard, target))
+
+        for dialogue_id, source, target in misplaced:
+            if options["dry_run"]:
+                self.stdout.write(
+                    f"Would move dialogue {dialogue_id} from {source} to {target}"
+                )
+                continue
+
+            self.stdout.write(
+                f"Moving dialogue {dialogue_id} from {source} to {target}"
+            )
+            self._move(dialogue_id, target, batch_size)
+
+        # leftovers may be on any database, including retired shards
+        if options["clean"] and not options["dry_run"]:
+            for shard in connections:
+                self._clean(shard, batch_size)
+
+        if not options["dry_run"]:
+            self.stdout.write(f"Moved {len(misplaced)} dialogue(s).")
+
+    def _move(self, dialogue_id, target, batch_size):
+        """
+        Copy the posts and change log of a dialogue to the shard `target`
+        and point the dialogue at it, then delete them from its old
+        shard. The dialogue stays locked while it's copied, so posts
+        that are written meanwhile wait, and fail once it's moved.
+        """
+        with transaction.atomic():
+            source = (
+                Dialogue.all_objects.select_for_update()
+                .filter(id=dialogue_id)
+                .values_list("shard", flat=True)
+                .get()
+            )
+            if source == target:
+                return
+
+            with transaction.atomic(using=target):
+                # rows copied by a move that was interrupted before it
+                # was committed on the default database
+                self._delete(dialogue_id, target, batch_size)
+
+                posts = (
+                    Post.objects.using(source)
+                    .filter(dialogue_id=dialogue_id)
+                    .order_by("id")
+                    .iterator(chunk_size=batch_size)
+                )
+                for batch in batched(posts, batch_size):
+                    Post.objects.using(target).bulk_create(batch)
+
+                # entries of the change log get new IDs on the target,
+                # they are only ordered by their sequence numbers
+                changes = (
+                    PostChange.objects.using(source)
+                    .filter(dialogue_id=dialogue_id)
+                    .order_by("seq")
+                    .iterator(chunk_size=batch_size)
+                )
+                for batch in batched(changes, batch_size):
+                    for change in batch:
+                        change.pk = None
+                    PostChange.objects.using(target).bulk_create(batch)
+
+                Dialogue.all_objects.filter(id=dialogue_id).update(shard=target)
+
+        self._delete(dialogue_id, source, batch_size)
+
+    def _clean(self, shard, batch_size):
+        """
+        Delete the posts and change logs of dialogues that aren't placed
+        on `shard`, left behind by moves that were interrupted.
+        """
+        dialogue_ids = set()
+        for model in (Post, PostChange):
+            dialogue_ids.update(
+                model.objects.using(shard)
+                .values_list("dialogue_id", flat=True)
+                .order_by()
+                .distinct()
+            )
+
+        for dialogue_id in sorted(dialogue_ids):
+            # a move to this shard may be about to commit, which the
+            # lock of the dialogue waits for
+            with transaction.atomic():
+                current_shard = (
+                    Dialogue.all_objects.select_for_update()
+                    .filter(id=dialogue_id)
+                    .values_list("shard", flat=True)
+                    .first()
+                )
+                if current_shard == shard:
+                    continue
+
+                self.stdout.write(f"Removing dialogue {dialogue_id} from {shard}")
+                self._delete(dialogue_id, shard, batch_size)
+
+    def _delete(self, dialogue_id, shard, batch_size):
+        """Delete the posts and change log of a dialogue from a shard."""
+        for model in (Post, PostChange):
+            delete_in_batches(
+                model, "dialogue_id", dialogue_id, batch_size=batch_size, using=shard
+            )
@@ -0,0 +1,97 @@
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+
+from ludwig.dialogues.constants import SNAPSHOT_DORMANT_DAYS
+from ludwig.dialogues.models import Dialogue, Post
+from ludwig.dialogues.sharding import query_shards
+from ludwig.dialogues.snapshots import delete_snapshot, get_snapshot_path, write_snapshot
+from ludwig.dialogues.views import DialogueDetailView
+
+
+class Command(BaseCommand):
+    help = (
+        "Render public dialogues without recent posts to static snapshots "
+        "that are served to anonymous visitors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=SNAPSHOT_DORMANT_DAYS,
+            help="Days without posts after which a dialogue is dormant.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+
+        # dialogues created before the cutoff, whose last posts are
+        # looked up on their shards
+        dialogues = list(
+            self._get_candidates(cutoff).only("id", "slug", "shard", "created_on")
+        )
+        last_post_on = dict(query_shards(dialogues, self._get_last_post_on))
+
+        created = 0
+        for dialogue in dialogues:
+            slug = dialogue.slug
+            if last_post_on.get(dialogue.id, dialogue.created_on) >= cutoff:
+                continue
+            if get_snapshot_path(slug).exists():
+                continue
+
+            write_snapshot(slug, self._render(slug))
+
+            # drop the snapshot if the dialogue changed while rendering,
+            # since the signal that would drop it may have already fired
+            if not self._is_dormant(dialogue.id, cutoff):
+                delete_snapshot(slug)
+                continue
+
+            created += 1
+
+        self.stdout.write(f"Created {created} dialogue snapshot(s).")
+
+    def _get_candidates(self, cutoff):
+        # open dialogues are excluded since their post form, including
+        # its CSRF token, is rendered for anonymous visitors
+        return Dialogue.objects.filter(
+            is_visible=True, is_open=False, created_on__lt=cutoff
+        )
+
+    def _get_last_post_on(self, shard, dialogue_ids):
+        return (
+            Post.objects.using(shard)
+            .filter(dialogue_id__in=dialogue_ids)
+            .values("dialogue_id")
+            .annotate(last_post_on=Max("created_on"))
+            .values_list("dialogue_id", "last_post_on")
+            .order_by()
+        )
+
+    def _is_dormant(self, dialogue_id, cutoff):
+        """Check if a dialogue is still dormant."""
+        dialogue = self._get_candidates(cutoff).filter(id=dialogue_id).first()
+        return (
+            dialogue is not None
+            and not dialogue.posts.filter(created_on__gte=cutoff).exists()
+        )
+
+    def _render(self, slug):
+        """Render a dialogue as it's shown to anonymous visitors."""
+        request = RequestFactory().get(
+            reverse("dialogues:dialogue_detail", args=(slug,))
+        )
+        request.user = AnonymousUser()
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+
+        response = DialogueDetailView.as_view(count_views=False)(request, slug=slug)
+        return response.render().content
@@ -0,0 +1,133 @@
+"""
+Convert the `dialogues_post` table to a PostgreSQL table partitioned by
+a hash of `dialogue_id`. Every query on posts filters on a single
+dialogue, so the planner prunes all other partitions, and vacuum and
+index maintenance work on partitions a fraction of the table's size.
+
+Hash partitions cover every possible dialogue, so unlike range
+partitions by date, no partitions have to be created over time. The
+primary key has to include the partition key, so it becomes
+`(id, dialogue_id)`. Post IDs still come from a single sequence and
+remain unique, so the ORM keeps treating `id` as the primary key.
+
+The migration is skipped on other database backends.
+"""
+
+from django.db import migrations
+
+POST_TABLE = "dialogues_post"
+PARTITIONED_TABLE = "dialogues_post_partitioned"
+PARTITION_COUNT = 16
+
+
+def partition_posts(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    # copy column definitions without the identity, since identity
+    # columns aren't supported on partitioned tables before PostgreSQL
+    # 17, and give the id column a sequence owned by the new table
+    schema_editor.execute(
+        f"""
+        CREATE SEQUENCE {PARTITIONED_TABLE}_id_seq;
+        CREATE TABLE {PARTITIONED_TABLE} (
+            LIKE {POST_TABLE} INCLUDING DEFAULTS,
+            PRIMARY KEY (id, dialogue_id)
+        ) PARTITION BY HASH (dialogue_id);
+        ALTER TABLE {PARTITIONED_TABLE}
+            ALTER COLUMN id SET DEFAULT nextval('{PARTITIONED_TABLE}_id_seq');
+        """
+    )
+
+    for remainder in range(PARTITION_COUNT):
+        schema_editor.execute(
+            f"""
+            CREATE TABLE {POST_TABLE}_p{remainder}
+            PARTITION OF {PARTITIONED_TABLE}
+            FOR VALUES WITH (MODULUS {PARTITION_COUNT}, REMAINDER {remainder});
+            """
+        )
+
+    _copy_posts_and_swap_tables(schema_editor)
+
+    schema_editor.execute(
+        f"""
+        ALTER TABLE {POST_TABLE}
+            ADD CONSTRAINT {POST_TABLE}_author_id_fk_accounts_user_id
+            FOREIGN KEY (author_id) REFERENCES accounts_user (id)
+            DEFERRABLE INITIALLY DEFERRED;
+        ALTER TABLE {POST_TABLE}
+            ADD CONSTRAINT {POST_TABLE}_dialogue_id_fk_dialogues_dialogue_id
+            FOREIGN KEY (dialogue_id) REFERENCES dialogues_dialogue (id)
+            DEFERRABLE INITIALLY DEFERRED;
+        CREATE INDEX {POST_TABLE}_author_id ON {POST_TABLE} (author_id);
+        CREATE INDEX {POST_TABLE}_dialogue_id ON {POST_TABLE} (dialogue_id);
+        """
+    )
+
+
+def unpartition_posts(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute(
+        f"""
+        CREATE SEQUENCE {PARTITIONED_TABLE}_id_seq;
+        CREATE TABLE {PARTITIONED_TABLE} (
+            LIKE {POST_TABLE} INCLUDING DEFAULTS,
+            PRIMARY KEY (id)
+        );
+        ALTER TABLE {PARTITIONED_TABLE}
+            ALTER COLUMN id SET DEFAULT nextval('{PARTITIONED_TABLE}_id_seq');
+        """
+    )
+
+    _copy_posts_and_swap_tables(schema_editor)
+
+    schema_editor.execute(
+        f"""
+        ALTER TABLE {POST_TABLE}
+            ADD CONSTRAINT {POST_TABLE}_author_id_fk_accounts_user_id
+            FOREIGN KEY (author_id) REFERENCES accounts_user (id)
+            DEFERRABLE INITIALLY DEFERRED;
+        ALTER TABLE {POST_TABLE}
+            ADD CONSTRAINT {POST_TABLE}_dialogue_id_fk_dialogues_dialogue_id
+            FOREIGN KEY (dialogue_id) REFERENCES dialogues_dialogue (id)
+            DEFERRABLE INITIALLY DEFERRED;
+        CREATE INDEX {POST_TABLE}_author_id ON {POST_TABLE} (author_id);
+        CREATE INDEX {POST_TABLE}_dialogue_id ON {POST_TABLE} (dialogue_id);
+        """
+    )
+
+
+def _copy_posts_and_swap_tables(schema_editor):
+    """
+    Copy all posts into the new table, continue the id sequence where
+    the old table left off and replace the old table with the new one.
+    """
+    schema_editor.execute(
+        f"""
+        LOCK TABLE {POST_TABLE} IN EXCLUSIVE MODE;
+        INSERT INTO {PARTITIONED_TABLE} SELECT * FROM {POST_TABLE};
+        SELECT setval(
+            '{PARTITIONED_TABLE}_id_seq',
+            COALESCE((SELECT MAX(id) FROM {POST_TABLE}), 0) + 1,
+            false
+        );
+        DROP TABLE {POST_TABLE};
+        ALTER TABLE {PARTITIONED_TABLE} RENAME TO {POST_TABLE};
+        ALTER SEQUENCE {PARTITIONED_TABLE}_id_seq RENAME TO {POST_TABLE}_id_seq;
+        ALTER SEQUENCE {POST_TABLE}_id_seq OWNED BY {POST_TABLE}.id;
+        """
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dialogues", "0009_readcursor"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_posts, unpartition_posts),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dialogues", "0010_partition_post_by_dialogue"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dialogue",
+            name="deleted_on",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="dialogue",
+            index=models.Index(
+                condition=models.Q(("deleted_on__isnull", False)),
+                fields=["deleted_on"],
+                name="dialogue_deleted_on_idx",
+            ),
+        ),
+    ]
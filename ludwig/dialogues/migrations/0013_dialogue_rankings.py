@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dialogues", "0012_subscriptions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DialogueRanking",
+            fields=[
+                (
+                    "dialogue",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="ranking",
+                        serialize=False,
+                        to="dialogues.dialogue",
+                    ),
+                ),
+                ("rank", models.PositiveIntegerField(unique=True)),
+                ("score", models.FloatField()),
+                ("post_count", models.PositiveIntegerField()),
+                ("last_activity_on", models.DateTimeField()),
+            ],
+            options={
+                "ordering": ["rank"],
+            },
+        ),
+    ]
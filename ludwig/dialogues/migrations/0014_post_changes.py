@@ -0,0 +1,99 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def record_existing_posts(apps, schema_editor):
+    """
+    Start the change log of every dialogue with the inserts of its
+    existing posts, in the order of their IDs.
+    """
+    Dialogue = apps.get_model("dialogues", "Dialogue")
+    Post = apps.get_model("dialogues", "Post")
+    PostChange = apps.get_model("dialogues", "PostChange")
+    db_alias = schema_editor.connection.alias
+
+    dialogue_ids = Dialogue.objects.using(db_alias).values_list("id", flat=True)
+    for dialogue_id in dialogue_ids.iterator():
+        post_ids = Post.objects.using(db_alias).filter(dialogue_id=dialogue_id)
+        post_ids = post_ids.values_list("id", flat=True)
+        seq = 0
+        batch = []
+
+        for post_id in post_ids.order_by("id").iterator(chunk_size=BATCH_SIZE):
+            seq += 1
+            batch.append(
+                PostChange(
+                    dialogue_id=dialogue_id, seq=seq, post_id=post_id, kind="insert"
+                )
+            )
+
+            if len(batch) == BATCH_SIZE:
+                PostChange.objects.using(db_alias).bulk_create(batch)
+                batch = []
+
+        PostChange.objects.using(db_alias).bulk_create(batch)
+        Dialogue.objects.using(db_alias).filter(id=dialogue_id).update(change_seq=seq)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dialogues", "0013_dialogue_rankings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dialogue",
+            name="change_seq",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="PostChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("seq", models.BigIntegerField()),
+                ("post_id", models.BigIntegerField()),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("insert", "Insert"),
+                            ("edit", "Edit"),
+                            ("delete", "Delete"),
+                        ],
+                        max_length=6,
+                    ),
+                ),
+                ("created_on", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "dialogue",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="changes",
+                        to="dialogues.dialogue",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("dialogue", "seq"), name="unique_post_change_seq"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(record_existing_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,126 @@
+"""
+Add composite indexes on posts that lead with their dialogue, which make
+the single-column index of the dialogue redundant.
+
+On PostgreSQL the posts table is partitioned by 0010, and indexes of
+partitioned tables can't be built concurrently. Each index is created on
+the parent table alone, invalid until it covers every partition, then
+built concurrently on every partition and attached to the parent, so
+that posts can still be written while the indexes are built. The
+migration can be run again, resuming where it stopped.
+"""
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+POST_TABLE = "dialogues_post"
+POST_INDEXES = [
+    models.Index(fields=["dialogue", "id"], name="post_dialogue_id_idx"),
+    models.Index(
+        fields=["dialogue", "created_on"], name="post_dialogue_created_on_idx"
+    ),
+]
+
+
+def add_post_indexes(apps, schema_editor):
+    Post = apps.get_model("dialogues", "Post")
+
+    if schema_editor.connection.vendor != "postgresql":
+        for index in POST_INDEXES:
+            schema_editor.add_index(Post, index)
+        return
+
+    partitions = [
+        partition
+        for partition, in _fetch(
+            schema_editor,
+            """
+            SELECT inhrelid::regclass::text FROM pg_inherits
+            WHERE inhparent = %s::regclass
+            ORDER BY 1
+            """,
+            [POST_TABLE],
+        )
+    ]
+
+    for index in POST_INDEXES:
+        columns = ", ".join(
+            Post._meta.get_field(field).column for field in index.fields
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {index.name} ON ONLY {POST_TABLE} ({columns})"
+        )
+
+        for partition in partitions:
+            partition_index = f"{partition}_{index.name}"
+
+            # a concurrent build that failed leaves an invalid index
+            # behind, which has to be built again
+            if _fetch(
+                schema_editor,
+                """
+                SELECT 1 FROM pg_index
+                WHERE indexrelid = to_regclass(%s) AND NOT indisvalid
+                """,
+                [partition_index],
+            ):
+                schema_editor.execute(f"DROP INDEX CONCURRENTLY {partition_index}")
+
+            schema_editor.execute(
+                f"""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition_index}
+                    ON {partition} ({columns})
+                """
+            )
+            schema_editor.execute(
+                f"ALTER INDEX {index.name} ATTACH PARTITION {partition_index}"
+            )
+
+
+def remove_post_indexes(apps, schema_editor):
+    Post = apps.get_model("dialogues", "Post")
+
+    for index in POST_INDEXES:
+        # dropping the index of a partitioned table drops the indexes
+        # of its partitions
+        schema_editor.remove_index(Post, index)
+
+
+def _fetch(schema_editor, sql, params=None):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+class Migration(migrations.Migration):
+
+    # the indexes are built concurrently on PostgreSQL
+    atomic = False
+
+    dependencies = [
+        ("dialogues", "0014_post_changes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(add_post_indexes, remove_post_indexes),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name="post", index=index)
+                for index in POST_INDEXES
+            ],
+        ),
+        migrations.AlterField(
+            model_name="post",
+            name="dialogue",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="posts",
+                to="dialogues.dialogue",
+            ),
+        ),
+    ]
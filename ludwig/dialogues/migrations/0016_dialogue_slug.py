@@ -0,0 +1,151 @@
+"""
+Add the `slug` of dialogues, their public ID in URLs, as a copy of the
+nanoid primary key, which 0017 replaces with an integer.
+
+On PostgreSQL the slugs are copied in batches of short transactions, and
+dialogues added meanwhile by code that doesn't set slugs yet get theirs
+from a trigger, which 0017 drops. The unique index is built
+concurrently, and the column is made NOT NULL through a validated check
+constraint, so that neither blocks writes to the table while it scans it.
+"""
+
+from django.db import migrations, models, transaction
+
+import ludwig.dialogues.models
+from ludwig.base.operations import AlterFieldExceptOnPostgreSQL
+
+DIALOGUE_TABLE = "dialogues_dialogue"
+SLUG_TRIGGER = "dialogues_dialogue_default_slug"
+BATCH_SIZE = 10_000
+
+
+def copy_ids_to_slugs(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.execute(f"UPDATE {DIALOGUE_TABLE} SET slug = id")
+        return
+
+    schema_editor.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION {SLUG_TRIGGER}() RETURNS trigger AS $$
+        BEGIN
+            NEW.slug := COALESCE(NEW.slug, NEW.id);
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+        DROP TRIGGER IF EXISTS {SLUG_TRIGGER} ON {DIALOGUE_TABLE};
+        CREATE TRIGGER {SLUG_TRIGGER} BEFORE INSERT ON {DIALOGUE_TABLE}
+            FOR EACH ROW EXECUTE FUNCTION {SLUG_TRIGGER}();
+        """
+    )
+
+    last_id = ""
+    while last_id is not None:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            with schema_editor.connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    WITH batch AS (
+                        SELECT id FROM {DIALOGUE_TABLE}
+                        WHERE id > %s ORDER BY id LIMIT %s
+                    ), updated AS (
+                        UPDATE {DIALOGUE_TABLE} SET slug = batch.id FROM batch
+                        WHERE {DIALOGUE_TABLE}.id = batch.id
+                            AND {DIALOGUE_TABLE}.slug IS NULL
+                    )
+                    SELECT MAX(id) FROM batch
+                    """,
+                    [last_id, BATCH_SIZE],
+                )
+                last_id = cursor.fetchone()[0]
+
+
+def drop_slug_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute(
+        f"""
+        DROP TRIGGER IF EXISTS {SLUG_TRIGGER} ON {DIALOGUE_TABLE};
+        DROP FUNCTION IF EXISTS {SLUG_TRIGGER}();
+        """
+    )
+
+
+def index_slugs(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    # the names Django gives the unique constraint and pattern index
+    # when it alters a column to be unique
+    unique_name = schema_editor._create_index_name(
+        DIALOGUE_TABLE, ["slug"], suffix="_uniq"
+    )
+    like_name = schema_editor._create_index_name(
+        DIALOGUE_TABLE, ["slug"], suffix="_like"
+    )
+    check_name = f"{DIALOGUE_TABLE}_slug_not_null"
+
+    schema_editor.execute(
+        f"CREATE UNIQUE INDEX CONCURRENTLY {unique_name} ON {DIALOGUE_TABLE} (slug)"
+    )
+    schema_editor.execute(
+        f"""
+        ALTER TABLE {DIALOGUE_TABLE}
+            ADD CONSTRAINT {unique_name} UNIQUE USING INDEX {unique_name}
+        """
+    )
+    schema_editor.execute(
+        f"""
+        CREATE INDEX CONCURRENTLY {like_name}
+            ON {DIALOGUE_TABLE} (slug varchar_pattern_ops)
+        """
+    )
+
+    # SET NOT NULL skips its scan of the table under an exclusive lock
+    # when a validated check constraint already proves it
+    schema_editor.execute(
+        f"""
+        ALTER TABLE {DIALOGUE_TABLE}
+            ADD CONSTRAINT {check_name} CHECK (slug IS NOT NULL) NOT VALID
+        """
+    )
+    schema_editor.execute(
+        f"ALTER TABLE {DIALOGUE_TABLE} VALIDATE CONSTRAINT {check_name}"
+    )
+    schema_editor.execute(
+        f"""
+        ALTER TABLE {DIALOGUE_TABLE} ALTER COLUMN slug SET NOT NULL;
+        ALTER TABLE {DIALOGUE_TABLE} DROP CONSTRAINT {check_name};
+        """
+    )
+
+
+class Migration(migrations.Migration):
+
+    # indexes are built concurrently and slugs copied in batches, each
+    # in its own transaction
+    atomic = False
+
+    dependencies = [
+        ("dialogues", "0015_post_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dialogue",
+            name="slug",
+            field=models.CharField(editable=False, max_length=10, null=True),
+        ),
+        migrations.RunPython(copy_ids_to_slugs, drop_slug_trigger),
+        AlterFieldExceptOnPostgreSQL(
+            model_name="dialogue",
+            name="slug",
+            field=models.CharField(
+                default=ludwig.dialogues.models.generate_unique_id,
+                editable=False,
+                max_length=10,
+                unique=True,
+            ),
+        ),
+        migrations.RunPython(index_slugs, migrations.RunPython.noop),
+    ]
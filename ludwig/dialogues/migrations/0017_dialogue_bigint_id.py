@@ -0,0 +1,680 @@
+"""
+Replace the nanoid primary key of dialogues with a bigint, numbered in
+the order the dialogues were created. Every post, participant and other
+row of a dialogue stored its varchar key, so the indexes on them shrink
+and joins compare integers. The nanoid remains the public ID of the
+dialogue as its `slug`, added in 0016.
+
+On PostgreSQL the keys are swapped online, without rewriting any table
+under a lock:
+
+1. Dialogues get a `new_id` column, filled from a sequence in batches
+   of short transactions and for new dialogues by its default.
+2. The tables that reference dialogues get a `new_dialogue_id` column,
+   kept in sync by a trigger and backfilled in batches. Their indexes,
+   unique constraints and foreign keys are rebuilt on it concurrently.
+3. The posts table is partitioned by its dialogue key, which can't be
+   changed, so it's copied in batches into a new partitioned table,
+   while a trigger mirrors every write to the old table into the new one.
+4. In a single transaction, which holds its locks for a few catalog
+   updates, the old columns and the old posts table are dropped and the
+   new ones take their names. The transaction gives up after
+   `LOCK_TIMEOUT` rather than queue all queries on the tables behind it,
+   and the migration can be run again, resuming where it stopped, or
+   skipping the swap once it's committed.
+
+Code that still uses nanoid keys keeps working through steps 1 to 3,
+and the swap has to be deployed together with code that looks up
+dialogues by slug.
+
+On other database backends the keys are renumbered in place and the
+columns altered by Django. The migration can't be reversed, since the
+nanoid keys of the referencing tables are gone.
+"""
+
+import re
+
+from django.db import migrations, models, transaction
+
+from ludwig.base.operations import AlterFieldExceptOnPostgreSQL
+
+DIALOGUE_TABLE = "dialogues_dialogue"
+DIALOGUE_SEQUENCE = "dialogues_dialogue_new_id_seq"
+POST_TABLE = "dialogues_post"
+NEW_POST_TABLE = "dialogues_post_new"
+BATCH_SIZE = 10_000
+LOCK_TIMEOUT = "5s"
+
+
+def renumber_dialogues(apps, schema_editor):
+    """
+    Replace the keys of dialogues and of the rows that reference them
+    with their numbers by creation, for Django to convert the columns to
+    integers. Foreign keys aren't enforced by the schema editor until
+    all columns are altered.
+    """
+    if schema_editor.connection.vendor == "postgresql":
+        return
+
+    Dialogue = apps.get_model("dialogues", "Dialogue")
+    references = [
+        (relation.related_model._meta.db_table, relation.field.column)
+        for relation in Dialogue._meta.get_fields(include_hidden=True)
+        if relation.auto_created and not relation.concrete
+        if relation.one_to_many or relation.one_to_one
+    ]
+
+    schema_editor.execute(
+        f"""
+        CREATE TEMPORARY TABLE dialogue_ids AS
+            SELECT id AS old_id, ROW_NUMBER() OVER (ORDER BY created_on, id) AS new_id
+            FROM {DIALOGUE_TABLE}
+        """
+    )
+
+    for table, column in [*references, (DIALOGUE_TABLE, "id")]:
+        schema_editor.execute(
+            f"""
+            UPDATE {table} SET {column} = (
+                SELECT new_id FROM dialogue_ids WHERE old_id = {table}.{column}
+            )
+            """
+        )
+
+    schema_editor.execute("DROP TABLE dialogue_ids")
+
+
+def swap_keys_online(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    # posts are partitioned by 0010 and copied, all other tables that
+    # reference dialogues get a new column
+    references = [
+        reference
+        for reference in _get_references(schema_editor)
+        if reference[0] != POST_TABLE
+    ]
+
+    # a run that stopped after the swap committed only has to analyze
+    # the tables again
+    if not _is_swapped(schema_editor):
+        post_foreign_keys = _get_foreign_keys(schema_editor, POST_TABLE)
+
+        _add_new_dialogue_ids(schema_editor)
+
+        for table, column, foreign_key in references:
+            _add_new_references(schema_editor, table, column, foreign_key)
+
+        _copy_posts(schema_editor, post_foreign_keys)
+        _swap_columns(schema_editor, references, post_foreign_keys)
+
+    for table in [DIALOGUE_TABLE, POST_TABLE, *(table for table, *_ in references)]:
+        schema_editor.execute(f"ANALYZE {table}")
+
+
+def _fetch(schema_editor, sql, params=None):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _is_swapped(schema_editor):
+    """
+    Check whether the keys of dialogues are bigints and the copy of the
+    posts table has taken the place of the old one.
+    """
+    return _fetch(
+        schema_editor,
+        """
+        SELECT format_type(atttypid, atttypmod) = 'bigint'
+            AND to_regclass(%s) IS NULL
+        FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attname = 'id'
+        """,
+        [NEW_POST_TABLE, DIALOGUE_TABLE],
+    )[0][0]
+
+
+def _get_references(schema_editor):
+    """
+    Get the tables with foreign keys to dialogues, with the referencing
+    column and the name of the foreign key.
+    """
+    return _fetch(
+        schema_editor,
+        """
+        SELECT c.conrelid::regclass::text, a.attname, c.conname
+        FROM pg_constraint c
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+        WHERE c.contype = 'f'
+            AND c.confrelid = %s::regclass
+            AND c.conparentid = 0
+        ORDER BY 1
+        """,
+        [DIALOGUE_TABLE],
+    )
+
+
+def _get_foreign_keys(schema_editor, table):
+    """Get the names and definitions of the foreign keys of a table."""
+    return _fetch(
+        schema_editor,
+        """
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+        ORDER BY conname
+        """,
+        [table],
+    )
+
+
+def _get_indexes(schema_editor, table, column=None):
+    """
+    Get the names and definitions of the indexes of a table, or of those
+    on the given column, with the type of the constraint they back, if
+    any. Pattern indexes, which only apply to text, are left out.
+    """
+    indexes = _fetch(
+        schema_editor,
+        """
+        SELECT i.relname, pg_get_indexdef(i.oid), c.contype
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        LEFT JOIN pg_constraint c
+            ON c.conindid = x.indexrelid
+            AND c.conrelid = x.indrelid
+            AND c.contype IN ('p', 'u')
+        WHERE x.indrelid = %s::regclass
+            AND (%s IS NULL OR EXISTS (
+                SELECT FROM pg_attribute a
+                WHERE a.attrelid = x.indrelid
+                    AND a.attnum = ANY(x.indkey)
+                    AND a.attname = %s
+            ))
+        ORDER BY 1
+        """,
+        [table, column, column],
+    )
+    return [index for index in indexes if "_pattern_ops" not in index[1]]
+
+
+def _get_new_name(name):
+    return f"{name[:59]}_new"
+
+
+def _set_not_null(schema_editor, table, column):
+    """
+    Make a column NOT NULL without scanning the table under an exclusive
+    lock, through a check constraint validated under a lock that lets
+    writes through.
+    """
+    check = f"{table}_{column}_not_null"[:63]
+    schema_editor.execute(
+        f"""
+        ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {check};
+        ALTER TABLE {table}
+            ADD CONSTRAINT {check} CHECK ({column} IS NOT NULL) NOT VALID;
+        """
+    )
+    schema_editor.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {check}")
+    schema_editor.execute(
+        f"""
+        ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL;
+        ALTER TABLE {table} DROP CONSTRAINT {check};
+        """
+    )
+
+
+def _create_index_concurrently(schema_editor, definition, name, table, column):
+    """
+    Build an index like the one of `definition` concurrently, under a
+    new name and on the new column, replacing any invalid leftover of an
+    interrupted build.
+    """
+    create, target = definition.split(" ON ", 1)
+    target = re.sub(rf"\b{column}\b", f"new_{column}", target)
+    unique = "UNIQUE " if create.startswith("CREATE UNIQUE") else ""
+
+    invalid = _fetch(
+        schema_editor,
+        """
+        SELECT FROM pg_index
+        WHERE indexrelid = to_regclass(%s) AND NOT indisvalid
+        """,
+        [name],
+    )
+    if invalid:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY {name}")
+
+    schema_editor.execute(
+        f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target}"
+    )
+
+
+def _backfill(schema_editor, table, key, start, update):
+    """
+    Run an update over batches of the rows of a table in order of `key`,
+    each in its own transaction. The update gets the keys of the batch
+    as the `batch` table.
+    """
+    last = start
+    while last is not None:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            last = _fetch(
+                schema_editor,
+                f"""
+                WITH batch AS (
+                    SELECT {key} FROM {table} WHERE {key} > %s
+                    ORDER BY {key} LIMIT %s
+                ), updated AS ({update})
+                SELECT MAX({key}) FROM batch
+                """,
+                [last, BATCH_SIZE],
+            )[0][0]
+
+
+def _add_new_dialogue_ids(schema_editor):
+    """
+    Number the dialogues in the new key column, in the order they were
+    created. Dialogues added meanwhile get the next numbers by default.
+    """
+    schema_editor.execute(
+        f"""
+        CREATE SEQUENCE IF NOT EXISTS {DIALOGUE_SEQUENCE};
+        ALTER TABLE {DIALOGUE_TABLE} ADD COLUMN IF NOT EXISTS new_id bigint;
+        ALTER TABLE {DIALOGUE_TABLE}
+            ALTER COLUMN new_id SET DEFAULT nextval('{DIALOGUE_SEQUENCE}');
+        """
+    )
+
+    numbered = True
+    while numbered:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            numbered = _fetch(
+                schema_editor,
+                f"""
+                UPDATE {DIALOGUE_TABLE} SET new_id = batch.new_id
+                FROM (
+                    SELECT id, nextval('{DIALOGUE_SEQUENCE}') AS new_id
+                    FROM (
+                        SELECT id FROM {DIALOGUE_TABLE} WHERE new_id IS NULL
+                        ORDER BY created_on, id LIMIT %s FOR UPDATE
+                    ) AS ordered
+                ) AS batch
+                WHERE {DIALOGUE_TABLE}.id = batch.id
+                RETURNING 1
+                """,
+                [BATCH_SIZE],
+            )
+
+    _set_not_null(schema_editor, DIALOGUE_TABLE, "new_id")
+
+    name, definition = next(
+        (name, definition)
+        for name, definition, kind in _get_indexes(schema_editor, DIALOGUE_TABLE)
+        if kind == "p"
+    )
+    _create_index_concurrently(
+        schema_editor, definition, _get_new_name(name), DIALOGUE_TABLE, "id"
+    )
+
+
+def _add_new_references(schema_editor, table, column, foreign_key):
+    """
+    Add the new key of dialogues to a table that references them, with
+    the indexes, constraints and foreign key of the old one.
+    """
+    new_column = f"new_{column}"
+    trigger = f"{table}_sync_{new_column}"[:63]
+
+    schema_editor.execute(
+        f"""
+        ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {new_column} bigint;
+        CREATE OR REPLACE FUNCTION {trigger}() RETURNS trigger AS $$
+        BEGIN
+            NEW.{new_column} := (
+                SELECT new_id FROM {DIALOGUE_TABLE} WHERE id = NEW.{column}
+            );
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+        DROP TRIGGER IF EXISTS {trigger} ON {table};
+        CREATE TRIGGER {trigger} BEFORE INSERT OR UPDATE OF {column} ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {trigger}();
+        """
+    )
+
+    # rows are batched by their primary key, which for rankings is the
+    # dialogue column itself
+    key = _get_indexes(schema_editor, table)
+    key = next(
+        re.search(r"\((\w+)", definition)[1]
+        for _, definition, kind in key
+        if kind == "p"
+    )
+    _backfill(
+        schema_editor,
+        table,
+        key,
+        "" if key == column else 0,
+        f"""
+        UPDATE {table} SET {new_column} = d.new_id
+        FROM batch, {DIALOGUE_TABLE} d
+        WHERE {table}.{key} = batch.{key}
+            AND d.id = {table}.{column}
+            AND {table}.{new_column} IS NULL
+        """,
+    )
+
+    _set_not_null(schema_editor, table, new_column)
+
+    for name, definition, _ in _get_indexes(schema_editor, table, column):
+        _create_index_concurrently(
+            schema_editor, definition, _get_new_name(name), table, column
+        )
+
+    new_foreign_key = _get_new_name(foreign_key)
+    if not _fetch(
+        schema_editor,
+        "SELECT FROM pg_constraint WHERE conrelid = %s::regclass AND conname = %s",
+        [table, new_foreign_key],
+    ):
+        schema_editor.execute(
+            f"""
+            ALTER TABLE {table} ADD CONSTRAINT {new_foreign_key}
+                FOREIGN KEY ({new_column}) REFERENCES {DIALOGUE_TABLE} (new_id)
+                DEFERRABLE INITIALLY DEFERRED NOT VALID
+            """
+        )
+    schema_editor.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {new_foreign_key}")
+
+
+def _copy_posts(schema_editor, foreign_keys):
+    """
+    Copy the posts into a new table, partitioned like the old one by the
+    new key of their dialogue, and mirror every write to the old table
+    into it until the tables are swapped.
+    """
+    columns = _fetch(
+        schema_editor,
+        """
+        SELECT a.attname, format_type(a.atttypid, a.atttypmod), a.attnotnull,
+            pg_get_expr(d.adbin, d.adrelid)
+        FROM pg_attribute a
+        LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+        WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+        ORDER BY a.attnum
+        """,
+        [POST_TABLE],
+    )
+    partition_count = _fetch(
+        schema_editor,
+        "SELECT COUNT(*) FROM pg_inherits WHERE inhparent = %s::regclass",
+        [POST_TABLE],
+    )[0][0]
+
+    definitions = ", ".join(
+        " ".join(
+            [
+                name,
+                "bigint" if name == "dialogue_id" else column_type,
+                "NOT NULL" if not_null else "",
+                f"DEFAULT {default}" if default else "",
+            ]
+        )
+        for name, column_type, not_null, default in columns
+    )
+    indexes = _get_indexes(schema_editor, POST_TABLE)
+    key = next(name for name, _, kind in indexes if kind == "p")
+
+    schema_editor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {NEW_POST_TABLE} (
+            {definitions},
+            CONSTRAINT {_get_new_name(key)} PRIMARY KEY (id, dialogue_id)
+        ) PARTITION BY HASH (dialogue_id)
+        """
+    )
+    for remainder in range(partition_count):
+        schema_editor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {NEW_POST_TABLE}_p{remainder}
+            PARTITION OF {NEW_POST_TABLE}
+            FOR VALUES WITH (MODULUS {partition_count}, REMAINDER {remainder})
+            """
+        )
+
+    # the new table is empty and unused, so its indexes and foreign keys
+    # are built right away and maintained as the posts are copied
+    for name, definition, kind in indexes:
+        if kind != "p":
+            create, target = definition.split(" ON ", 1)
+            target = re.sub(rf"^(ONLY )?\S+", NEW_POST_TABLE, target)
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {_get_new_name(name)} ON {target}"
+            )
+
+    existing = {name for name, _ in _get_foreign_keys(schema_editor, NEW_POST_TABLE)}
+    for name, definition in foreign_keys:
+        if _get_new_name(name) not in existing:
+            definition = definition.replace(
+                f"REFERENCES {DIALOGUE_TABLE}(id)",
+                f"REFERENCES {DIALOGUE_TABLE}(new_id)",
+            )
+            schema_editor.execute(
+                f"""
+                ALTER TABLE {NEW_POST_TABLE}
+                    ADD CONSTRAINT {_get_new_name(name)} {definition}
+                """
+            )
+
+    names = ", ".join(name for name, *_ in columns)
+    values = ", ".join(
+        "d.new_id" if name == "dialogue_id" else f"p.{name}" for name, *_ in columns
+    )
+    new_values = ", ".join(
+        "d.new_id" if name == "dialogue_id" else f"NEW.{name}" for name, *_ in columns
+    )
+    trigger = f"{POST_TABLE}_mirror"
+
+    schema_editor.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION {trigger}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM {NEW_POST_TABLE} WHERE id = OLD.id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO {NEW_POST_TABLE} ({names})
+                SELECT {new_values} FROM {DIALOGUE_TABLE} d
+                WHERE d.id = NEW.dialogue_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+        DROP TRIGGER IF EXISTS {trigger} ON {POST_TABLE};
+        CREATE TRIGGER {trigger} AFTER INSERT OR UPDATE OR DELETE ON {POST_TABLE}
+            FOR EACH ROW EXECUTE FUNCTION {trigger}();
+        """
+    )
+
+    # posts written from here on are mirrored by the trigger. The copied
+    # posts are locked until their batch commits, so that a concurrent
+    # edit or delete is mirrored after the copy rather than lost.
+    first_id, last_id = _fetch(
+        schema_editor, f"SELECT MIN(id), MAX(id) FROM {POST_TABLE}"
+    )[0]
+
+    for start in range(first_id or 0, (last_id or -1) + 1, BATCH_SIZE):
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute(
+                f"""
+                WITH batch AS (
+                    SELECT {values} FROM {POST_TABLE} p
+                    JOIN {DIALOGUE_TABLE} d ON d.id = p.dialogue_id
+                    WHERE p.id >= %s AND p.id < %s
+                    FOR SHARE OF p
+                )
+                INSERT INTO {NEW_POST_TABLE} ({names}) SELECT * FROM batch
+                ON CONFLICT DO NOTHING
+                """,
+                [start, start + BATCH_SIZE],
+            )
+
+
+def _swap_columns(schema_editor, references, post_foreign_keys):
+    """
+    Replace the old keys with the new ones and give the new columns,
+    tables, indexes and constraints the names of the old ones.
+    """
+    old_indexes = {
+        table: _get_indexes(schema_editor, table, column)
+        for table, column, _ in references
+    }
+    post_indexes = _get_indexes(schema_editor, POST_TABLE)
+    dialogue_key = next(
+        name
+        for name, _, kind in _get_indexes(schema_editor, DIALOGUE_TABLE, "id")
+        if kind == "p"
+    )
+    post_sequence = _fetch(
+        schema_editor, "SELECT pg_get_serial_sequence(%s, 'id')", [POST_TABLE]
+    )[0][0]
+    tables = [DIALOGUE_TABLE, POST_TABLE, *(table for table, *_ in references)]
+
+    with transaction.atomic(using=schema_editor.connection.alias):
+        schema_editor.execute(
+            f"""
+            SET LOCAL lock_timeout = '{LOCK_TIMEOUT}';
+            LOCK TABLE {", ".join(tables)} IN ACCESS EXCLUSIVE MODE;
+            DROP TRIGGER IF EXISTS dialogues_dialogue_default_slug
+                ON {DIALOGUE_TABLE};
+            DROP FUNCTION IF EXISTS dialogues_dialogue_default_slug();
+            """
+        )
+
+        for table, column, foreign_key in references:
+            new_column = f"new_{column}"
+            trigger = f"{table}_sync_{new_column}"[:63]
+            schema_editor.execute(
+                f"""
+                DROP TRIGGER {trigger} ON {table};
+                DROP FUNCTION {trigger}();
+                ALTER TABLE {table} DROP COLUMN {column};
+                ALTER TABLE {table} RENAME COLUMN {new_column} TO {column};
+                ALTER TABLE {table}
+                    RENAME CONSTRAINT {_get_new_name(foreign_key)} TO {foreign_key};
+                """
+            )
+            for name, _, kind in old_indexes[table]:
+                _rename_index(schema_editor, table, name, kind)
+
+        schema_editor.execute(
+            f"""
+            DROP TRIGGER {POST_TABLE}_mirror ON {POST_TABLE};
+            DROP FUNCTION {POST_TABLE}_mirror();
+            ALTER SEQUENCE {post_sequence} OWNED BY {NEW_POST_TABLE}.id;
+            DROP TABLE {POST_TABLE};
+            ALTER TABLE {NEW_POST_TABLE} RENAME TO {POST_TABLE};
+            """
+        )
+        for (partition,) in _fetch(
+            schema_editor,
+            "SELECT inhrelid::regclass::text FROM pg_inherits "
+            "WHERE inhparent = %s::regclass",
+            [POST_TABLE],
+        ):
+            schema_editor.execute(
+                f"""
+                ALTER TABLE {partition}
+                    RENAME TO {partition.replace(NEW_POST_TABLE, POST_TABLE)}
+                """
+            )
+        for name, _ in post_foreign_keys:
+            schema_editor.execute(
+                f"""
+                ALTER TABLE {POST_TABLE}
+                    RENAME CONSTRAINT {_get_new_name(name)} TO {name}
+                """
+            )
+        for name, *_ in post_indexes:
+            schema_editor.execute(f"ALTER INDEX {_get_new_name(name)} RENAME TO {name}")
+        for (index,) in _fetch(
+            schema_editor,
+            """
+            SELECT indexrelid::regclass::text FROM pg_index
+            WHERE indrelid IN (
+                SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass
+            )
+            """,
+            [POST_TABLE],
+        ):
+            schema_editor.execute(
+                f"""
+                ALTER INDEX {index}
+                    RENAME TO {index.replace(NEW_POST_TABLE, POST_TABLE)}
+                """
+            )
+
+        # the bigint key becomes an identity column, as Django creates
+        # them, continuing after the numbers given so far
+        schema_editor.execute(
+            f"""
+            ALTER TABLE {DIALOGUE_TABLE} DROP COLUMN id;
+            ALTER TABLE {DIALOGUE_TABLE} RENAME COLUMN new_id TO id;
+            ALTER TABLE {DIALOGUE_TABLE} ADD CONSTRAINT {dialogue_key}
+                PRIMARY KEY USING INDEX {_get_new_name(dialogue_key)};
+            ALTER TABLE {DIALOGUE_TABLE} ALTER COLUMN id DROP DEFAULT;
+            DROP SEQUENCE {DIALOGUE_SEQUENCE};
+            """
+        )
+        next_id = _fetch(
+            schema_editor, f"SELECT COALESCE(MAX(id), 0) + 1 FROM {DIALOGUE_TABLE}"
+        )[0][0]
+        schema_editor.execute(
+            f"""
+            ALTER TABLE {DIALOGUE_TABLE} ALTER COLUMN id
+                ADD GENERATED BY DEFAULT AS IDENTITY (START WITH {next_id})
+            """
+        )
+
+
+def _rename_index(schema_editor, table, name, kind):
+    """Give the new index the name of the old one, and its constraint."""
+    new_name = _get_new_name(name)
+
+    if kind == "p":
+        schema_editor.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT {name} "
+            f"PRIMARY KEY USING INDEX {new_name}"
+        )
+    elif kind == "u":
+        schema_editor.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {new_name}"
+        )
+    else:
+        schema_editor.execute(f"ALTER INDEX {new_name} RENAME TO {name}")
+
+
+class Migration(migrations.Migration):
+
+    # on PostgreSQL, indexes are built concurrently and rows copied in
+    # batches, each in its own transaction
+    atomic = False
+
+    dependencies = [
+        ("dialogues", "0016_dialogue_slug"),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber_dialogues),
+        migrations.RunPython(swap_keys_online),
+        AlterFieldExceptOnPostgreSQL(
+            model_name="dialogue",
+            name="id",
+            field=models.BigAutoField(
+                auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+            ),
+        ),
+    ]
@@ -0,0 +1,76 @@
+"""
+Record the shard each dialogue's posts and change log are kept on, which
+is the default database for all existing dialogues, and stop enforcing
+the foreign keys of posts and change logs, which may be kept on another
+shard than the users and dialogues they reference.
+
+Shards other than the default database skip every other migration, and
+only get the tables of posts and change logs, created here from their
+state without any foreign keys.
+"""
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+SHARDED_MODELS = ["Post", "PostChange"]
+
+
+def create_shard_tables(apps, schema_editor):
+    for name in SHARDED_MODELS:
+        schema_editor.create_model(apps.get_model("dialogues", name))
+
+
+def delete_shard_tables(apps, schema_editor):
+    for name in reversed(SHARDED_MODELS):
+        schema_editor.delete_model(apps.get_model("dialogues", name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dialogues", "0017_dialogue_bigint_id"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dialogue",
+            name="shard",
+            field=models.CharField(default="default", editable=False, max_length=100),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name="post",
+            name="author",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="post",
+            name="dialogue",
+            field=models.ForeignKey(
+                db_constraint=False,
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="posts",
+                to="dialogues.dialogue",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="postchange",
+            name="dialogue",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="changes",
+                to="dialogues.dialogue",
+            ),
+        ),
+        migrations.RunPython(
+            create_shard_tables, delete_shard_tables, hints={"shard_tables": True}
+        ),
+    ]
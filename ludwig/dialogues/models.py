@@ -2,12 +2,16 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.postgres.fields import ArrayField
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models, router, transaction
+from django.db.models import F, Max, Prefetch
+from django.utils import timezone
 from nanoid import generate as generate_nanoid
 
 from ludwig.accounts.models import User
 from ludwig.base.models import TimeStampedModel
 
+from .sharding import DialogueMoved, allocate_id, get_shard, shard_atomic
+
 
 def generate_unique_id():
     return generate_nanoid(size=10)
@@ -17,9 +21,18 @@ def get_sentinel_user():
     return get_user_model().objects.get_or_create(username="deleted")[0]
 
 
+class DialogueManager(models.Manager):
+    """Manager of the dialogues that haven't been deleted."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_on__isnull=True)
+
+
 class Dialogue(TimeStampedModel):
-    id = models.CharField(
-        primary_key=True, default=generate_unique_id, editable=False, max_length=10
+    # the public ID of the dialogue in URLs, while the primary key that
+    # posts and other tables reference is a compact integer
+    slug = models.CharField(
+        max_length=10, unique=True, default=generate_unique_id, editable=False
     )
     is_open = models.BooleanField(default=False)
     is_visible = models.BooleanField(default=False)
@@ -35,37 +48,402 @@ class Dialogue(TimeStampedModel):
         null=True,
         related_name="authored_dialogues",
     )
+    # deleted dialogues are hidden right away and purged with their
+    # posts in the background by the `purge_deleted` command
+    deleted_on = models.DateTimeField(null=True, blank=True)
+    # kept up to date by subscribing and unsubscribing, so posting
+    # doesn't have to count subscribers
+    subscriber_count = models.PositiveIntegerField(default=0)
+    # sequence number of the latest entry in the dialogue's change log
+    change_seq = models.BigIntegerField(default=0)
+    # database the posts and change log of the dialogue are kept on, only
+    # changed by the `rebalance_dialogues` command
+    shard = models.CharField(max_length=100, editable=False)
+
+    objects = DialogueManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ["-created_on"]
+        indexes = [
+            models.Index(
+                fields=["deleted_on"],
+                condition=models.Q(deleted_on__isnull=False),
+                name="dialogue_deleted_on_idx",
+            )
+        ]
+
+    # fields only changed with F() expressions, which are left out of
+    # full saves so that a stale instance can't overwrite them
+    COUNTER_FIELDS = {"views", "subscriber_count", "change_seq"}
+    # fields left out of full saves for the same reason, changed with
+    # updates by the commands that maintain them
+    MANAGED_FIELDS = COUNTER_FIELDS | {"shard"}
 
     def save(self, *args, **kwargs):
+        if self._state.adding and not self.shard:
+            self.shard = get_shard(self.slug)
+
         # Perform validation on model fields
         self.full_clean()
+
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.MANAGED_FIELDS
+            ]
+
         super().save(*args, **kwargs)
 
         # Add author as a participant to the dialogue
         if self.author and not self.participants.filter(id=self.author.id).exists():
             self.participants.add(self.author)
 
+    def soft_delete(self):
+        """Hide the dialogue and mark it to be purged."""
+        self.deleted_on = timezone.now()
+        self.save(update_fields=["deleted_on", "modified_on"])
+
     def __str__(self):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def with_authors(self):
+        """
+        Load posts together with the fields of their authors that are
+        shown with them. The rest of the user columns, such as password
+        hashes, emails and permission flags, are left out of every row.
+        Posts on other shards than the default database can't be joined
+        with their authors, which are loaded by a second query instead.
+        """
+        if self.db != DEFAULT_DB_ALIAS:
+            return self.prefetch_related(
+                Prefetch(
+                    "author", queryset=User.objects.only("username", "display_name")
+                )
+            ).only("id", "body", "created_on", "modified_on", "dialogue", "author")
+
+        return self.select_related("author").only(
+            "id",
+            "body",
+            "created_on",
+            "modified_on",
+            "dialogue",
+            "author__username",
+            "author__display_name",
+        )
+
+
 class Post(TimeStampedModel):
-    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # posts may be kept on another shard than the users and dialogues
+    # they reference, so the references aren't enforced by the database
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_constraint=False
+    )
     body = models.TextField()
+    # the composite indexes lead with the dialogue, so it needs no index
+    # of its own
     dialogue = models.ForeignKey(
-        Dialogue, on_delete=models.CASCADE, related_name="posts"
+        Dialogue,
+        on_delete=models.CASCADE,
+        related_name="posts",
+        db_constraint=False,
+        db_index=False,
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ["created_on"]
+        indexes = [
+            # posts are read per dialogue in ID order, by pages, syncs
+            # and lookups of a dialogue's last post
+            models.Index(fields=["dialogue", "id"], name="post_dialogue_id_idx"),
+            # the dashboard and the rankings aggregate post times per
+            # dialogue
+            models.Index(
+                fields=["dialogue", "created_on"], name="post_dialogue_created_on_idx"
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         # Perform validation on model fields
         self.full_clean()
-        super().save(*args, **kwargs)
+
+        using = kwargs.get("using") or router.db_for_write(Post, instance=self)
+        if self.id is None and using != DEFAULT_DB_ALIAS:
+            self.id = allocate_id(Post)
+            kwargs["force_insert"] = True
+
+        # the post is committed together with its entry in the change
+        # log, which is added by the `post_save` signal
+        with shard_atomic(using):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get("using") or router.db_for_write(Post, instance=self)
+
+        # the tombstone is committed together with the deletion, as for
+        # saves
+        with shard_atomic(using):
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         return self.body[:50]
+
+    @property
+    def author_name(self):
+        """The name shown with the post, as on `PostRow`."""
+        return self.author.username
+
+
+class PostChangeQuerySet(models.QuerySet):
+    def record(self, dialogue_id, post_ids, kind):
+        """
+        Append a change of each of the given posts to the change log of
+        their dialogue, with consecutive sequence numbers. The dialogue
+        row stays locked by the update of its sequence number until the
+        transaction commits, so changes of a dialogue become visible in
+        order and a reader never skips one that commits late.
+
+        The change log has to be on the shard of the dialogue, and when
+        the dialogue was moved to another shard while its posts were
+        changed, `DialogueMoved` is raised to roll the changes back.
+        Changes on another shard than the default database whose
+        sequence numbers were lost with a failed commit of the default
+        database are skipped by moving the sequence past them.
+        """
+        # the changes are rolled back with the transaction of the posts
+        # they log, so they need no savepoints of their own
+        with shard_atomic(self.db, savepoint=False):
+            Dialogue.all_objects.filter(id=dialogue_id).update(
+                change_seq=F("change_seq") + len(post_ids)
+            )
+            last_seq, shard = (
+                Dialogue.all_objects.filter(id=dialogue_id)
+                .values_list("change_seq", "shard")
+                .get()
+            )
+            if shard != self.db:
+                raise DialogueMoved(
+                    f"Dialogue {dialogue_id} is on {shard}, not on {self.db}"
+                )
+
+            if self.db != DEFAULT_DB_ALIAS:
+                logged_seq = self.filter(dialogue_id=dialogue_id).aggregate(
+                    seq=Max("seq")
+                )["seq"]
+                if logged_seq is not None and logged_seq > last_seq - len(post_ids):
+                    last_seq = logged_seq + len(post_ids)
+                    Dialogue.all_objects.filter(id=dialogue_id).update(
+                        change_seq=last_seq
+                    )
+
+            first_seq = last_seq - len(post_ids) + 1
+            return self.bulk_create(
+                [
+                    PostChange(
+                        dialogue_id=dialogue_id, seq=seq, post_id=post_id, kind=kind
+                    )
+                    for seq, post_id in enumerate(post_ids, start=first_seq)
+                ]
+            )
+
+
+class PostChange(models.Model):
+    """
+    An entry in the change log of a dialogue, recording that a post was
+    added, edited or deleted. Entries are numbered by a sequence that
+    strictly increases per dialogue, so clients sync from the last
+    number they've seen and only ever load what changed since. Like
+    `ReadCursor`, the post ID is stored as a plain integer, which also
+    keeps the tombstones of deleted posts.
+    """
+
+    class Kind(models.TextChoices):
+        INSERT = "insert"
+        EDIT = "edit"
+        DELETE = "delete"
+
+    # not enforced by the database, as for posts
+    dialogue = models.ForeignKey(
+        Dialogue, on_delete=models.CASCADE, related_name="changes", db_constraint=False
+    )
+    seq = models.BigIntegerField()
+    post_id = models.BigIntegerField()
+    kind = models.CharField(max_length=6, choices=Kind.choices)
+    created_on = models.DateTimeField(default=timezone.now)
+
+    objects = PostChangeQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dialogue", "seq"], name="unique_post_change_seq"
+            )
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.kind} of post {self.post_id} in {self.dialogue_id}"
+
+
+class ReadCursorQuerySet(models.QuerySet):
+    def advance(self, user, dialogue, post_id):
+        """
+        Move the read cursor of a user in a dialogue forward to
+        `post_id`. Cursors are never moved backward, so an outdated tab
+        can't mark read posts as unread again.
+        """
+        updated = self.filter(
+            user=user, dialogue=dialogue, last_read_post_id__lt=post_id
+        ).update(last_read_post_id=post_id, modified_on=timezone.now())
+
+        if not updated:
+            self.bulk_create(
+                [ReadCursor(user=user, dialogue=dialogue, last_read_post_id=post_id)],
+                ignore_conflicts=True,
+            )
+
+    async def aadvance(self, user, dialogue, post_id):
+        """Async version of `advance`."""
+        updated = await self.filter(
+            user=user, dialogue=dialogue, last_read_post_id__lt=post_id
+        ).aupdate(last_read_post_id=post_id, modified_on=timezone.now())
+
+        if not updated:
+            await self.abulk_create(
+                [ReadCursor(user=user, dialogue=dialogue, last_read_post_id=post_id)],
+                ignore_conflicts=True,
+            )
+
+
+class ReadCursor(models.Model):
+    """
+    The ID of the last post a user has read in a dialogue, used to count
+    unread posts. The post ID is stored as a plain integer since it's
+    only ever compared against other post IDs.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="read_cursors"
+    )
+    dialogue = models.ForeignKey(
+        Dialogue, on_delete=models.CASCADE, related_name="read_cursors"
+    )
+    last_read_post_id = models.BigIntegerField(default=0)
+    modified_on = models.DateTimeField(auto_now=True)
+
+    objects = ReadCursorQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "dialogue"], name="unique_read_cursor"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user} read {self.dialogue} up to {self.last_read_post_id}"
+
+
+class SubscriptionQuerySet(models.QuerySet):
+    def subscribe(self, user, dialogue):
+        """Subscribe a user to a dialogue, if they aren't subscribed."""
+        with transaction.atomic():
+            _, created = self.get_or_create(user=user, dialogue=dialogue)
+            if created:
+                Dialogue.all_objects.filter(id=dialogue.id).update(
+                    subscriber_count=F("subscriber_count") + 1
+                )
+
+    def unsubscribe(self, user, dialogue):
+        """
+        Unsubscribe a user from a dialogue and remove the dialogue's
+        posts from their inbox.
+        """
+        with transaction.atomic():
+            deleted, _ = self.filter(user=user, dialogue=dialogue).delete()
+            if deleted:
+                Dialogue.all_objects.filter(id=dialogue.id).update(
+                    subscriber_count=F("subscriber_count") - 1
+                )
+                InboxEntry.objects.filter(user=user, dialogue=dialogue).delete()
+
+
+class Subscription(models.Model):
+    """A user following the posts of a visible dialogue."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="subscriptions"
+    )
+    dialogue = models.ForeignKey(
+        Dialogue, on_delete=models.CASCADE, related_name="subscriptions"
+    )
+    created_on = models.DateTimeField(auto_now_add=True)
+
+    objects = SubscriptionQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dialogue", "user"], name="unique_subscription"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user} subscribed to {self.dialogue}"
+
+
+class InboxEntry(models.Model):
+    """
+    A post in a dialogue a user is subscribed to, added to the user's
+    inbox when the post is fanned out. The unique constraint on the user
+    and post ID doubles as the index that reads an inbox, newest first,
+    in one range scan. Like `ReadCursor`, the post ID is stored as a
+    plain integer.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="inbox"
+    )
+    dialogue = models.ForeignKey(
+        Dialogue, on_delete=models.CASCADE, related_name="inbox_entries"
+    )
+    post_id = models.BigIntegerField()
+    created_on = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "inbox entries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post_id"], name="unique_inbox_entry"
+            )
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} in the inbox of {self.user}"
+
+
+class DialogueRanking(models.Model):
+    """
+    The position of a public dialogue on the discovery page. Rankings
+    are a summary of the posts table, recomputed in full by a periodic
+    job rather than aggregated per request, and are read a page at a
+    time by `rank`.
+    """
+
+    dialogue = models.OneToOneField(
+        Dialogue, on_delete=models.CASCADE, primary_key=True, related_name="ranking"
+    )
+    rank = models.PositiveIntegerField(unique=True)
+    score = models.FloatField()
+    post_count = models.PositiveIntegerField()
+    last_activity_on = models.DateTimeField()
+
+    class Meta:
+        ordering = ["rank"]
+
+    def __str__(self):
+        return f"#{self.rank} {self.dialogue}"
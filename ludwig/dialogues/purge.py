@@ -0,0 +1,198 @@
+"""
+Background purging of soft-deleted dialogues and users.
+
+Deleting a dialogue or user through the ORM loads every related post
+and participant row into Python to cascade the delete, which blocks a
+worker and holds locks for seconds on large dialogues. Instead, related
+rows are removed with set-based DELETE statements in batches of bounded
+size, each in its own transaction, and only the then childless dialogue
+or user is deleted through the ORM.
+
+Every step only deletes what's left, and the soft-delete mark stays in
+place until the final row is gone, so an interrupted purge continues
+where it stopped when run again.
+"""
+
+import time
+from collections import defaultdict
+from functools import partial
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F
+
+from .constants import PURGE_BATCH_SIZE
+from .models import (
+    Dialogue,
+    InboxEntry,
+    Post,
+    PostChange,
+    ReadCursor,
+    Subscription,
+    get_sentinel_user,
+)
+from .sharding import get_all_shards
+from .signals import invalidate_dialogue
+
+Participant = Dialogue.participants.through
+
+
+def delete_in_batches(
+    model,
+    column,
+    value,
+    returning="id",
+    on_delete=None,
+    batch_size=PURGE_BATCH_SIZE,
+    pause=0,
+    progress=None,
+    using=DEFAULT_DB_ALIAS,
+):
+    """
+    Delete the rows of `model` whose `column` equals `value` in batches
+    of `batch_size` rows from the database `using` and return the number
+    of deleted rows.
+
+    After every batch, `on_delete` is called in the same transaction
+    with the set of values of the `returning` column of the deleted
+    rows, or of tuples of values if `returning` names several columns,
+    and `progress` with the model and the number of rows deleted
+    so far. `pause` seconds are slept between batches to leave room for
+    other queries.
+    """
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+    table = quote_name(model._meta.db_table)
+    pk = quote_name(model._meta.pk.column)
+    column = quote_name(column)
+    columns = [returning] if isinstance(returning, str) else returning
+
+    # the column is filtered in the outer statement as well so that the
+    # planner can prune partitions of partitioned tables
+    sql = f"""
+        DELETE FROM {table}
+        WHERE {column} = %s AND {pk} IN (
+            SELECT {pk} FROM {table} WHERE {column} = %s LIMIT %s
+        )
+        RETURNING {", ".join(quote_name(name) for name in columns)}
+    """
+
+    total = 0
+
+    while True:
+        with transaction.atomic(using=using):
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [value, value, batch_size])
+                rows = cursor.fetchall()
+
+            if on_delete:
+                on_delete(
+                    {row[0] for row in rows}
+                    if isinstance(returning, str)
+                    else set(rows)
+                )
+
+        total += len(rows)
+
+        if progress:
+            progress(model, total)
+
+        if len(rows) < batch_size:
+            return total
+
+        time.sleep(pause)
+
+
+def purge_dialogue(dialogue, **kwargs):
+    """
+    Delete a soft-deleted dialogue along with its posts, change log,
+    read cursors, subscriptions and participants. Keyword arguments are
+    passed on to `delete_in_batches`.
+    """
+    for model in (Post, PostChange):
+        delete_in_batches(
+            model, "dialogue_id", dialogue.id, using=dialogue.shard, **kwargs
+        )
+    delete_in_batches(ReadCursor, "dialogue_id", dialogue.id, **kwargs)
+    delete_in_batches(InboxEntry, "dialogue_id", dialogue.id, **kwargs)
+    delete_in_batches(Subscription, "dialogue_id", dialogue.id, **kwargs)
+    delete_in_batches(Participant, "dialogue_id", dialogue.id, **kwargs)
+
+    # nothing is left to cascade, so the collector only checks that the
+    # related tables are empty
+    Dialogue.all_objects.filter(id=dialogue.id).delete()
+
+
+def purge_user(user, **kwargs):
+    """
+    Delete a soft-deleted user along with their posts, read cursors,
+    inbox, subscriptions and participations, and hand their dialogues
+    over to the sentinel user. Keyword arguments are passed on to
+    `delete_in_batches`.
+    """
+    # the user's posts may be on any shard
+    for shard in get_all_shards():
+        delete_in_batches(
+            Post,
+            "author_id",
+            user.id,
+            ("dialogue_id", "id"),
+            partial(_tombstone_posts, using=shard),
+            using=shard,
+            **kwargs,
+        )
+    delete_in_batches(ReadCursor, "user_id", user.id, **kwargs)
+    delete_in_batches(InboxEntry, "user_id", user.id, **kwargs)
+    delete_in_batches(
+        Subscription, "user_id", user.id, "dialogue_id", _unsubscribe, **kwargs
+    )
+    delete_in_batches(
+        Participant, "user_id", user.id, "dialogue_id", _invalidate_dialogues, **kwargs
+    )
+
+    authored_dialogues = Dialogue.all_objects.filter(author=user)
+    authored_ids = set(authored_dialogues.values_list("id", flat=True))
+    authored_dialogues.update(author=get_sentinel_user())
+    _invalidate_dialogues(authored_ids)
+
+    user.delete()
+
+
+def _tombstone_posts(rows, using=DEFAULT_DB_ALIAS):
+    """
+    Record tombstones for posts deleted by a raw delete from the shard
+    `using`, from their dialogue and post IDs, and invalidate their
+    dialogues.
+    """
+    post_ids = defaultdict(list)
+    for dialogue_id, post_id in rows:
+        post_ids[dialogue_id].append(post_id)
+
+    # posts left behind on a shard by an interrupted move of their
+    # dialogue are deleted without tombstones, which belong in the
+    # change log on the dialogue's shard
+    placed_ids = Dialogue.all_objects.filter(id__in=post_ids, shard=using)
+
+    # dialogues are locked in a fixed order, so concurrent purges can't
+    # deadlock on their sequence numbers
+    for dialogue_id in sorted(placed_ids.values_list("id", flat=True)):
+        PostChange.objects.using(using).record(
+            dialogue_id, sorted(post_ids[dialogue_id]), PostChange.Kind.DELETE
+        )
+
+    _invalidate_dialogues(post_ids)
+
+
+def _unsubscribe(dialogue_ids):
+    """Update the subscriber counts of dialogues a user unsubscribed from."""
+    Dialogue.all_objects.filter(id__in=dialogue_ids).update(
+        subscriber_count=F("subscriber_count") - 1
+    )
+
+
+def _invalidate_dialogues(dialogue_ids):
+    """
+    Invalidate dialogues changed by raw deletes or updates, which
+    don't send any signals.
+    """
+    for dialogue in Dialogue.all_objects.filter(id__in=dialogue_ids).only("id", "slug"):
+        invalidate_dialogue(dialogue)
@@ -0,0 +1,277 @@
+"""
+Rankings of public dialogues for the discovery page.
+
+Ranking dialogues by activity aggregates the posts of every public
+dialogue, which is far too slow to do per request. Instead, a periodic
+job computes all scores at once into the `DialogueRanking` summary
+table, so the cost of ranking depends on the refresh interval rather
+than the request rate. The table is replaced in a single transaction,
+so readers keep seeing the previous rankings until the new ones are
+committed, as with a concurrently refreshed materialized view.
+
+Pages are read by keyset on the `rank` column, and cached under a
+rankings version that is bumped on every refresh.
+
+Views of dialogue pages are counted in the cache rather than written to
+the dialogue on every request. They're counted in windows of
+`VIEW_FLUSH_INTERVAL` seconds, each with a list of the dialogues viewed
+in it, and `flush_views` adds the views of windows that have ended to
+those dialogues only. The cache has to be shared with the workers that
+run the flushes, which a local memory cache isn't.
+"""
+
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+from .constants import (
+    DISCOVER_PAGE_SIZE,
+    RANKING_GRAVITY,
+    RANKING_REFRESH_INTERVAL,
+    RANKING_WINDOW_DAYS,
+    VIEW_COUNT_TIMEOUT,
+    VIEW_FLUSH_BATCH_SIZE,
+    VIEW_FLUSH_INTERVAL,
+    VIEWS_PER_POST,
+)
+from .models import Dialogue, DialogueRanking, Post
+from .sharding import map_shards
+
+VERSION_KEY = "dialogue_rankings_version"
+FLUSHED_VIEWS_KEY = "dialogue_views:flushed"
+
+
+def get_rankings_version():
+    """Get the current cache version of the rankings."""
+    version = cache.get(VERSION_KEY)
+
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+
+    return version
+
+
+def bump_rankings_version():
+    """Invalidate all cached pages of the rankings."""
+    cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def _get_view_window(timestamp):
+    return int(timestamp // VIEW_FLUSH_INTERVAL)
+
+
+def _get_views_key(window, slug):
+    return f"dialogue_views:{window}:{slug}"
+
+
+def _get_viewed_key(window, number=None):
+    if number is None:
+        return f"dialogue_views:{window}:viewed"
+    return f"dialogue_views:{window}:viewed:{number}"
+
+
+def count_view(slug):
+    """Count a view of a dialogue page in the cache."""
+    window = _get_view_window(time.time())
+    key = _get_views_key(window, slug)
+
+    if not cache.add(key, 1, VIEW_COUNT_TIMEOUT):
+        try:
+            cache.incr(key)
+            return
+        except ValueError:
+            # the counter was evicted since it was added
+            if not cache.add(key, 1, VIEW_COUNT_TIMEOUT):
+                return
+
+    # the first view of a dialogue in a window adds it to the numbered
+    # list of the dialogues viewed in the window
+    viewed_key = _get_viewed_key(window)
+    cache.add(viewed_key, 0, VIEW_COUNT_TIMEOUT)
+    try:
+        number = cache.incr(viewed_key)
+    except ValueError:
+        # the list was evicted since it was added, and the views of the
+        # dialogue in this window are lost with it
+        return
+    cache.set(_get_viewed_key(window, number), slug, VIEW_COUNT_TIMEOUT)
+
+
+def flush_views(now=None, batch_size=VIEW_FLUSH_BATCH_SIZE):
+    """
+    Add the views counted in the cache to their dialogues, for every
+    window that ended at least a window before `now`, since requests
+    that started in a window may still count views in it after it ended.
+    Returns the number of flushed views.
+    """
+    last_window = _get_view_window(time.time() if now is None else now) - 2
+    first_window = last_window - VIEW_COUNT_TIMEOUT // VIEW_FLUSH_INTERVAL + 1
+    flushed_window = cache.get(FLUSHED_VIEWS_KEY)
+
+    if flushed_window is not None:
+        first_window = max(first_window, flushed_window + 1)
+
+    flushed = 0
+
+    for window in range(first_window, last_window + 1):
+        flushed += _flush_window(window, batch_size)
+        cache.set(FLUSHED_VIEWS_KEY, window, timeout=None)
+
+    return flushed
+
+
+def _flush_window(window, batch_size):
+    """
+    Add the views counted in a window to their dialogues, a batch of
+    dialogues at a time. The counters of a batch are only deleted once
+    its views are written, so a failed flush is picked up by the next.
+    """
+    viewed_count = cache.get(_get_viewed_key(window), 0)
+    flushed = 0
+
+    for start in range(1, viewed_count + 1, batch_size):
+        viewed_keys = [
+            _get_viewed_key(window, number)
+            for number in range(start, min(start + batch_size, viewed_count + 1))
+        ]
+        views_keys = {
+            _get_views_key(window, slug): slug
+            for slug in cache.get_many(viewed_keys).values()
+        }
+
+        # dialogues with the same number of views are updated together
+        slugs_by_views = defaultdict(list)
+        for key, views in cache.get_many(views_keys).items():
+            slugs_by_views[views].append(views_keys[key])
+
+        with transaction.atomic():
+            for views, slugs in slugs_by_views.items():
+                Dialogue.objects.filter(slug__in=slugs).update(views=F("views") + views)
+                flushed += views * len(slugs)
+
+        cache.delete_many([*viewed_keys, *views_keys])
+
+    cache.delete(_get_viewed_key(window))
+    return flushed
+
+
+def get_score(recent_post_count, views, last_activity_on, now):
+    """
+    Score a dialogue by its recent posts and views, decaying with the
+    hours since its last activity, so that busy dialogues rise to the
+    top and quiet ones sink over time.
+    """
+    hours = (now - last_activity_on).total_seconds() / 3600
+    activity = recent_post_count + views / VIEWS_PER_POST
+    return activity / (max(hours, 0) + 2) ** RANKING_GRAVITY
+
+
+def refresh_rankings():
+    """
+    Rank all public dialogues and replace the rankings table. Returns
+    the number of ranked dialogues.
+    """
+    now = timezone.now()
+    dialogues = {
+        dialogue_id: (shard, views, created_on)
+        for dialogue_id, shard, views, created_on in Dialogue.objects.filter(
+            is_visible=True
+        ).values_list("id", "shard", "views", "created_on")
+    }
+
+    # posts can't be joined with dialogues on other shards, so the posts
+    # on each shard are aggregated by dialogue in parallel, and matched
+    # with the dialogues placed on that shard
+    def aggregate_posts(shard):
+        return list(
+            Post.objects.using(shard)
+            .values("dialogue_id")
+            .annotate(
+                post_count=Count("id"),
+                recent_post_count=Count(
+                    "id",
+                    filter=Q(created_on__gte=now - timedelta(days=RANKING_WINDOW_DAYS)),
+                ),
+                last_post_on=Max("created_on"),
+            )
+            .order_by()
+            .values_list(
+                "dialogue_id", "post_count", "recent_post_count", "last_post_on"
+            )
+        )
+
+    shards = sorted({shard for shard, _, _ in dialogues.values()})
+    post_counts = {}
+    for shard, rows in zip(shards, map_shards(aggregate_posts, shards)):
+        for dialogue_id, *counts in rows:
+            if dialogue_id in dialogues and dialogues[dialogue_id][0] == shard:
+                post_counts[dialogue_id] = counts
+
+    scored = []
+    for dialogue_id, (_, views, created_on) in dialogues.items():
+        post_count, recent, last_activity_on = post_counts.get(
+            dialogue_id, (0, 0, created_on)
+        )
+        score = get_score(recent, views, last_activity_on, now)
+        scored.append((score, dialogue_id, post_count, last_activity_on))
+
+    # ties are broken by ID so that equal dialogues keep their order
+    # between refreshes
+    scored.sort(key=lambda row: (-row[0], row[1]))
+
+    rankings = [
+        DialogueRanking(
+            dialogue_id=dialogue_id,
+            rank=rank,
+            score=score,
+            post_count=post_count,
+            last_activity_on=last_activity_on,
+        )
+        for rank, (score, dialogue_id, post_count, last_activity_on) in enumerate(
+            scored, start=1
+        )
+    ]
+
+    with transaction.atomic():
+        DialogueRanking.objects.all().delete()
+        DialogueRanking.objects.bulk_create(rankings)
+        transaction.on_commit(bump_rankings_version)
+
+    return len(rankings)
+
+
+def remove_ranking(dialogue_id):
+    """
+    Remove a dialogue that was hidden or deleted from the rankings until
+    the next refresh.
+    """
+    deleted, _ = DialogueRanking.objects.filter(dialogue_id=dialogue_id).delete()
+
+    if deleted:
+        transaction.on_commit(bump_rankings_version)
+
+
+def get_rankings_page(after=0, limit=DISCOVER_PAGE_SIZE):
+    """
+    Get the `limit` ranked dialogues below the rank `after`. Returns the
+    rankings and the `after` value of the next page, or None if this is
+    the last page.
+    """
+    key = f"dialogue_rankings:{get_rankings_version()}:{after}:{limit}"
+    rankings = cache.get(key)
+
+    if rankings is None:
+        rankings = list(
+            DialogueRanking.objects.filter(rank__gt=after)
+            .select_related("dialogue")
+            .order_by("rank")[:limit]
+        )
+        cache.set(key, rankings, RANKING_REFRESH_INTERVAL)
+
+    return rankings, rankings[-1].rank if len(rankings) == limit else None
@@ -0,0 +1,73 @@
+"""
+Compact rows for rendering long lists of posts.
+
+A `Post` instance carries its model state and field cache, plus a whole
+`User` instance for its author with the same overhead, which adds up to
+several kilobytes per post on the page of a long dialogue. Rows only
+hold the values the post template shows, in slots, and are built from
+plain tuples streamed from the database in chunks, so rendering a page
+never holds a model instance per post.
+"""
+
+from itertools import batched
+
+from django.db import DEFAULT_DB_ALIAS
+
+from ludwig.accounts.models import User
+
+from .constants import POST_ROW_CHUNK_SIZE
+
+
+class PostRow:
+    """The values of a post that are rendered with it."""
+
+    __slots__ = ("id", "author_id", "author_name", "created_on", "body")
+
+    # fields of a post queryset that rows are built from, in order
+    fields = ("id", "author_id", "author__username", "created_on", "body")
+
+    def __init__(self, id, author_id, author_name, created_on, body):
+        self.id = id
+        self.author_id = author_id
+        self.author_name = author_name
+        self.created_on = created_on
+        self.body = body
+
+
+def iter_post_rows(posts, chunk_size=POST_ROW_CHUNK_SIZE):
+    """
+    Stream the posts of a queryset as rows, fetching `chunk_size` of
+    them from the database at a time.
+    """
+
+    if posts.db != DEFAULT_DB_ALIAS:
+        yield from _iter_sharded_post_rows(posts, chunk_size)
+        return
+
+    values = posts.values_list(*PostRow.fields).iterator(chunk_size=chunk_size)
+
+    for post_values in values:
+        yield PostRow(*post_values)
+
+
+def _iter_sharded_post_rows(posts, chunk_size):
+    """
+    Stream posts on another shard than the default database, which
+    can't be joined with their authors, so the names of the authors are
+    looked up for each chunk instead.
+    """
+
+    values = (
+        posts.prefetch_related(None)
+        .values_list("id", "author_id", "created_on", "body")
+        .iterator(chunk_size=chunk_size)
+    )
+
+    for chunk in batched(values, chunk_size):
+        author_ids = {author_id for _, author_id, _, _ in chunk}
+        author_names = dict(
+            User.objects.filter(id__in=author_ids).values_list("id", "username")
+        )
+
+        for id, author_id, created_on, body in chunk:
+            yield PostRow(id, author_id, author_names.get(author_id), created_on, body)
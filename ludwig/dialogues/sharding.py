@@ -0,0 +1,235 @@
+"""
+Horizontal sharding of posts by dialogue.
+
+The posts and change log of each dialogue are kept on one of the
+databases in `DIALOGUE_SHARDS`, recorded in the dialogue's `shard`
+field. Everything else, including dialogues, users and participants,
+stays on the default database, which may be one of the shards itself.
+
+A new dialogue is placed by a rendezvous hash of its slug, which is
+stable across processes and releases, and only moves the dialogues that
+are placed on a new shard when one is added to the setting. The
+`rebalance_dialogues` command moves dialogues to the shard their hash
+places them on after the setting changed.
+
+Queries of a single dialogue's posts go through its `posts` and
+`changes` managers, whose hints route them to its shard. Queries across
+dialogues, like the dashboard's, are run on every shard involved in
+parallel by `query_shards` and merged by the caller. Rows on a shard
+can't be joined with the tables of the default database, so their
+foreign keys to it have no database constraints, and post IDs are
+allocated from the sequence of the default database, so they stay
+unique and ordered by time across shards.
+
+Shards other than the default database only have the tables of the
+sharded models, which migration 0018 creates from their state at the
+time. Later changes to those models need an operation for the shards
+of their own, with the `shard_tables` hint.
+"""
+
+import functools
+import hashlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import chain
+
+from django.apps import apps
+from django.conf import settings
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    close_old_connections,
+    connections,
+    transaction,
+)
+
+# models whose rows are kept on the shard of their dialogue
+SHARDED_MODELS = {"dialogues.Post", "dialogues.PostChange"}
+
+
+class DialogueMoved(Exception):
+    """A dialogue's posts were written to a shard it was moved away from."""
+
+
+def get_shard(slug, shards=None):
+    """
+    Get the shard of `shards`, by default the ones in `DIALOGUE_SHARDS`,
+    that a dialogue with `slug` is placed on. Each shard is weighed by a
+    hash of its name and the slug, and the heaviest one wins.
+    """
+
+    def weigh(shard):
+        digest = hashlib.blake2b(f"{shard}:{slug}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest)
+
+    return max(settings.DIALOGUE_SHARDS if shards is None else shards, key=weigh)
+
+
+def get_all_shards():
+    """
+    Get every shard that holds posts, including shards that were taken
+    out of `DIALOGUE_SHARDS` but still hold dialogues until they are
+    rebalanced.
+    """
+    Dialogue = apps.get_model("dialogues", "Dialogue")
+    shards = Dialogue.all_objects.values_list("shard", flat=True).order_by()
+    return sorted({*settings.DIALOGUE_SHARDS, *shards.distinct()})
+
+
+class DialogueShardRouter:
+    """
+    Route posts and change logs to the shard of their dialogue, as told
+    by the dialogue or post in the hints of related managers and saves,
+    and all other models to the default database. Without hints, posts
+    are read from the default database, and from other shards with
+    `using` where the dialogue's shard is known.
+    """
+
+    def _get_shard(self, model, instance=None, **hints):
+        # everything else is kept on the default database, which Django
+        # would otherwise only fall back to for rows that aren't related
+        # to a post on another shard
+        if model._meta.label not in SHARDED_MODELS:
+            return DEFAULT_DB_ALIAS
+        if instance is None:
+            return None
+
+        if instance._meta.label == "dialogues.Dialogue":
+            return instance.shard or None
+
+        if instance._meta.label in SHARDED_MODELS:
+            if instance._state.db:
+                return instance._state.db
+            if instance.dialogue_id is not None:
+                return instance.dialogue.shard or None
+
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._get_shard(model, **hints)
+
+    def db_for_write(self, model, **hints):
+        return self._get_shard(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # rows on a shard refer to dialogues and users on the default
+        # database by design
+        if {obj1._meta.label, obj2._meta.label} & SHARDED_MODELS:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # operations for the tables of sharded models on other shards
+        # only run there, and every other operation only on the default
+        # database
+        if hints.get("shard_tables"):
+            return db != DEFAULT_DB_ALIAS
+        if db == DEFAULT_DB_ALIAS:
+            return None
+        # the current sharded models are still on the other shards, for
+        # flushing and introspecting them, unlike the historical models
+        # of migrations
+        model = hints.get("model")
+        return (
+            model is not None
+            and model._meta.apps is apps
+            and model._meta.label in SHARDED_MODELS
+        )
+
+
+@contextmanager
+def shard_atomic(using, savepoint=True):
+    """
+    Run a block in a transaction on the default database and, when
+    `using` is another shard, a nested one on that shard. The shard
+    commits first, so rows locked on the default database, like the
+    change sequence of a dialogue, stay locked until the rows written to
+    the shard are visible. If the commit on the default database fails
+    after that, the rows stay on the shard, which `PostChange.record`
+    recovers from. Without `savepoint`, a block in a transaction that's
+    already open joins it, as with `transaction.atomic`.
+    """
+    with transaction.atomic(savepoint=savepoint):
+        if using == DEFAULT_DB_ALIAS:
+            yield
+        else:
+            with transaction.atomic(using=using, savepoint=savepoint):
+                yield
+
+
+def allocate_id(model):
+    """
+    Take the next ID from the table of `model` on the default database,
+    for a row that is added to another shard. The tables on the other
+    shards never generate IDs themselves, so IDs stay unique and ordered
+    by time across shards.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    table = model._meta.db_table
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT nextval(pg_get_serial_sequence(%s, 'id'))", [table])
+            return cursor.fetchone()[0]
+
+    # SQLite numbers rows of tables with AUTOINCREMENT keys after their
+    # entry in sqlite_sequence, which is only added by the first insert
+    with transaction.atomic(using=DEFAULT_DB_ALIAS), connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO sqlite_sequence (name, seq)
+            SELECT %s, (SELECT COALESCE(MAX(id), 0) FROM {table})
+            WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)
+            """,
+            [table, table],
+        )
+        cursor.execute(
+            "UPDATE sqlite_sequence SET seq = seq + 1 WHERE name = %s RETURNING seq",
+            [table],
+        )
+        return cursor.fetchone()[0]
+
+
+# threads running the queries of a fan-out, created on first use
+@functools.cache
+def _get_executor():
+    return ThreadPoolExecutor(thread_name_prefix="shard")
+
+
+def _run_in_thread(func, shard):
+    # connections are opened per thread, and closed after each query
+    # unless they are persistent
+    close_old_connections()
+    try:
+        return func(shard)
+    finally:
+        close_old_connections()
+
+
+def map_shards(func, shards):
+    """
+    Call `func(shard)` for each of `shards` in parallel threads and get
+    the results in order. A single shard is queried in the calling
+    thread, which saves the hop to another thread and keeps its queries
+    in the current transaction.
+    """
+    shards = list(shards)
+    if len(shards) <= 1:
+        return [func(shard) for shard in shards]
+
+    return list(_get_executor().map(functools.partial(_run_in_thread, func), shards))
+
+
+def query_shards(dialogues, query):
+    """
+    Call `query(shard, dialogue_ids)` with the IDs of the `dialogues` on
+    each shard, in parallel, and chain the rows it returns.
+    """
+    dialogue_ids = defaultdict(list)
+    for dialogue in dialogues:
+        dialogue_ids[dialogue.shard].append(dialogue.id)
+
+    results = map_shards(
+        lambda shard: list(query(shard, dialogue_ids[shard])), dialogue_ids
+    )
+    return list(chain.from_iterable(results))
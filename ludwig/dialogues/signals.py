@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_dialogue_version
+from .inbox import is_fanned_out_on_write
+from .jobs import fan_out_post
+from .models import Dialogue, Post, PostChange
+from .ranking import remove_ranking
+from .snapshots import delete_snapshot
+
+
+def invalidate_dialogue(dialogue):
+    """Drop the snapshot and all cached data of a dialogue."""
+    delete_snapshot(dialogue.slug)
+    bump_dialogue_version(dialogue.id)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    """
+    Record a post that's added or edited in the change log of its
+    dialogue and invalidate the dialogue, and fan out new posts to the
+    inboxes of subscribers once they're committed.
+    """
+    kind = PostChange.Kind.INSERT if created else PostChange.Kind.EDIT
+    PostChange.objects.using(instance._state.db).record(
+        instance.dialogue_id, [instance.id], kind
+    )
+    invalidate_dialogue(instance.dialogue)
+
+    if created and is_fanned_out_on_write(instance.dialogue):
+        transaction.on_commit(
+            lambda: fan_out_post.enqueue(
+                post_id=instance.id, dialogue_id=instance.dialogue_id
+            )
+        )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, origin, **kwargs):
+    """
+    Record a tombstone for a deleted post in the change log of its
+    dialogue and invalidate the dialogue. Posts deleted along with their
+    dialogue leave no tombstones, since the change log goes too.
+    """
+    if isinstance(origin, Dialogue) or (
+        isinstance(origin, QuerySet) and origin.model is Dialogue
+    ):
+        return
+
+    PostChange.objects.using(instance._state.db).record(
+        instance.dialogue_id, [instance.id], PostChange.Kind.DELETE
+    )
+    invalidate_dialogue(instance.dialogue)
+
+
+@receiver(post_save, sender=Dialogue)
+@receiver(post_delete, sender=Dialogue)
+def dialogue_changed(sender, instance, **kwargs):
+    """
+    Invalidate the dialogue when it's changed, including its
+    visibility, or deleted, and take it off the discovery page once
+    it's no longer public.
+    """
+    invalidate_dialogue(instance)
+
+    if not instance.is_visible or instance.deleted_on:
+        remove_ranking(instance.id)
+
+
+@receiver(m2m_changed, sender=Dialogue.participants.through)
+def participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalidate the dialogue when its participants change. When the
+    change is made from the user side, `instance` is the user and
+    `pk_set` holds the IDs of the affected dialogues.
+    """
+    if not reverse and action in ("post_add", "post_remove", "post_clear"):
+        dialogues = [instance]
+    elif reverse and action in ("post_add", "post_remove"):
+        dialogues = Dialogue.all_objects.filter(id__in=pk_set).only("id", "slug")
+    elif reverse and action == "pre_clear":
+        # the dialogues of the user are only known before clearing
+        dialogues = instance.dialogues.only("id", "slug")
+    else:
+        return
+
+    for dialogue in dialogues:
+        invalidate_dialogue(dialogue)
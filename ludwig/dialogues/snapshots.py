@@ -0,0 +1,63 @@
+"""
+Static snapshots of dormant public dialogues. A snapshot is the page an
+anonymous visitor would see, rendered once and stored on disk as gzip
+compressed HTML, so visits to old dialogues are served without touching
+the database or rendering any markdown. Snapshots are named by the slug
+in the URL of their dialogue and deleted as soon as anything on the page
+changes.
+"""
+
+import gzip
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+
+def get_snapshot_path(slug):
+    """Get the path of the snapshot of a dialogue."""
+    return Path(settings.SNAPSHOT_ROOT) / f"{slug}.html.gz"
+
+
+def write_snapshot(slug, content):
+    """
+    Compress and write the snapshot of a dialogue. The snapshot is
+    written to a temporary file first, so a concurrent request never
+    reads a partially written snapshot.
+    """
+    path = get_snapshot_path(slug)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as file:
+        file.write(gzip.compress(content, compresslevel=9))
+
+    os.replace(file.name, path)
+
+
+def delete_snapshot(slug):
+    """Delete the snapshot of a dialogue if there is one."""
+    get_snapshot_path(slug).unlink(missing_ok=True)
+
+
+def serve_snapshot(request, slug):
+    """
+    Get a response with the snapshot of a dialogue, or None if the
+    dialogue doesn't have a snapshot. The compressed snapshot is sent
+    as is to clients that accept gzip.
+    """
+    try:
+        content = get_snapshot_path(slug).read_bytes()
+    except FileNotFoundError:
+        return None
+
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        response = HttpResponse(content)
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(gzip.decompress(content))
+
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
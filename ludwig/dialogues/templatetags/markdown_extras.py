@@ -1,11 +1,27 @@
+import threading
+
 import markdown as md
 from django import template
 from django.template.defaultfilters import stringfilter
 
 register = template.Library()
 
+_local = threading.local()
+
+
+def get_markdown_converter():
+    """
+    Get the markdown converter of the current thread. Creating a
+    converter sets up all of its processors, which costs more than
+    converting a typical post, so converters are reused. They aren't
+    thread-safe, hence one per thread.
+    """
+    if not hasattr(_local, "converter"):
+        _local.converter = md.Markdown()
+    return _local.converter
+
 
 @register.filter()
 @stringfilter
 def markdown(value):
-    return md.markdown(value)
+    return get_markdown_converter().reset().convert(value)
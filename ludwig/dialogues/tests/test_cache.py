@@ -0,0 +1,132 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ludwig.dialogues.cache import (
+    bump_dialogue_version,
+    get_dialogue_version,
+    get_or_set_dialogue_data,
+)
+from ludwig.dialogues.models import Dialogue, Post
+
+
+User = get_user_model()
+
+
+class DialogueCacheTests(TestCase):
+    """
+    Testing suite for versioned dialogue cache keys.
+
+    Tests included:
+        1. Version is stable until bumped
+        2. Bumping the version invalidates cached data
+        3. Evicted versions don't reuse previous versions
+        4. Creating a post bumps the version
+        5. Saving and deleting a dialogue bumps the version
+        6. Changing participants from either side bumps the version
+        7. Removed participants lose access on the next poll
+    """
+
+    def setUp(self):
+        """
+        Initial setup for the testing suite.
+        """
+        cache.clear()
+
+        self.user1 = User.objects.create_user(
+            username="testuser1",
+            email="testuser1@example.com",
+            password="testpassword"
+        )
+        self.user2 = User.objects.create_user(
+            username="testuser2",
+            email="testuser2@example.com",
+            password="testpassword"
+        )
+        self.dialogue = Dialogue.objects.create(title="Test", author=self.user1)
+        self.dialogue.participants.add(self.user2)
+
+    def _assert_bumps_version(self, change):
+        version = get_dialogue_version(self.dialogue.id)
+        change()
+        self.assertNotEqual(get_dialogue_version(self.dialogue.id), version)
+
+    def test_version_stable(self):
+        """
+        The version of a dialogue shouldn't change until it's bumped.
+        """
+        version = get_dialogue_version(self.dialogue.id)
+
+        self.assertEqual(get_dialogue_version(self.dialogue.id), version)
+
+    def test_bump_invalidates_data(self):
+        """
+        Cached data should be recomputed after the version is bumped.
+        """
+        get_or_set_dialogue_data(self.dialogue.id, "data", lambda: "old")
+        self.assertEqual(
+            get_or_set_dialogue_data(self.dialogue.id, "data", lambda: "new"), "old"
+        )
+
+        bump_dialogue_version(self.dialogue.id)
+
+        self.assertEqual(
+            get_or_set_dialogue_data(self.dialogue.id, "data", lambda: "new"), "new"
+        )
+
+    def test_evicted_version(self):
+        """
+        Data cached under a version should not be read again after the
+        version itself is evicted from the cache.
+        """
+        get_or_set_dialogue_data(self.dialogue.id, "data", lambda: "old")
+        cache.delete(f"dialogue_version:{self.dialogue.id}")
+
+        self.assertEqual(
+            get_or_set_dialogue_data(self.dialogue.id, "data", lambda: "new"), "new"
+        )
+
+    def test_post_create_bumps_version(self):
+        """
+        Creating a post should bump the version of its dialogue.
+        """
+        self._assert_bumps_version(
+            lambda: Post.objects.create(
+                dialogue=self.dialogue, author=self.user1, body="Test"
+            )
+        )
+
+    def test_dialogue_save_and_delete_bump_version(self):
+        """
+        Saving or deleting a dialogue should bump its version.
+        """
+        self._assert_bumps_version(self.dialogue.save)
+        self._assert_bumps_version(self.dialogue.delete)
+
+    def test_participants_change_bumps_version(self):
+        """
+        Adding or removing participants, from the dialogue or from the
+        user side, should bump the version of the dialogue.
+        """
+        self._assert_bumps_version(
+            lambda: self.dialogue.participants.remove(self.user2)
+        )
+        self._assert_bumps_version(lambda: self.user2.dialogues.add(self.dialogue))
+        self._assert_bumps_version(self.user2.dialogues.clear)
+
+    def test_removed_participant_denied(self):
+        """
+        A participant removed from a private dialogue should be denied
+        on the next poll, even though participants are cached.
+        """
+        self.client.force_login(self.user2)
+        url = reverse("dialogues:dialogue_detail_update", args=(self.dialogue.slug,))
+
+        response = self.client.get(url)
+        self.assertTemplateNotUsed(response, "dialogues/partials/403.html")
+
+        self.dialogue.participants.remove(self.user2)
+
+        response = self.client.get(url)
+        self.assertTemplateUsed(response, "dialogues/partials/403.html")
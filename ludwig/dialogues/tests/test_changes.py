@@ -0,0 +1,236 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ludwig.dialogues.changes import collapse_changes, get_changes_since, get_posts_at
+from ludwig.dialogues.models import Dialogue, Post, PostChange
+from ludwig.dialogues.purge import purge_user
+
+
+User = get_user_model()
+
+INSERT, EDIT, DELETE = PostChange.Kind
+
+
+class ChangeLogTests(TestCase):
+    """
+    Testing suite for the change log of dialogues.
+
+    Tests included:
+        1. Inserts, edits and deletions are numbered in sequence
+        2. Changes are collapsed to the last change of each post
+        3. Syncs load the changed posts only
+        4. Polls swap edited posts and remove deleted ones
+        5. Pages leave out posts added after their sequence number
+        6. Deleting a dialogue leaves no tombstones
+        7. Purging a user leaves tombstones of their posts
+        8. Saving a stale dialogue keeps its sequence number
+        9. Changed posts are loaded without unused author columns
+        10. Polls move past changes that cancel out
+    """
+
+    def setUp(self):
+        """
+        Initial setup for the testing suite.
+        """
+        cache.clear()
+        self.user1 = User.objects.create_user(
+            username="testuser1",
+            email="testuser1@example.com",
+            password="testpassword"
+        )
+        self.user2 = User.objects.create_user(
+            username="testuser2",
+            email="testuser2@example.com",
+            password="testpassword"
+        )
+        self.dialogue = Dialogue.objects.create(
+            title="Test", author=self.user1, is_visible=True
+        )
+        self.dialogue.participants.add(self.user2)
+        self.post = Post.objects.create(
+            dialogue=self.dialogue, author=self.user1, body="First post"
+        )
+
+    def _get_log(self):
+        return list(
+            PostChange.objects.filter(dialogue=self.dialogue)
+            .order_by("seq")
+            .values_list("seq", "post_id", "kind")
+        )
+
+    def test_changes_in_sequence(self):
+        """
+        Every insert, edit and deletion should be recorded with the next
+        sequence number of the dialogue.
+        """
+        self.post.body = "Edited post"
+        self.post.save()
+        post_id = self.post.id
+        self.post.delete()
+
+        self.dialogue.refresh_from_db()
+        self.assertEqual(
+            self._get_log(),
+            [(1, post_id, INSERT), (2, post_id, EDIT), (3, post_id, DELETE)],
+        )
+        self.assertEqual(self.dialogue.change_seq, 3)
+
+    def test_collapse_changes(self):
+        """
+        Only the last change of each post should be kept, with edits of
+        new posts kept as inserts and new posts that were deleted left
+        out.
+        """
+        changes = [
+            (1, INSERT), (1, EDIT),
+            (2, EDIT), (2, EDIT),
+            (3, INSERT), (3, DELETE),
+            (4, EDIT), (4, DELETE),
+        ]
+
+        self.assertEqual(
+            collapse_changes(changes), {1: INSERT, 2: EDIT, 4: DELETE}
+        )
+
+    def test_sync_since_seq(self):
+        """
+        A sync should only load the posts that changed since its
+        sequence number, and end at the last change.
+        """
+        second_post = Post.objects.create(
+            dialogue=self.dialogue, author=self.user2, body="Second post"
+        )
+        self.post.body = "Edited post"
+        self.post.save()
+
+        with self.assertNumQueries(2):
+            changes = get_changes_since(self.dialogue, 1)
+
+        self.assertEqual(changes["new_posts"], [second_post])
+        self.assertEqual(changes["edited_posts"], [self.post])
+        self.assertEqual(changes["seq"], 3)
+        self.assertEqual(get_changes_since(self.dialogue, 3)["seq"], 3)
+
+    def test_poll_edits_and_deletions(self):
+        """
+        A poll should swap edited posts in place and remove deleted
+        posts, out of band.
+        """
+        second_post = Post.objects.create(
+            dialogue=self.dialogue, author=self.user2, body="Second post"
+        )
+        self.post.body = "Edited post"
+        self.post.save()
+        second_post_id = second_post.id
+        second_post.delete()
+
+        response = self.client.get(
+            reverse("dialogues:dialogue_detail_update", args=[self.dialogue.slug]),
+            {"seq": 1},
+        )
+
+        self.assertContains(response, f'id="post_{self.post.id}"')
+        self.assertContains(response, 'hx-swap-oob="true"')
+        self.assertContains(response, "Edited post")
+        self.assertNotContains(response, "Second post")
+        self.assertNotContains(response, f'id="post_{second_post_id}"')
+        self.assertIn("seq=4", response.text)
+
+        post_id = self.post.id
+        self.post.delete()
+
+        response = self.client.get(
+            reverse("dialogues:dialogue_detail_update", args=[self.dialogue.slug]),
+            {"seq": 4},
+        )
+
+        self.assertContains(response, f'<div id="post_{post_id}" hx-swap-oob="delete">')
+        self.assertIn("seq=5", response.text)
+
+    def test_page_posts_at_seq(self):
+        """
+        Posts added after the sequence number of a page should be left
+        out of it, since they're sent by the first poll.
+        """
+        Post.objects.create(
+            dialogue=self.dialogue, author=self.user2, body="Later post"
+        )
+
+        self.assertEqual(list(get_posts_at(self.dialogue, 1)), [self.post])
+
+    def test_dialogue_delete_without_tombstones(self):
+        """
+        Deleting a dialogue should delete its change log along with its
+        posts, without recording tombstones.
+        """
+        self.dialogue.delete()
+
+        self.assertFalse(PostChange.objects.exists())
+
+    def test_purge_user_tombstones(self):
+        """
+        Purging a user should record a tombstone for each of their posts
+        in the dialogues that remain.
+        """
+        post = Post.objects.create(
+            dialogue=self.dialogue, author=self.user2, body="Purged post"
+        )
+
+        purge_user(self.user2)
+
+        self.assertEqual(self._get_log()[-1], (3, post.id, DELETE))
+        self.assertEqual(get_changes_since(self.dialogue, 2)["deleted_post_ids"], [post.id])
+
+    def test_stale_save_keeps_seq(self):
+        """
+        Saving a dialogue instance loaded before a post was added should
+        leave the sequence number of the dialogue alone.
+        """
+        stale_dialogue = Dialogue.objects.get(id=self.dialogue.id)
+        Post.objects.create(dialogue=self.dialogue, author=self.user1, body="New")
+
+        stale_dialogue.title = "Renamed"
+        stale_dialogue.save()
+
+        self.dialogue.refresh_from_db()
+        self.assertEqual(self.dialogue.title, "Renamed")
+        self.assertEqual(self.dialogue.change_seq, 2)
+
+    def test_changed_posts_author_columns(self):
+        """
+        Changed posts should be loaded with the author's username and
+        display name only, and showing the username shouldn't query.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            changes = get_changes_since(self.dialogue, 0)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(changes["new_posts"][0].author.username, "testuser1")
+
+        posts_query = queries[-1]["sql"]
+        self.assertIn('"accounts_user"."display_name"', posts_query)
+        self.assertNotIn('"accounts_user"."password"', posts_query)
+        self.assertNotIn('"accounts_user"."email"', posts_query)
+
+    def test_poll_cancelled_changes(self):
+        """
+        A poll whose changes cancel out, such as a post added and
+        deleted since the last poll, should still move the client's
+        sequence number on, so the changes aren't loaded again.
+        """
+        Post.objects.create(
+            dialogue=self.dialogue, author=self.user2, body="Second post"
+        ).delete()
+
+        response = self.client.get(
+            reverse("dialogues:dialogue_detail_update", args=[self.dialogue.slug]),
+            {"seq": 1},
+        )
+
+        self.assertNotContains(response, "Second post")
+        self.assertIn("seq=3", response.text)
+        self.assertContains(response, 'id="seq_input"')
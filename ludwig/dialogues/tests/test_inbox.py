@@ -0,0 +1,199 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from ludwig.dialogues.inbox import fan_out_post, get_inbox
+from ludwig.dialogues.models import Dialogue, InboxEntry, Post, Subscription
+from ludwig.dialogues.purge import purge_dialogue, purge_user
+from ludwig.jobs.worker import run_next_job
+
+
+User = get_user_model()
+
+
+class InboxTests(TestCase):
+    """
+    Testing suite for dialogue subscriptions and inboxes.
+
+    Tests included:
+        1. Subscribing and unsubscribing updates the subscriber count
+        2. New posts are fanned out to subscribers by a job
+        3. Posts of popular dialogues are merged into the inbox on read
+        4. Inboxes are paginated by post ID
+        5. Posts of hidden dialogues are left out of the inbox
+        6. Users can subscribe to public dialogues only
+        7. The inbox page shows the subscribed posts
+        8. Purging removes subscriptions and inbox entries
+    """
+
+    def setUp(self):
+        """
+        Initial setup for the testing suite.
+        """
+        self.author = User.objects.create_user(
+            username="testauthor",
+            email="testauthor@example.com",
+            password="testpassword"
+        )
+        self.subscriber = User.objects.create_user(
+            username="testsubscriber",
+            email="testsubscriber@example.com",
+            password="testpassword"
+        )
+        self.dialogue = Dialogue.objects.create(
+            title="Test", author=self.author, is_visible=True
+        )
+
+    def _create_post(self, body="Test post", dialogue=None):
+        """Create a post and run the jobs enqueued when it's committed."""
+        dialogue = Dialogue.objects.get(id=(dialogue or self.dialogue).id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(dialogue=dialogue, author=self.author, body=body)
+
+        while run_next_job():
+            pass
+
+        return post
+
+    def test_subscriber_count(self):
+        """
+        Subscribing should increase the subscriber count of a dialogue
+        once, and unsubscribing should decrease it and empty the inbox.
+        """
+        Subscription.objects.subscribe(self.subscriber, self.dialogue)
+        Subscription.objects.subscribe(self.subscriber, self.dialogue)
+        self.dialogue.refresh_from_db()
+        self.assertEqual(self.dialogue.subscriber_count, 1)
+
+        self._create_post()
+        Subscription.objects.unsubscribe(self.subscriber, self.dialogue)
+
+        self.dialogue.refresh_from_db()
+        self.assertEqual(self.dialogue.subscriber_count, 0)
+        self.assertFalse(InboxEntry.objects.filter(user=self.subscriber).exists())
+
+    def test_fan_out_on_write(self):
+        """
+        A new post should be added to the inbox of every subscriber but
+        its author, and fanning it out again shouldn't add duplicates.
+        """
+        Subscription.objects.subscribe(self.subscriber, self.dialogue)
+        Subscription.objects.subscribe(self.author, self.dialogue)
+
+        post = self._create_post()
+        fan_out_post(post)
+
+        entries = InboxEntry.objects.values_list("user_id", "post_id")
+        self.assertEqual(list(entries), [(self.subscriber.id, post.id)])
+
+    def test_fan_out_on_read(self):
+        """
+        Posts of dialogues with more subscribers than the fan-out limit
+        should be merged with the fanned-out posts when reading.
+        """
+        quiet_dialogue = Dialogue.objects.create(
+            title="Quiet", author=self.author, is_visible=True
+        )
+        Subscription.objects.subscribe(self.subscriber, quiet_dialogue)
+        Subscription.objects.subscribe(self.subscriber, self.dialogue)
+        Subscription.objects.subscribe(self.author, self.dialogue)
+
+        with mock.patch("ludwig.dialogues.inbox.FAN_OUT_LIMIT", 1):
+            popular_post = self._create_post(body="Popular")
+            quiet_post = self._create_post(body="Quiet", dialogue=quiet_dialogue)
+            posts, _ = get_inbox(self.subscriber)
+
+        self.assertFalse(InboxEntry.objects.filter(post_id=popular_post.id).exists())
+        self.assertEqual(posts, [quiet_post, popular_post])
+
+    def test_pagination(self):
+        """
+        Each page of the inbox should continue below the last post ID of
+        the previous page, until the last page.
+        """
+        Subscription.objects.subscribe(self.subscriber, self.dialogue)
+        post_ids = [self._create_post(body=f"Post {i}").id for i in range(5)]
+
+        first_page, before = get_inbox(self.subscriber, limit=3)
+        second_page, last_before = get_inbox(self.subscriber, before=before, limit=3)
+
+        self.assertEqual([post.id for post in first_page], post_ids[:1:-1])
+        self.assertEqual([post.id for post in second_page], post_ids[1::-1])
+        self.assertIsNone(last_before)
+
+    def test_hidden_dialogue(self):
+        """
+        Posts fanned out before their dialogue was made private or
+        deleted shouldn't be shown in the inbox.
+        """
+        Subscription.objects.subscribe(self.subscriber, self.dialogue)
+        self._create_post()
+
+        self.dialogue.is_visible = False
+        self.dialogue.save()
+
+        self.assertEqual(get_inbox(self.subscriber), ([], None))
+
+    def test_subscribe_view(self):
+        """
+        Users should be able to toggle their subscription to a public
+        dialogue, but not to a private one.
+        """
+        self.client.force_login(self.subscriber)
+        url = reverse("dialogues:toggle_subscription", args=(self.dialogue.slug,))
+
+        response = self.client.post(url, headers={"HX-Request": "true"})
+        self.assertContains(response, "Unsubscribe")
+        self.assertTrue(Subscription.objects.filter(user=self.subscriber).exists())
+
+        response = self.client.post(url)
+        self.assertRedirects(
+            response, reverse("dialogues:dialogue_detail", args=(self.dialogue.slug,))
+        )
+        self.assertFalse(Subscription.objects.filter(user=self.subscriber).exists())
+
+        self.dialogue.is_visible = False
+        self.dialogue.save()
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_inbox_view(self):
+        """
+        The inbox page should show the posts of subscribed dialogues
+        with a link to the next page when there is one.
+        """
+        Subscription.objects.subscribe(self.subscriber, self.dialogue)
+        self._create_post(body="Fanned out post")
+        self.client.force_login(self.subscriber)
+
+        response = self.client.get(reverse("dashboard:inbox"))
+
+        self.assertContains(response, "Fanned out post")
+        self.assertNotContains(response, "?before=")
+
+        response = self.client.get(reverse("dashboard:inbox"), {"before": "invalid"})
+        self.assertContains(response, "Fanned out post")
+
+    def test_purge(self):
+        """
+        Purging a dialogue or a user should remove their subscriptions
+        and inbox entries, and keep the subscriber counts in line.
+        """
+        other_dialogue = Dialogue.objects.create(
+            title="Other", author=self.author, is_visible=True
+        )
+        Subscription.objects.subscribe(self.subscriber, self.dialogue)
+        Subscription.objects.subscribe(self.subscriber, other_dialogue)
+        self._create_post()
+
+        purge_dialogue(self.dialogue)
+        self.assertFalse(InboxEntry.objects.exists())
+        self.assertEqual(Subscription.objects.count(), 1)
+
+        purge_user(self.subscriber)
+        other_dialogue.refresh_from_db()
+        self.assertFalse(Subscription.objects.exists())
+        self.assertEqual(other_dialogue.subscriber_count, 0)
@@ -1,8 +1,9 @@
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.urls import reverse
 
-from ludwig.dialogues.models import Dialogue, Post
+from ludwig.dialogues.models import Dialogue, Post, ReadCursor
 
 
 User = get_user_model()
@@ -22,6 +23,7 @@ class DialogueModelTests(TestCase):
         7. User `authored_dialogues` shows dialogues authored by user
         8. User `dialogues` shows dialogues user is participating in
         9. Deleted user should show sentinel user as dialogue author
+        10. Dialogues have integer IDs and unique slugs
     """
     def setUp(self):
         self.user1 = User.objects.create_user(
@@ -170,6 +172,22 @@ class DialogueModelTests(TestCase):
         dialogue1 = Dialogue.objects.get(id=dialogue1.id)
         self.assertEqual(dialogue1.author, User.objects.get(username="deleted"))
 
+    def test_dialogue_id_and_slug(self):
+        """
+        Dialogues should have integer IDs, and distinct slugs for their
+        URLs.
+        """
+        dialogue1 = Dialogue.objects.create(title="Test 1", author=self.user1)
+        dialogue2 = Dialogue.objects.create(title="Test 2", author=self.user1)
+
+        self.assertIsInstance(dialogue1.id, int)
+        self.assertEqual(len(dialogue1.slug), 10)
+        self.assertNotEqual(dialogue1.slug, dialogue2.slug)
+        self.assertEqual(
+            reverse("dialogues:dialogue_detail", args=[dialogue1.slug]),
+            f"/dialogue/{dialogue1.slug}/",
+        )
+
 
 class PostModelTests(TestCase):
     """
@@ -287,3 +305,55 @@ class PostModelTests(TestCase):
         self.assertIn(post, self.dialogue.posts.all())
         self.assertEqual(self.dialogue.posts.count(), 1)
         self.assertEqual(post.body, "Updated post")
+
+
+class ReadCursorModelTests(TestCase):
+    """
+    Testing suite for ReadCursor model.
+
+    Tests included:
+        1. Advancing creates a read cursor
+        2. Advancing moves an existing read cursor forward
+        3. Advancing never moves a read cursor backward
+    """
+
+    def setUp(self):
+        """
+        Initial setup for the testing suite.
+        """
+        self.user = User.objects.create(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpassword"
+        )
+        self.dialogue = Dialogue.objects.create(
+            title="Test",
+            author=self.user
+        )
+
+    def test_advance_creates_cursor(self):
+        """
+        Advancing a missing read cursor should create it.
+        """
+        ReadCursor.objects.advance(self.user, self.dialogue, 5)
+        cursor = ReadCursor.objects.get(user=self.user, dialogue=self.dialogue)
+        self.assertEqual(cursor.last_read_post_id, 5)
+
+    def test_advance_moves_cursor_forward(self):
+        """
+        Advancing to a later post should update the read cursor.
+        """
+        ReadCursor.objects.advance(self.user, self.dialogue, 5)
+        ReadCursor.objects.advance(self.user, self.dialogue, 8)
+        cursor = ReadCursor.objects.get(user=self.user, dialogue=self.dialogue)
+        self.assertEqual(cursor.last_read_post_id, 8)
+
+    def test_advance_never_moves_cursor_backward(self):
+        """
+        Advancing to an earlier post should leave the read cursor as is.
+        """
+        ReadCursor.objects.advance(self.user, self.dialogue, 8)
+        ReadCursor.objects.advance(self.user, self.dialogue, 5)
+        cursor = ReadCursor.objects.get(user=self.user, dialogue=self.dialogue)
+        self.assertEqual(cursor.last_read_post_id, 8)
+        self.assertEqual(ReadCursor.objects.count(), 1)
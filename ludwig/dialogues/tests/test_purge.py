@@ -0,0 +1,196 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ludwig.dialogues.models import Dialogue, Post, ReadCursor
+from ludwig.dialogues.purge import delete_in_batches, purge_dialogue
+
+
+User = get_user_model()
+
+
+class PurgeDeletedTests(TestCase):
+    """
+    Testing suite for soft deletion and purging of dialogues and users.
+
+    Tests included:
+        1. Soft-deleted dialogues are hidden at once
+        2. Purging removes dialogues with their posts in batches
+        3. Interrupted purges continue when run again
+        4. Purging users removes their posts and participations
+        5. Purging users invalidates the dialogues they posted in
+        6. Deleted users are hidden from the user search
+    """
+
+    def setUp(self):
+        """
+        Initial setup for the testing suite.
+        """
+        self.user1 = User.objects.create_user(
+            username="testuser1",
+            email="testuser1@example.com",
+            password="testpassword"
+        )
+        self.user2 = User.objects.create_user(
+            username="testuser2",
+            email="testuser2@example.com",
+            password="testpassword"
+        )
+        self.dialogue = Dialogue.objects.create(
+            title="Test", author=self.user1, is_visible=True
+        )
+        self.dialogue.participants.add(self.user2)
+        for i in range(5):
+            Post.objects.create(
+                dialogue=self.dialogue,
+                author=[self.user1, self.user2][i % 2],
+                body=f"Post {i}",
+            )
+        ReadCursor.objects.advance(self.user2, self.dialogue, 1)
+
+    def _purge(self, batch_size=2):
+        output = StringIO()
+        call_command("purge_deleted", batch_size=batch_size, stdout=output)
+        return output.getvalue()
+
+    def test_soft_deleted_dialogue_hidden(self):
+        """
+        A soft-deleted dialogue should be hidden from the default manager,
+        the detail page and participants, while its posts remain.
+        """
+        self.dialogue.soft_delete()
+
+        self.assertFalse(Dialogue.objects.filter(id=self.dialogue.id).exists())
+        self.assertFalse(self.user2.dialogues.exists())
+        response = self.client.get(
+            reverse("dialogues:dialogue_detail", args=(self.dialogue.slug,))
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Post.objects.filter(dialogue_id=self.dialogue.id).count(), 5)
+
+    def test_purge_dialogue(self):
+        """
+        Purging should remove a soft-deleted dialogue with all related
+        rows in batches and report its progress.
+        """
+        self.dialogue.soft_delete()
+
+        output = self._purge(batch_size=2)
+
+        self.assertFalse(Dialogue.all_objects.filter(id=self.dialogue.id).exists())
+        self.assertFalse(Post.objects.filter(dialogue_id=self.dialogue.id).exists())
+        self.assertFalse(ReadCursor.objects.exists())
+        self.assertFalse(self.user2.dialogues.exists())
+        self.assertIn("2 posts deleted", output)
+        self.assertIn("4 posts deleted", output)
+        self.assertIn("5 posts deleted", output)
+        self.assertIn("Purged 1 dialogue(s) and 0 user(s).", output)
+
+    def test_interrupted_purge_continues(self):
+        """
+        A purge interrupted between batches should continue with the
+        remaining rows when run again.
+        """
+        self.dialogue.soft_delete()
+
+        def interrupt(model, deleted):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            purge_dialogue(self.dialogue, batch_size=2, progress=interrupt)
+
+        self.assertEqual(Post.objects.filter(dialogue_id=self.dialogue.id).count(), 3)
+        self.assertTrue(Dialogue.all_objects.filter(id=self.dialogue.id).exists())
+
+        self._purge()
+
+        self.assertFalse(Dialogue.all_objects.filter(id=self.dialogue.id).exists())
+        self.assertFalse(Post.objects.filter(dialogue_id=self.dialogue.id).exists())
+
+    def test_purge_user(self):
+        """
+        Purging a soft-deleted user should remove their posts, read
+        cursors and participations, and hand their authored dialogues
+        over to the sentinel user.
+        """
+        self.user1.soft_delete()
+        self.assertFalse(User.objects.get(id=self.user1.id).is_active)
+
+        output = self._purge()
+
+        self.assertFalse(User.objects.filter(id=self.user1.id).exists())
+        self.dialogue.refresh_from_db()
+        self.assertEqual(self.dialogue.author.username, "deleted")
+        self.assertEqual(list(self.dialogue.participants.all()), [self.user2])
+        self.assertEqual(
+            list(self.dialogue.posts.values_list("author", flat=True)),
+            [self.user2.id] * 2,
+        )
+        self.assertIn("Purged 0 dialogue(s) and 1 user(s).", output)
+
+    def test_purge_user_invalidates_dialogues(self):
+        """
+        Purging a user should invalidate the cached data of dialogues
+        they posted in, since raw deletes don't send signals.
+        """
+        self.user2.soft_delete()
+
+        with mock.patch("ludwig.dialogues.purge.invalidate_dialogue") as invalidate:
+            self._purge()
+
+        invalidate.assert_any_call(self.dialogue)
+
+    def test_deleted_user_hidden_from_search(self):
+        """
+        Soft-deleted users shouldn't be found by the user search.
+        """
+        self.user2.soft_delete()
+        self.client.force_login(self.user1)
+
+        response = self.client.get(
+            reverse("dialogues:search_users"), {"query": "testuser"}
+        )
+
+        self.assertNotIn(self.user2, response.context["users"])
+
+
+class DeleteInBatchesTests(TestCase):
+    """
+    Testing suite for `delete_in_batches`.
+
+    Tests included:
+        1. Only matching rows are deleted and returned values reported
+    """
+
+    def test_delete_matching_rows(self):
+        """
+        Only rows matching the column value should be deleted, with the
+        returning column of every deleted row passed to `on_delete`.
+        """
+        user = User.objects.create_user(
+            username="testuser", email="testuser@example.com", password="test"
+        )
+        dialogue1 = Dialogue.objects.create(title="Test 1", author=user)
+        dialogue2 = Dialogue.objects.create(title="Test 2", author=user)
+        for dialogue in [dialogue1, dialogue1, dialogue1, dialogue2]:
+            Post.objects.create(dialogue=dialogue, author=user, body="Test")
+
+        returned = set()
+        deleted = delete_in_batches(
+            Post,
+            "dialogue_id",
+            dialogue1.id,
+            "dialogue_id",
+            returned.update,
+            batch_size=2,
+        )
+
+        self.assertEqual(deleted, 3)
+        self.assertEqual(returned, {dialogue1.id})
+        self.assertEqual(
+            list(Post.objects.values_list("dialogue", flat=True)), [dialogue2.id]
+        )
@@ -0,0 +1,204 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from ludwig.dialogues.models import Dialogue, Post, PostChange
+
+User = get_user_model()
+
+# tables that grow with every post, which hot queries may never scan
+POST_TABLES = ("dialogues_post", "dialogues_postchange")
+
+# subqueries refer to their tables by aliases like U0, which SQLite
+# prints instead of the table, and which are always on one of the post
+# tables in these queries
+SUBQUERY_ALIAS = re.compile(r"U\d+")
+
+# plan lines of full table or index scans and sorts, as PostgreSQL and
+# SQLite print them
+SEQ_SCAN = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"^SCAN (\w+)"),
+}
+SORT = {
+    "postgresql": re.compile(r"(^|->\s*)(Incremental )?Sort\b"),
+    "sqlite": re.compile(r"USE TEMP B-TREE FOR ORDER BY"),
+}
+
+
+class QueryPlanTests(TestCase):
+    """
+    Testing suite for the query plans of the hot queries on posts.
+
+    Each test runs a request against a seeded database, explains every
+    query it ran on the post tables and fails on a full scan of them or
+    a sort of their rows, which means an index they need is missing or
+    can't be used. On PostgreSQL sequential scans, bitmap scans and
+    sorts are disabled for the planner, so that it only falls back to
+    them when no index applies or provides the order, however small the
+    seeded tables are.
+
+    Tests included:
+        1. Dialogue pages read posts from indexes in order
+        2. Polls read the change log and posts from indexes in order
+        3. API pages and syncs read posts from indexes in order
+        4. The dashboard aggregates posts from indexes
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Seed dialogues with posts and change logs, and gather the
+        statistics the planner bases its choices on.
+        """
+        cls.users = [
+            User.objects.create_user(
+                username=f"testuser{i}", email=f"testuser{i}@example.com"
+            )
+            for i in range(20)
+        ]
+
+        for i, author in enumerate(cls.users):
+            dialogue = Dialogue.objects.create(
+                title=f"Dialogue {i}", author=author, is_visible=i % 2 == 0
+            )
+            partner = cls.users[(i + 1) % len(cls.users)]
+            dialogue.participants.add(partner)
+
+            posts = Post.objects.bulk_create(
+                Post(
+                    author=(author, partner)[j % 2],
+                    dialogue=dialogue,
+                    body=f"Post {j}",
+                )
+                for j in range(50)
+            )
+            PostChange.objects.record(
+                dialogue.id, [post.id for post in posts], PostChange.Kind.INSERT
+            )
+
+        cls.user = cls.users[0]
+        cls.dialogue = Dialogue.objects.get(author=cls.user)
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        """
+        Initial setup for the testing suite.
+        """
+        cache.clear()
+        self.client.force_login(self.user)
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SET LOCAL enable_seqscan = off;
+                    SET LOCAL enable_bitmapscan = off;
+                    SET LOCAL enable_sort = off;
+                    """
+                )
+
+    def _get_post_queries(self, *requests):
+        """Make GET requests and get the queries they ran on posts."""
+
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            if sql.startswith("SELECT") and '"dialogues_post' in sql:
+                queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            for url, params in requests:
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+
+        self.assertTrue(queries)
+        return queries
+
+    def _explain(self, sql, params):
+        prefix = "EXPLAIN QUERY PLAN" if connection.vendor == "sqlite" else "EXPLAIN"
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            return [str(row[-1]).strip() for row in cursor.fetchall()]
+
+    def assertIndexedPlans(self, queries, allow_sort=False):
+        """
+        Assert that no query scans a post table in full, or sorts rows
+        unless `allow_sort` is set.
+        """
+        seq_scan = SEQ_SCAN[connection.vendor]
+        sort = SORT[connection.vendor]
+
+        for sql, params in queries:
+            plan = self._explain(sql, params)
+
+            for line in plan:
+                match = seq_scan.search(line)
+                if match and (
+                    match[1].startswith(POST_TABLES)
+                    or SUBQUERY_ALIAS.fullmatch(match[1])
+                ):
+                    self.fail(f"Full scan in plan of {sql}:\n" + "\n".join(plan))
+                if not allow_sort and sort.search(line):
+                    self.fail(f"Sort in plan of {sql}:\n" + "\n".join(plan))
+
+    def test_dialogue_page(self):
+        """
+        The posts on a dialogue page and its last post should be read
+        from an index in ID order.
+        """
+        queries = self._get_post_queries(
+            (reverse("dialogues:dialogue_detail", args=[self.dialogue.slug]), {})
+        )
+
+        self.assertIndexedPlans(queries)
+
+    def test_poll(self):
+        """
+        A poll should read the change log after `seq` and the changed
+        posts from indexes in order.
+        """
+        url = reverse("dialogues:dialogue_detail_update", args=[self.dialogue.slug])
+
+        queries = self._get_post_queries((url, {"seq": 40}), (url, {"seq": 50}))
+
+        self.assertIndexedPlans(queries)
+
+    def test_api(self):
+        """
+        Pages of posts and syncs of the API should read posts from
+        indexes in order.
+        """
+        queries = self._get_post_queries(
+            (reverse("api:v1:post_list", args=[self.dialogue.slug]), {"after": 10}),
+            (reverse("api:v1:sync", args=[self.dialogue.slug]), {"seq": 40}),
+        )
+
+        self.assertIndexedPlans(queries)
+
+    def test_dashboard(self):
+        """
+        The dashboard and its activity updates should aggregate the
+        posts of each dialogue from an index. The dialogues are sorted
+        by the aggregates, which no index can provide.
+        """
+        other_dialogue = Dialogue.objects.get(author=self.users[-1])
+        activity = [
+            ("dialogue", f"{dialogue.slug}:0")
+            for dialogue in (self.dialogue, other_dialogue)
+        ]
+
+        queries = self._get_post_queries(
+            (reverse("dashboard:home"), {}),
+            (reverse("dashboard:activity"), activity),
+        )
+
+        self.assertIndexedPlans(queries, allow_sort=True)
@@ -0,0 +1,178 @@
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ludwig.dialogues.constants import VIEW_FLUSH_INTERVAL
+from ludwig.dialogues.models import Dialogue, DialogueRanking, Post
+from ludwig.dialogues.ranking import flush_views, get_rankings_page, refresh_rankings
+
+
+User = get_user_model()
+
+
+class RankingTests(TestCase):
+    """
+    Testing suite for the rankings of the discovery page.
+
+    Tests included:
+        1. Only public dialogues are ranked, by activity and views
+        2. Recent posts outrank old ones
+        3. Pages are read by keyset on the rank
+        4. Pages are cached until the next refresh
+        5. Hidden dialogues are removed from the rankings at once
+        6. Views are counted in the cache and flushed to the dialogue
+        7. The discovery page lists the ranked dialogues
+    """
+
+    def setUp(self):
+        """
+        Initial setup for the testing suite.
+        """
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpassword"
+        )
+        self.busy = self._create_dialogue("Busy", posts=3)
+        self.viewed = self._create_dialogue("Viewed", posts=1, views=50)
+        self.quiet = self._create_dialogue("Quiet", posts=1)
+        self.private = self._create_dialogue("Private", posts=5, is_visible=False)
+
+    def _create_dialogue(self, title, posts=0, views=0, is_visible=True):
+        dialogue = Dialogue.objects.create(
+            title=title, author=self.user, is_visible=is_visible, views=views
+        )
+        for i in range(posts):
+            Post.objects.create(dialogue=dialogue, author=self.user, body=f"Post {i}")
+        return dialogue
+
+    def _ranked_titles(self):
+        return list(DialogueRanking.objects.values_list("dialogue__title", flat=True))
+
+    def test_ranking(self):
+        """
+        Public dialogues should be ranked by their recent posts and
+        views, and private ones left out.
+        """
+        self.assertEqual(refresh_rankings(), 3)
+        self.assertEqual(self._ranked_titles(), ["Viewed", "Busy", "Quiet"])
+        self.assertEqual(self.busy.ranking.post_count, 3)
+
+    def test_recent_activity(self):
+        """
+        A dialogue without recent posts should rank below one with the
+        same number of posts made just now.
+        """
+        Post.objects.filter(dialogue=self.busy).update(
+            created_on=timezone.now() - timedelta(days=30)
+        )
+
+        refresh_rankings()
+
+        self.assertEqual(self._ranked_titles(), ["Viewed", "Quiet", "Busy"])
+
+    def test_keyset_pages(self):
+        """
+        Each page should continue after the last rank of the previous
+        page, until the last page.
+        """
+        refresh_rankings()
+
+        first_page, after = get_rankings_page(limit=2)
+        second_page, last_after = get_rankings_page(after=after, limit=2)
+
+        self.assertEqual([ranking.rank for ranking in first_page], [1, 2])
+        self.assertEqual([ranking.rank for ranking in second_page], [3])
+        self.assertIsNone(last_after)
+
+    def test_cached_pages(self):
+        """
+        Pages should be served from the cache without any queries until
+        the rankings are refreshed.
+        """
+        refresh_rankings()
+        get_rankings_page()
+
+        with self.assertNumQueries(0):
+            rankings, _ = get_rankings_page()
+        self.assertEqual(len(rankings), 3)
+
+        Dialogue.objects.filter(id=self.quiet.id).update(views=100)
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_rankings()
+
+        rankings, _ = get_rankings_page()
+        self.assertEqual(rankings[0].dialogue, self.quiet)
+
+    def test_hidden_dialogue_removed(self):
+        """
+        A dialogue made private or deleted should disappear from the
+        cached rankings right away.
+        """
+        refresh_rankings()
+        get_rankings_page()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.viewed.is_visible = False
+            self.viewed.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quiet.soft_delete()
+
+        rankings, _ = get_rankings_page()
+        self.assertEqual([ranking.dialogue for ranking in rankings], [self.busy])
+
+    def test_views_counted(self):
+        """
+        Viewing a dialogue page should count the view in the cache, and
+        increase the view count of the dialogue once its window has
+        ended and it's flushed.
+        """
+        cache.clear()
+        url = reverse("dialogues:dialogue_detail", args=(self.quiet.slug,))
+
+        with mock.patch("ludwig.dialogues.views.serve_snapshot", return_value=None):
+            self.client.get(url)
+            etag = self.client.get(url).headers["ETag"]
+            self.client.get(url, headers={"If-None-Match": etag})
+            self.client.get(
+                reverse("dialogues:dialogue_detail", args=(self.busy.slug,))
+            )
+
+        self.assertEqual(flush_views(), 0)
+        self.quiet.refresh_from_db()
+        self.assertEqual(self.quiet.views, 0)
+
+        later = time.time() + 2 * VIEW_FLUSH_INTERVAL
+        self.assertEqual(flush_views(now=later, batch_size=1), 4)
+        self.assertEqual(flush_views(now=later), 0)
+
+        self.quiet.refresh_from_db()
+        self.busy.refresh_from_db()
+        self.viewed.refresh_from_db()
+        self.assertEqual(self.quiet.views, 3)
+        self.assertEqual(self.busy.views, 1)
+        self.assertEqual(self.viewed.views, 50)
+
+    def test_discover_view(self):
+        """
+        The discovery page should list the ranked public dialogues, and
+        continue after the rank given by the `after` parameter.
+        """
+        refresh_rankings()
+
+        response = self.client.get(reverse("dialogues:discover"))
+
+        self.assertContains(response, "Viewed")
+        self.assertContains(response, "Busy")
+        self.assertNotContains(response, "Private")
+        self.assertNotContains(response, "?after=")
+
+        response = self.client.get(reverse("dialogues:discover"), {"after": "2"})
+        self.assertContains(response, "Quiet")
+        self.assertNotContains(response, "Busy")
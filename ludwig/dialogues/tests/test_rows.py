@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ludwig.dialogues.changes import get_posts_at
+from ludwig.dialogues.models import Dialogue, Post
+from ludwig.dialogues.rows import PostRow, iter_post_rows
+
+User = get_user_model()
+
+
+class PostRowTests(TestCase):
+    """
+    Testing suite for rendering posts from compact rows.
+
+    Tests included:
+        1. Rows hold the rendered values of posts in slots
+        2. Rows are only fetched once they're iterated
+        3. Dialogue pages render posts from rows
+        4. Pages of dialogues without posts don't stream rows
+    """
+
+    def setUp(self):
+        """
+        Initial setup for the testing suite.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser1",
+            email="testuser1@example.com",
+            password="testpassword",
+        )
+        self.dialogue = Dialogue.objects.create(
+            title="Test", author=self.user, is_visible=True
+        )
+        self.posts = [
+            Post.objects.create(
+                dialogue=self.dialogue, author=self.user, body=f"Post {i}"
+            )
+            for i in range(3)
+        ]
+        self.dialogue.refresh_from_db()
+
+    def test_row_values(self):
+        """
+        Rows should hold the values of their posts that are rendered,
+        without a `__dict__` per row.
+        """
+        rows = list(iter_post_rows(get_posts_at(self.dialogue, 3), chunk_size=2))
+
+        self.assertEqual([row.id for row in rows], [post.id for post in self.posts])
+        self.assertEqual(rows[0].author_name, "testuser1")
+        self.assertEqual(rows[0].author_id, self.user.id)
+        self.assertEqual(rows[0].body, "Post 0")
+        self.assertEqual(rows[0].created_on, self.posts[0].created_on)
+        self.assertFalse(hasattr(rows[0], "__dict__"))
+
+    def test_rows_fetched_lazily(self):
+        """
+        Rows shouldn't be fetched until they're iterated, and then in
+        a single query.
+        """
+        with self.assertNumQueries(0):
+            rows = iter_post_rows(get_posts_at(self.dialogue, 3))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(len(list(rows)), 3)
+
+    def test_page_renders_rows(self):
+        """
+        A dialogue page should render its posts from rows, with the
+        same markup as posts rendered from model instances.
+        """
+        response = self.client.get(
+            reverse("dialogues:dialogue_detail", args=[self.dialogue.slug])
+        )
+
+        self.assertNotIsInstance(response.context["posts"], list)
+        for post in self.posts:
+            self.assertContains(response, f'<div id="post_{post.id}" class="post ')
+            self.assertContains(response, post.body)
+        self.assertContains(response, '<div class="post-author">testuser1</div>', 3)
+
+    def test_page_without_posts(self):
+        """
+        The page of a dialogue without posts should show that there are
+        no posts yet, rather than an empty stream of rows.
+        """
+        dialogue = Dialogue.objects.create(title="Empty", author=self.user)
+
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("dialogues:dialogue_detail", args=[dialogue.slug])
+        )
+
+        self.assertEqual(response.context["posts"], [])
+        self.assertContains(response, 'id="no_posts_message"')
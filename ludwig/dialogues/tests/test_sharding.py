@@ -0,0 +1,437 @@
+import json
+from collections import Counter
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from ludwig.dialogues.inbox import fan_out_post, get_inbox
+from ludwig.dialogues.models import Dialogue, Post, PostChange, Subscription
+from ludwig.dialogues.sharding import DialogueMoved, get_shard
+
+
+User = get_user_model()
+
+
+class ShardPlacementTests(SimpleTestCase):
+    """
+    Testing suite for the placement of dialogues on shards.
+
+    Tests included:
+        1. Dialogues are spread evenly, regardless of the order of shards
+        2. Adding a shard only moves dialogues to the new shard
+        3. Removing a shard only moves the dialogues it held
+    """
+
+    shards = ["default", "shard1", "shard2"]
+    slugs = [f"{i:010d}" for i in range(3000)]
+
+    def test_even_placement(self):
+        """
+        Dialogues should be placed on every shard about as often, on the
+        same shard whatever the order of the shards.
+        """
+        placements = {slug: get_shard(slug, self.shards) for slug in self.slugs}
+
+        for count in Counter(placements.values()).values():
+            self.assertGreater(count, 900)
+            self.assertLess(count, 1100)
+        for slug, shard in placements.items():
+            self.assertEqual(get_shard(slug, self.shards[::-1]), shard)
+
+    def test_added_shard(self):
+        """
+        Adding a shard should move about a quarter of the dialogues of
+        three shards, all of them to the new shard.
+        """
+        moved = [
+            get_shard(slug, [*self.shards, "shard3"])
+            for slug in self.slugs
+            if get_shard(slug, self.shards) != get_shard(slug, [*self.shards, "shard3"])
+        ]
+
+        self.assertEqual(set(moved), {"shard3"})
+        self.assertGreater(len(moved), 0.2 * len(self.slugs))
+        self.assertLess(len(moved), 0.3 * len(self.slugs))
+
+    def test_removed_shard(self):
+        """
+        Removing a shard should only move the dialogues placed on it.
+        """
+        for slug in self.slugs:
+            shard = get_shard(slug, self.shards)
+            if shard != "shard2":
+                self.assertEqual(get_shard(slug, self.shards[:2]), shard)
+
+
+@skipUnless(
+    len(settings.DATABASES) > 1, "requires several databases, see config.settings.test"
+)
+class ShardingTests(TransactionTestCase):
+    """
+    Testing suite for dialogues whose posts are kept on another shard
+    than the default database. The tests require more databases than
+    the default one, configured by `DB_SHARD_NAMES` or added by the test
+    settings, and commit their rows, since queries across shards run in
+    other threads.
+
+    Tests included:
+        1. Posts and change logs are written to the dialogue's shard
+        2. Dialogue pages, polls and the API read posts from the shard
+        3. The dashboard aggregates posts across shards
+        4. Inboxes merge posts from several shards
+        5. Rebalancing moves dialogues to the shards they're placed on
+        6. Posts written to a dialogue's old shard are rolled back
+        7. Purging removes posts from every shard
+        8. Cleaning removes rows left behind by interrupted moves
+        9. Changes left on a shard by failed commits are skipped
+        10. Shards only have the tables of posts and change logs
+    """
+
+    databases = "__all__"
+
+    def setUp(self):
+        """
+        Initial setup for the testing suite.
+        """
+        self.shard = next(
+            alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS
+        )
+        self.enterContext(
+            override_settings(DIALOGUE_SHARDS=[DEFAULT_DB_ALIAS, self.shard])
+        )
+
+        self.user1 = User.objects.create_user(
+            username="testuser1", email="testuser1@example.com", password="testpass"
+        )
+        self.user2 = User.objects.create_user(
+            username="testuser2", email="testuser2@example.com", password="testpass"
+        )
+
+        self.slugs = self._get_slugs()
+        self.dialogue = Dialogue.objects.create(
+            title="Sharded",
+            author=self.user1,
+            is_visible=True,
+            slug=self.slugs[self.shard].pop(),
+        )
+        self.dialogue.participants.add(self.user2)
+        self.local_dialogue = Dialogue.objects.create(
+            title="Local",
+            author=self.user1,
+            is_visible=True,
+            slug=self.slugs[DEFAULT_DB_ALIAS].pop(),
+        )
+        self.local_dialogue.participants.add(self.user2)
+
+    def _get_slugs(self):
+        """Get slugs that are placed on each shard."""
+        slugs = {DEFAULT_DB_ALIAS: [], self.shard: []}
+        for i in range(100):
+            slug = f"test{i:06d}"
+            slugs[get_shard(slug)].append(slug)
+        return slugs
+
+    def _create_posts(self, dialogue, count, author=None):
+        return [
+            dialogue.posts.create(author=author or self.user1, body=f"Post {i}")
+            for i in range(count)
+        ]
+
+    def test_posts_on_shard(self):
+        """
+        Posts and their changes should be written to the shard of their
+        dialogue, numbered by the default database along with posts on
+        other shards.
+        """
+        local_post = self._create_posts(self.local_dialogue, 1)[0]
+        posts = self._create_posts(self.dialogue, 3)
+        later_local_post = self._create_posts(self.local_dialogue, 1)[0]
+
+        posts[0].body = "Edited"
+        posts[0].save()
+        posts[1].delete()
+
+        self.assertEqual(self.dialogue.shard, self.shard)
+        self.assertLess(local_post.id, posts[0].id)
+        self.assertLess(posts[-1].id, later_local_post.id)
+        self.assertEqual(
+            list(Post.objects.using(self.shard).order_by("id")),
+            [posts[0], posts[2]],
+        )
+        self.assertFalse(Post.objects.filter(dialogue=self.dialogue).exists())
+        self.assertEqual(
+            list(self.dialogue.changes.order_by("seq").values_list("seq", "kind")),
+            [
+                (1, PostChange.Kind.INSERT),
+                (2, PostChange.Kind.INSERT),
+                (3, PostChange.Kind.INSERT),
+                (4, PostChange.Kind.EDIT),
+                (5, PostChange.Kind.DELETE),
+            ],
+        )
+        self.assertFalse(PostChange.objects.filter(dialogue=self.dialogue).exists())
+
+    def test_read_posts_from_shard(self):
+        """
+        The dialogue page, polls and the API should read the posts of a
+        dialogue from its shard, with the names of their authors, and
+        posts added through the API should stay within its budget.
+        """
+        self._create_posts(self.dialogue, 3)
+        self.client.force_login(self.user1)
+
+        response = self.client.get(
+            reverse("dialogues:dialogue_detail", args=[self.dialogue.slug])
+        )
+        self.assertContains(response, "Post 2")
+        self.assertContains(response, "testuser1")
+
+        response = self.client.get(
+            reverse("dialogues:dialogue_detail_update", args=[self.dialogue.slug]),
+            {"seq": 2},
+        )
+        self.assertNotIn("Post 1", response.text)
+        self.assertIn("Post 2", response.text)
+
+        url = reverse("api:v1:post_list", args=[self.dialogue.slug])
+        with self.assertNoLogs("ludwig.api.views", "WARNING"):
+            response = self.client.post(
+                url, {"body": "From the API"}, content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 201)
+
+        data = json.loads(self.client.get(url).content)
+        self.assertEqual(
+            [post["body"] for post in data["posts"]],
+            ["Post 0", "Post 1", "Post 2", "From the API"],
+        )
+        self.assertEqual(data["posts"][-1]["author"]["username"], "testuser1")
+        self.assertTrue(
+            Post.objects.using(self.shard).filter(body="From the API").exists()
+        )
+
+    def test_dashboard(self):
+        """
+        The dashboard should sort dialogues on different shards by
+        their latest posts and count their unread posts, and the
+        activity view should check them all.
+        """
+        self._create_posts(self.local_dialogue, 1)
+        self._create_posts(self.dialogue, 2, author=self.user2)
+        self.client.force_login(self.user1)
+
+        response = self.client.get(reverse("dashboard:home"))
+        dialogues = response.context["user_dialogues"]
+        self.assertEqual(
+            [dialogue.id for dialogue in dialogues],
+            [self.dialogue.id, self.local_dialogue.id],
+        )
+        self.assertEqual([dialogue.unread_count for dialogue in dialogues], [2, 0])
+
+        response = self.client.get(
+            reverse("dashboard:activity"),
+            [
+                ("dialogue", f"{dialogue.slug}:0")
+                for dialogue in (self.dialogue, self.local_dialogue)
+            ],
+        )
+        self.assertCountEqual(
+            response.context["active_dialogue_slugs"],
+            [self.dialogue.slug, self.local_dialogue.slug],
+        )
+
+    def test_inbox(self):
+        """
+        The inbox should merge the posts of dialogues on several shards,
+        newest first, with their dialogues and authors.
+        """
+        for dialogue in (self.dialogue, self.local_dialogue):
+            Subscription.objects.subscribe(self.user2, dialogue)
+        posts = [
+            *self._create_posts(self.dialogue, 2),
+            *self._create_posts(self.local_dialogue, 2),
+            *self._create_posts(self.dialogue, 1),
+        ]
+        for post in posts:
+            fan_out_post(post)
+
+        inbox, _ = get_inbox(self.user2)
+
+        self.assertEqual(
+            [post.id for post in inbox], [post.id for post in reversed(posts)]
+        )
+        self.assertEqual(inbox[0].dialogue.title, "Sharded")
+        self.assertEqual(inbox[1].dialogue.title, "Local")
+        self.assertEqual(inbox[0].author_name, "testuser1")
+
+    def test_rebalance(self):
+        """
+        Rebalancing should move the posts and change logs of dialogues
+        to the shards they're placed on, keeping their IDs and sequence
+        numbers, and posting should continue on the new shard.
+        """
+        dialogues = [
+            Dialogue.objects.create(
+                title="Misplaced",
+                author=self.user1,
+                slug=slug,
+                shard=DEFAULT_DB_ALIAS,
+            )
+            for slug in self.slugs[self.shard][:2]
+        ]
+        for dialogue in dialogues:
+            self._create_posts(dialogue, 3)
+        post_ids = {
+            dialogue.id: [post.id for post in dialogue.posts.order_by("id")]
+            for dialogue in dialogues
+        }
+
+        call_command("rebalance_dialogues", dry_run=True, stdout=StringIO())
+        self.assertEqual(
+            Dialogue.objects.filter(shard=DEFAULT_DB_ALIAS).count(),
+            len(dialogues) + 1,
+        )
+
+        output = StringIO()
+        call_command("rebalance_dialogues", batch_size=2, stdout=output)
+        self.assertIn("Moved 2 dialogue(s).", output.getvalue())
+
+        for dialogue in dialogues:
+            dialogue.refresh_from_db()
+            self.assertEqual(dialogue.shard, self.shard)
+            self.assertEqual(
+                [post.id for post in dialogue.posts.order_by("id")],
+                post_ids[dialogue.id],
+            )
+            self.assertEqual(
+                list(dialogue.changes.values_list("seq", flat=True).order_by("seq")),
+                [1, 2, 3],
+            )
+            self.assertFalse(Post.objects.filter(dialogue=dialogue).exists())
+            self.assertFalse(PostChange.objects.filter(dialogue=dialogue).exists())
+
+            self._create_posts(dialogue, 1)
+            self.assertEqual(dialogue.changes.count(), 4)
+
+    def test_write_to_old_shard(self):
+        """
+        A post written to a shard its dialogue isn't on, as when the
+        dialogue is moved meanwhile, should be rolled back.
+        """
+        post = Post(dialogue=self.dialogue, author=self.user1, body="Stale")
+
+        with self.assertRaises(DialogueMoved):
+            post.save(using=DEFAULT_DB_ALIAS)
+
+        self.assertFalse(Post.objects.filter(body="Stale").exists())
+        self.assertEqual(Dialogue.objects.get(id=self.dialogue.id).change_seq, 0)
+
+    def test_change_seq_recovered(self):
+        """
+        Changes committed to a shard whose sequence numbers were lost
+        with a failed commit of the default database should be skipped
+        by the next change instead of being numbered again.
+        """
+        (post,) = self._create_posts(self.dialogue, 1)
+
+        # as if the commit of the second change failed on the default
+        # database after the shard had committed it
+        PostChange.objects.using(self.shard).create(
+            dialogue_id=self.dialogue.id,
+            seq=2,
+            post_id=post.id,
+            kind=PostChange.Kind.EDIT,
+        )
+
+        self._create_posts(self.dialogue, 1)
+
+        self.assertEqual(
+            list(self.dialogue.changes.order_by("seq").values_list("seq", flat=True)),
+            [1, 2, 3],
+        )
+        self.assertEqual(Dialogue.objects.get(id=self.dialogue.id).change_seq, 3)
+
+    def test_shard_tables(self):
+        """
+        Shards other than the default database should only have the
+        tables of posts and change logs.
+        """
+        tables = set(connections[self.shard].introspection.django_table_names())
+
+        self.assertEqual(tables, {Post._meta.db_table, PostChange._meta.db_table})
+        self.assertIn(
+            Dialogue._meta.db_table,
+            connections[DEFAULT_DB_ALIAS].introspection.django_table_names(),
+        )
+
+    def test_purge(self):
+        """
+        Purging a user should remove their posts from every shard with
+        tombstones in the change logs, and purging a dialogue its posts
+        and change log from its shard.
+        """
+        self._create_posts(self.dialogue, 2, author=self.user2)
+        self._create_posts(self.local_dialogue, 1, author=self.user2)
+        self._create_posts(self.dialogue, 1)
+
+        self.user2.soft_delete()
+        call_command("purge_deleted", stdout=StringIO())
+
+        self.assertFalse(Post.objects.filter(author_id=self.user2.id).exists())
+        self.assertFalse(
+            Post.objects.using(self.shard).filter(author_id=self.user2.id).exists()
+        )
+        self.assertEqual(
+            self.dialogue.changes.filter(kind=PostChange.Kind.DELETE).count(), 2
+        )
+
+        self.dialogue.soft_delete()
+        call_command("purge_deleted", stdout=StringIO())
+
+        self.assertFalse(Post.objects.using(self.shard).exists())
+        self.assertFalse(PostChange.objects.using(self.shard).exists())
+
+    def test_clean(self):
+        """
+        Cleaning should remove the posts and changes of dialogues from
+        shards they aren't on, and keep the rest.
+        """
+        posts = self._create_posts(self.dialogue, 2)
+        local_posts = self._create_posts(self.local_dialogue, 2)
+
+        # copies left on the default database by an interrupted move
+        Post.objects.bulk_create(
+            Post(
+                id=post.id,
+                dialogue_id=post.dialogue_id,
+                author_id=post.author_id,
+                body=post.body,
+            )
+            for post in posts
+        )
+        PostChange.objects.bulk_create(
+            PostChange(
+                dialogue_id=self.dialogue.id,
+                seq=seq,
+                post_id=post.id,
+                kind=PostChange.Kind.INSERT,
+            )
+            for seq, post in enumerate(posts, start=1)
+        )
+
+        output = StringIO()
+        call_command("rebalance_dialogues", clean=True, stdout=output)
+
+        self.assertIn(
+            f"Removing dialogue {self.dialogue.id} from {DEFAULT_DB_ALIAS}",
+            output.getvalue(),
+        )
+        self.assertEqual(list(Post.objects.order_by("id")), local_posts)
+        self.assertFalse(PostChange.objects.filter(dialogue=self.dialogue).exists())
+        self.assertEqual(list(self.dialogue.posts.order_by("id")), posts)
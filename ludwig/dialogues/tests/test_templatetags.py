@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.template import Context, Template
+from django.test import TestCase
+
+from ludwig.dialogues.models import Dialogue, Post
+from ludwig.dialogues.templatetags.markdown_extras import markdown
+
+
+User = get_user_model()
+
+
+class MarkdownFilterTests(TestCase):
+    """
+    Testing suite for the `markdown` filter.
+
+    Tests included:
+        1. Markdown is converted to HTML
+        2. Conversions don't leak state into each other
+    """
+
+    def test_markdown_converted(self):
+        """
+        Markdown should be converted to HTML.
+        """
+        self.assertEqual(markdown("**Hello**"), "<p><strong>Hello</strong></p>")
+
+    def test_reused_converter_state(self):
+        """
+        Reference links defined in one conversion should not be
+        available to the next one.
+        """
+        markdown("[ref]: https://example.com")
+        self.assertNotIn("example.com", markdown("[link][ref]"))
+
+
+class RenderPostsTagTests(TestCase):
+    """
+    Testing suite for the `render_posts` tag.
+
+    Tests included:
+        1. Output matches including the post template for each post
+    """
+
+    def setUp(self):
+        """
+        Initial setup for the testing suite.
+        """
+        self.user1 = User.objects.create(
+            username="testuser1",
+            email="testuser1@example.com",
+            password="testpassword"
+        )
+        self.user2 = User.objects.create(
+            username="testuser2",
+            email="testuser2@example.com",
+            password="testpassword"
+        )
+        dialogue = Dialogue.objects.create(title="Test", author=self.user1)
+        for author, body in [(self.user1, "*First*"), (self.user2, "Second")]:
+            Post.objects.create(dialogue=dialogue, author=author, body=body)
+
+        self.posts = list(Post.objects.select_related("author").order_by("id"))
+
+    def _normalize(self, html):
+        return " ".join(html.split())
+
+    def test_output_matches_include(self):
+        """
+        Rendering posts with the tag should produce the same HTML as an
+        include of the post template per post.
+        """
+        context = {"posts": self.posts, "user": self.user1}
+        include_html = Template(
+            "{% for post in posts %}"
+            '{% include "dialogues/partials/post_detail.html" %}'
+            "{% endfor %}"
+        ).render(Context(context))
+        tag_html = Template(
+            "{% load post_tags %}{% render_posts posts %}"
+        ).render(Context(context))
+
+        self.assertEqual(self._normalize(tag_html), self._normalize(include_html))
+        self.assertIn("post-by-user", tag_html)
+        self.assertIn("<em>First</em>", tag_html)
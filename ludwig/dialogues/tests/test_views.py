@@ -1,10 +1,33 @@
+import asyncio
+import gzip
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+
 from django.contrib.auth import get_user, get_user_model
-from django.test import TestCase
-from django.test.client import Client
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.client import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
 from django.urls.base import reverse
+from django.utils import timezone
+
+from ludwig.jobs.models import Job
 
-from ..constants import TemplateName
-from ..models import Dialogue
+from ..constants import (
+    MAX_POLLING_INTERVAL,
+    MIN_POLLING_INTERVAL,
+    VIEW_FLUSH_INTERVAL,
+    TemplateName,
+)
+from ..jobs import write_read_cursor
+from ..models import Dialogue, Post, PostChange, ReadCursor
+from ..ranking import flush_views
+from ..snapshots import get_snapshot_path
+from ..views import get_poll_coalescing_ratio, get_polling_interval, poll_stats
 
 
 User = get_user_model()
@@ -257,9 +280,15 @@ class DialogueDetailViewTests(TestCase):
         1. Successful page load of private dialogue
         2. Successful page load of public dialogue
         3. New post rendered in dialogue
-        4. HTMX post returns partial template
-        5. Non-participant can view public dialogue
-        6. Non-participant cannot view private dialogue
+        4. Non-participant can view public dialogue
+        5. Non-participant cannot view private dialogue
+        6. Unchanged page is answered with 304 without loading posts
+        7. New post changes the validators of the page
+        8. Validators differ per viewer
+        9. Unmodified page is answered with 304 by date
+        10. Post times are rendered as absolute timestamps
+        11. Posts are loaded without unused author columns
+        12. Logging in again changes the validators of the page
     """
     def setUp(self):
         """
@@ -295,7 +324,7 @@ class DialogueDetailViewTests(TestCase):
         )
         self.private_dialogue_url = reverse(
             "dialogues:dialogue_detail",
-            args=[self.private_dialogue.id]
+            args=[self.private_dialogue.slug]
         )
 
         self.public_dialogue = Dialogue.objects.create(
@@ -306,7 +335,7 @@ class DialogueDetailViewTests(TestCase):
         )
         self.public_dialogue_url = reverse(
             "dialogues:dialogue_detail",
-            args=[self.public_dialogue.id]
+            args=[self.public_dialogue.slug]
         )
 
     def test_successful_page_load_private_dialogue(self):
@@ -342,21 +371,6 @@ class DialogueDetailViewTests(TestCase):
         response = self.client1.get(self.private_dialogue_url)
         self.assertIn(post_body, response.text)
 
-    def test_htmx_post_response(self):
-        """
-        New posts with HTMX should return partial template containing
-        post body and `last_id` of post.
-        """
-        post_body = "Hello world"
-        response = self.client1.post(
-            self.private_dialogue_url,
-            {"body": post_body},
-            headers={
-                "HX-Request": True
-            })
-        self.assertIn(post_body, response.text)
-        self.assertTrue(response.context.get("last_id"))
-
     def test_nonparticipant_can_view_public_dialogue(self):
         """
         Non-participants should be able to view public dialogues.
@@ -377,6 +391,661 @@ class DialogueDetailViewTests(TestCase):
         response = self.client2.get(self.private_dialogue_url)
         self.assertEqual(response.status_code, 403)
 
+    def test_unchanged_page_not_modified(self):
+        """
+        A request with the ETag of the current page should be answered
+        with 304 before any post is queried.
+        """
+        Post.objects.create(
+            dialogue=self.private_dialogue, author=self.user1, body="Hello"
+        )
+        response = self.client1.get(self.private_dialogue_url)
+        etag = response.headers["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client1.get(
+                self.private_dialogue_url, headers={"If-None-Match": etag}
+            )
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+        self.assertIn("no-cache", response.headers["Cache-Control"])
+        for query in queries:
+            self.assertNotIn(f'FROM "{Post._meta.db_table}"', query["sql"])
+
+    def test_new_post_changes_validators(self):
+        """
+        A new post should change the ETag, so the page is rendered again.
+        """
+        etag = self.client1.get(self.private_dialogue_url).headers["ETag"]
+
+        self.client1.post(self.private_dialogue_url, {"body": "Hello world"})
+        response = self.client1.get(
+            self.private_dialogue_url, headers={"If-None-Match": etag}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertIn("Hello world", response.text)
+
+    def test_validators_per_viewer(self):
+        """
+        Different users, and anonymous visitors, should get different
+        ETags for the same page, since it's rendered for each of them.
+        """
+        etags = {
+            client.get(self.public_dialogue_url).headers["ETag"]
+            for client in [self.client1, self.client2, Client()]
+        }
+
+        self.assertEqual(len(etags), 3)
+
+    def test_not_modified_since(self):
+        """
+        A request for a page that hasn't changed since the given date
+        should be answered with 304.
+        """
+        response = self.client1.get(self.private_dialogue_url)
+        last_modified = response.headers["Last-Modified"]
+
+        response = self.client1.get(
+            self.private_dialogue_url, headers={"If-Modified-Since": last_modified}
+        )
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_post_time_absolute(self):
+        """
+        Posts should show the time they were created as an absolute
+        timestamp, so their HTML doesn't change as time passes.
+        """
+        post = Post.objects.create(
+            dialogue=self.private_dialogue, author=self.user1, body="Hello world"
+        )
+
+        response = self.client1.get(self.private_dialogue_url)
+
+        self.assertContains(
+            response, f'<time datetime="{post.created_on.isoformat()}"'
+        )
+        self.assertNotContains(response, " ago")
+
+    def test_post_author_columns(self):
+        """
+        Posts on the page should be loaded without the author columns
+        that aren't shown, like their password hash and email.
+        """
+        Post.objects.create(
+            dialogue=self.private_dialogue, author=self.user1, body="Hello world"
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client1.get(self.private_dialogue_url)
+
+        posts_queries = [
+            query["sql"]
+            for query in queries
+            if 'FROM "dialogues_post"' in query["sql"]
+        ]
+        self.assertContains(response, "testuser1")
+        self.assertTrue(posts_queries)
+        for posts_query in posts_queries:
+            self.assertNotIn('"accounts_user"."password"', posts_query)
+
+    def test_login_changes_validators(self):
+        """
+        Logging in again rotates the CSRF token of the forms on the
+        page, so the ETag should change and the page be rendered again.
+        """
+        etag = self.client1.get(self.private_dialogue_url).headers["ETag"]
+
+        self.client1.logout()
+        self.client1.post(reverse("accounts:login"), {
+            "username": "testuser1",
+            "password": "testpassword"
+        })
+        response = self.client1.get(
+            self.private_dialogue_url, headers={"If-None-Match": etag}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+
+class CreatePostViewTests(TestCase):
+    """
+    Testing suite for CreatePostView.
+
+    Tests included:
+        1. HTMX post returns partial template
+        2. Response includes posts missed by the polling loop
+        3. Empty post body is not saved
+        4. Non-participant cannot post
+    """
+    def setUp(self):
+        """
+        Initial setup of testing suite.
+        """
+        self.client1 = Client()
+        self.client2 = Client()
+
+        self.user1 = User.objects.create_user(
+            username="testuser1",
+            email="testuser1@example.com",
+            password="testpassword"
+        )
+        self.user2 = User.objects.create_user(
+            username="testuser2",
+            email="testuser2@example.com",
+            password="testpassword"
+        )
+
+        self.client1.force_login(self.user1)
+        self.client2.force_login(self.user2)
+
+        self.dialogue = Dialogue.objects.create(
+            title="Test dialogue",
+            author=self.user1,
+            is_visible=True
+        )
+        self.create_post_url = reverse(
+            "dialogues:create_post",
+            args=[self.dialogue.slug]
+        )
+
+    def test_htmx_post_response(self):
+        """
+        New posts with HTMX should return partial template containing
+        post body and the `seq` of its change.
+        """
+        post_body = "Hello world"
+        response = self.client1.post(
+            self.create_post_url,
+            {"body": post_body},
+            headers={
+                "HX-Request": True
+            })
+        self.assertIn(post_body, response.text)
+        self.assertTemplateUsed(response, TemplateName.DIALOGUE_DETAIL_UPDATE)
+        self.assertEqual(
+            response.context.get("seq"),
+            PostChange.objects.get(post_id=Post.objects.get(body=post_body).id).seq
+        )
+
+    def test_response_includes_missed_posts(self):
+        """
+        Response should include posts created since `seq` by other
+        participants.
+        """
+        self.dialogue.participants.add(self.user2)
+        first_post = Post.objects.create(
+            dialogue=self.dialogue, author=self.user1, body="First post"
+        )
+        Post.objects.create(
+            dialogue=self.dialogue, author=self.user2, body="Missed post"
+        )
+        response = self.client1.post(
+            self.create_post_url,
+            {"body": "Latest post", "seq": 1},
+            headers={"HX-Request": True}
+        )
+        self.assertNotIn("First post", response.text)
+        self.assertIn("Missed post", response.text)
+        self.assertIn("Latest post", response.text)
+
+    def test_empty_post_not_saved(self):
+        """
+        Posts with an empty or whitespace-only body should not be saved.
+        """
+        response = self.client1.post(self.create_post_url, {"body": "   "})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Post.objects.filter(dialogue=self.dialogue).exists())
+
+    def test_nonparticipant_cannot_post(self):
+        """
+        Non-participants should not be able to post in a dialogue.
+        """
+        response = self.client2.post(self.create_post_url, {"body": "Hi"})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Post.objects.filter(dialogue=self.dialogue).exists())
+
+
+class DialogueDetailUpdateViewTests(TestCase):
+    """
+    Testing suite for DialogueDetailUpdateView.
+
+    Tests included:
+        1. Only posts changed since `seq` are returned
+        2. Invalid `seq` returns all posts
+        3. Non-participant polling a private dialogue gets 403 partial
+        4. Anonymous users can poll public dialogues
+        5. Active dialogues are polled at the minimum interval
+        6. Dormant dialogues are polled at the maximum interval
+        7. Polls without changes return an empty response
+        8. Polls with a changed interval re-render the polling element
+        9. Polls with new posts advance the read cursor at most once per
+           interval, and the last advance is written after it
+        10. Polls of public dialogues without new posts don't load the
+            session or user
+        11. Polling intervals are rounded down to fixed steps
+    """
+    def setUp(self):
+        """
+        Initial setup of testing suite.
+        """
+        cache.clear()
+        self.client = Client()
+
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpassword"
+        )
+        self.dialogue = Dialogue.objects.create(
+            title="Test dialogue",
+            author=self.user,
+            is_visible=True
+        )
+        self.old_post = Post.objects.create(
+            dialogue=self.dialogue, author=self.user, body="Old post"
+        )
+        self.new_post = Post.objects.create(
+            dialogue=self.dialogue, author=self.user, body="New post"
+        )
+        self.old_seq = PostChange.objects.get(post_id=self.old_post.id).seq
+        self.new_seq = PostChange.objects.get(post_id=self.new_post.id).seq
+        self.update_url = reverse(
+            "dialogues:dialogue_detail_update",
+            args=[self.dialogue.slug]
+        )
+
+    def test_posts_since_seq(self):
+        """
+        Only posts changed since the change `seq` should be rendered.
+        """
+        self.client.force_login(self.user)
+        response = self.client.get(
+            self.update_url, {"seq": self.old_seq}
+        )
+        self.assertNotIn("Old post", response.text)
+        self.assertIn("New post", response.text)
+        self.assertEqual(response.context.get("seq"), self.new_seq)
+
+    def test_invalid_seq(self):
+        """
+        An invalid `seq` should be treated as 0.
+        """
+        response = self.client.get(self.update_url, {"seq": "abc"})
+        self.assertIn("Old post", response.text)
+        self.assertIn("New post", response.text)
+
+    def test_private_dialogue_permission_denied(self):
+        """
+        Polling a private dialogue as a non-participant should render
+        the 403 partial.
+        """
+        self.dialogue.is_visible = False
+        self.dialogue.save()
+        response = self.client.get(self.update_url)
+        self.assertTemplateUsed(response, TemplateName.PERMISSION_DENIED)
+        self.assertNotIn("New post", response.text)
+
+    def test_anonymous_user_can_poll_public_dialogue(self):
+        """
+        Anonymous users should be able to poll public dialogues.
+        """
+        response = self.client.get(
+            self.update_url, {"seq": self.new_seq}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, TemplateName.DIALOGUE_DETAIL_UPDATE)
+
+    def test_active_dialogue_polling_interval(self):
+        """
+        Dialogues with a recent post should be polled at the minimum
+        interval.
+        """
+        response = self.client.get(self.update_url)
+        self.assertEqual(
+            response.context.get("polling_interval"), MIN_POLLING_INTERVAL
+        )
+
+    def test_dormant_dialogue_polling_interval(self):
+        """
+        Dialogues without a post for a long time should be polled at
+        the maximum interval.
+        """
+        Post.objects.update(created_on=timezone.now() - timedelta(days=7))
+        response = self.client.get(
+            self.update_url, {"seq": self.new_seq}
+        )
+        self.assertEqual(
+            response.context.get("polling_interval"), MAX_POLLING_INTERVAL
+        )
+
+    def test_unchanged_poll_is_empty(self):
+        """
+        Polls without new posts or a change of interval should return
+        an empty response.
+        """
+        response = self.client.get(
+            self.update_url,
+            {"seq": self.new_seq, "interval": MIN_POLLING_INTERVAL}
+        )
+        self.assertEqual(response.text.strip(), "")
+
+    def test_changed_interval_rerenders_polling(self):
+        """
+        Polls without new posts should re-render the polling element
+        with the `seq` sent by the client if the interval changes.
+        """
+        Post.objects.update(created_on=timezone.now() - timedelta(days=7))
+        response = self.client.get(
+            self.update_url,
+            {"seq": self.new_seq, "interval": MIN_POLLING_INTERVAL}
+        )
+        self.assertIn('id="polling"', response.text)
+        self.assertIn(f"every {MAX_POLLING_INTERVAL}s", response.text)
+        self.assertIn(f"seq={self.new_seq}", response.text)
+
+    def test_poll_advances_read_cursor(self):
+        """
+        Polls with new posts should advance the read cursor of the
+        user, with later writes coalesced into a job that runs once the
+        interval has passed.
+        """
+        self.client.force_login(self.user)
+        self.client.get(self.update_url, {"seq": self.old_seq})
+        cursor = ReadCursor.objects.get(user=self.user, dialogue=self.dialogue)
+        self.assertEqual(cursor.last_read_post_id, self.new_post.id)
+
+        newest_post = Post.objects.create(
+            dialogue=self.dialogue, author=self.user, body="Newest post"
+        )
+        self.client.get(self.update_url, {"seq": self.new_seq})
+        self.client.get(self.update_url, {"seq": self.old_seq})
+        cursor.refresh_from_db()
+        self.assertEqual(cursor.last_read_post_id, self.new_post.id)
+
+        job = Job.objects.get(name="write_read_cursor")
+        self.assertGreater(job.run_at, timezone.now())
+        write_read_cursor(**job.kwargs)
+        cursor.refresh_from_db()
+        self.assertEqual(cursor.last_read_post_id, newest_post.id)
+
+    def test_unchanged_poll_skips_session_and_user(self):
+        """
+        Polls of public dialogues without new posts should neither query
+        the session nor the user table, for anonymous and logged in
+        users alike.
+        """
+        params = {"seq": self.new_seq, "interval": MIN_POLLING_INTERVAL}
+        tables = ["django_session", User._meta.db_table]
+
+        for login in [False, True]:
+            with self.subTest(login=login):
+                if login:
+                    self.client.force_login(self.user)
+
+                # warm up the cached last activity of the dialogue
+                self.client.get(self.update_url, params)
+
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(self.update_url, params)
+
+                self.assertEqual(response.status_code, 200)
+                for query in queries:
+                    for table in tables:
+                        self.assertNotIn(f'FROM "{table}"', query["sql"])
+
+    def test_polling_interval_steps(self):
+        """
+        The polling interval should be rounded down to the steps in
+        `POLLING_INTERVALS`, so it doesn't change on every poll while a
+        dialogue goes quiet.
+        """
+        for inactivity, interval in [(15, 1), (30, 2), (99, 5), (240, 10), (290, 10)]:
+            with self.subTest(inactivity=inactivity):
+                last_activity_on = timezone.now() - timedelta(seconds=inactivity)
+                self.assertEqual(get_polling_interval(last_activity_on), interval)
+
+
+class PollCoalescingTests(TestCase):
+    """
+    Testing suite for coalescing identical polls in
+    DialogueDetailUpdateView.
+
+    Tests included:
+        1. Concurrent identical polls share one computed result
+        2. Identical polls just after are served from the cache
+        3. New posts invalidate cached results
+        4. Own posts are highlighted despite a shared result
+        5. Coalescing ratio counts shared results
+    """
+    def setUp(self):
+        """
+        Initial setup of testing suite.
+        """
+        cache.clear()
+        poll_stats.clear()
+
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpassword"
+        )
+        self.dialogue = Dialogue.objects.create(
+            title="Test dialogue",
+            author=self.user,
+            is_visible=True
+        )
+        self.post = Post.objects.create(
+            dialogue=self.dialogue, author=self.user, body="First post"
+        )
+        self.seq = PostChange.objects.get(post_id=self.post.id).seq
+        self.update_url = reverse(
+            "dialogues:dialogue_detail_update",
+            args=[self.dialogue.slug]
+        )
+
+    async def test_concurrent_polls_coalesced(self):
+        """
+        Concurrent polls with the same `seq` should share a single
+        computed result.
+        """
+        client = AsyncClient()
+        responses = await asyncio.gather(
+            *(client.get(self.update_url, {"seq": 0}) for _ in range(5))
+        )
+
+        sources = [response.headers["X-Poll-Result"] for response in responses]
+        self.assertEqual(sources.count("computed"), 1)
+        self.assertEqual(sources.count("coalesced"), 4)
+        for response in responses:
+            self.assertIn("First post", response.text)
+
+    def test_polls_after_cached(self):
+        """
+        A poll arriving just after an identical one should be answered
+        from the cache, while a different `seq` is computed.
+        """
+        first = self.client.get(self.update_url, {"seq": 0})
+        second = self.client.get(self.update_url, {"seq": 0})
+        other = self.client.get(self.update_url, {"seq": self.seq})
+
+        self.assertEqual(first.headers["X-Poll-Result"], "computed")
+        self.assertEqual(second.headers["X-Poll-Result"], "cached")
+        self.assertEqual(second.text, first.text)
+        self.assertEqual(other.headers["X-Poll-Result"], "computed")
+
+    def test_new_post_invalidates_cached_result(self):
+        """
+        A new post should invalidate the cached results of the dialogue.
+        """
+        params = {"seq": self.seq}
+        self.client.get(self.update_url, params)
+        Post.objects.create(dialogue=self.dialogue, author=self.user, body="New")
+
+        response = self.client.get(self.update_url, params)
+
+        self.assertEqual(response.headers["X-Poll-Result"], "computed")
+        self.assertIn("New", response.text)
+
+    def test_own_posts_highlighted(self):
+        """
+        Posts of the polling user should be highlighted even if the
+        result was computed for another poll.
+        """
+        self.client.get(self.update_url, {"seq": 0})
+
+        self.client.force_login(self.user)
+        response = self.client.get(self.update_url, {"seq": 0})
+
+        self.assertEqual(response.headers["X-Poll-Result"], "cached")
+        self.assertIn("post-by-user", response.text)
+
+    def test_coalescing_ratio(self):
+        """
+        The coalescing ratio should be the share of polls that didn't
+        compute their own result.
+        """
+        for _ in range(4):
+            self.client.get(self.update_url, {"seq": 0})
+
+        self.assertEqual(get_poll_coalescing_ratio(), 0.75)
+
+
+class DialogueSnapshotTests(TestCase):
+    """
+    Testing suite for static snapshots of dormant dialogues.
+
+    Tests included:
+        1. Snapshots are created for dormant public dialogues only
+        2. Anonymous visitors are served the snapshot without queries
+        3. Authenticated users are served the regular page
+        4. New posts drop the snapshot
+        5. Visibility changes drop the snapshot
+        6. Visits served the snapshot are counted, renders are not
+    """
+    def setUp(self):
+        """
+        Initial setup of testing suite.
+        """
+        self.snapshot_root = tempfile.TemporaryDirectory()
+        settings_override = override_settings(
+            SNAPSHOT_ROOT=self.snapshot_root.name
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(self.snapshot_root.cleanup)
+        cache.clear()
+
+        self.client = Client()
+
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="testuser@example.com",
+            password="testpassword"
+        )
+        self.dormant_dialogue = Dialogue.objects.create(
+            title="Dormant dialogue",
+            author=self.user,
+            is_visible=True
+        )
+        Post.objects.create(
+            dialogue=self.dormant_dialogue, author=self.user, body="Old post"
+        )
+        self.active_dialogue = Dialogue.objects.create(
+            title="Active dialogue",
+            author=self.user,
+            is_visible=True
+        )
+        Post.objects.create(
+            dialogue=self.active_dialogue, author=self.user, body="New post"
+        )
+        self.private_dialogue = Dialogue.objects.create(
+            title="Private dialogue",
+            author=self.user
+        )
+
+        long_ago = timezone.now() - timedelta(days=365)
+        Dialogue.objects.update(created_on=long_ago)
+        Post.objects.filter(dialogue=self.dormant_dialogue).update(
+            created_on=long_ago
+        )
+
+        call_command("snapshot_dormant_dialogues", stdout=StringIO())
+
+        self.dormant_dialogue_url = reverse(
+            "dialogues:dialogue_detail",
+            args=[self.dormant_dialogue.slug]
+        )
+
+    def test_snapshots_created_for_dormant_public_dialogues(self):
+        """
+        Only public dialogues without recent posts should get a
+        snapshot.
+        """
+        self.assertTrue(get_snapshot_path(self.dormant_dialogue.slug).exists())
+        self.assertFalse(get_snapshot_path(self.active_dialogue.slug).exists())
+        self.assertFalse(get_snapshot_path(self.private_dialogue.slug).exists())
+
+    def test_anonymous_visitor_served_snapshot(self):
+        """
+        Anonymous visitors should be served the snapshot without any
+        database queries, compressed if they accept gzip.
+        """
+        with self.assertNumQueries(0):
+            response = self.client.get(self.dormant_dialogue_url)
+        self.assertIn("Old post", response.text)
+
+        response = self.client.get(
+            self.dormant_dialogue_url,
+            headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Old post", gzip.decompress(response.content).decode())
+
+    def test_authenticated_user_served_page(self):
+        """
+        Authenticated users should be served the regular page.
+        """
+        self.client.force_login(self.user)
+        response = self.client.get(self.dormant_dialogue_url)
+        self.assertTemplateUsed(response, TemplateName.DIALOGUE_DETAIL)
+        self.assertIn("Old post", response.text)
+
+    def test_snapshot_views_counted(self):
+        """
+        Visits served the snapshot should count as views of the
+        dialogue, while rendering the snapshot shouldn't.
+        """
+        self.client.get(self.dormant_dialogue_url)
+
+        later = time.time() + 2 * VIEW_FLUSH_INTERVAL
+        self.assertEqual(flush_views(now=later), 1)
+
+    def test_new_post_drops_snapshot(self):
+        """
+        A new post in the dialogue should drop its snapshot.
+        """
+        Post.objects.create(
+            dialogue=self.dormant_dialogue, author=self.user, body="Revival"
+        )
+        self.assertFalse(get_snapshot_path(self.dormant_dialogue.slug).exists())
+        response = self.client.get(self.dormant_dialogue_url)
+        self.assertIn("Revival", response.text)
+
+    def test_visibility_change_drops_snapshot(self):
+        """
+        Making the dialogue private should drop its snapshot.
+        """
+        self.dormant_dialogue.is_visible = False
+        self.dormant_dialogue.save()
+        self.assertFalse(get_snapshot_path(self.dormant_dialogue.slug).exists())
+        response = self.client.get(self.dormant_dialogue_url)
+        self.assertEqual(response.status_code, 403)
+
 
 class DeleteDialogueViewTests(TestCase):
     """
@@ -405,8 +1074,8 @@ class DeleteDialogueViewTests(TestCase):
 
     def test_delete_dialogue(self):
         """
-        POST request to `delete_dialogue` URL should remove dialogue
-        from the database.
+        POST request to `delete_dialogue` URL should hide the dialogue
+        and mark it to be purged.
         """
         self.client.post(reverse("accounts:login"), {
             "username": "testuser",
@@ -419,12 +1088,15 @@ class DeleteDialogueViewTests(TestCase):
 
         self.client.post(reverse(
             "dialogues:delete_dialogue",
-            args=[self.dialogue.id]
+            args=[self.dialogue.slug]
         ))
 
         self.assertFalse(
             Dialogue.objects.filter(id=self.dialogue.id).exists()
         )
+        self.assertIsNotNone(
+            Dialogue.all_objects.get(id=self.dialogue.id).deleted_on
+        )
 
     def test_login_required_for_delete(self):
         """
@@ -449,7 +1121,7 @@ class DeleteDialogueViewTests(TestCase):
 
         response = self.client.post(reverse(
             "dialogues:delete_dialogue",
-            args=[self.dialogue.id]
+            args=[self.dialogue.slug]
         ))
 
         self.assertEqual(response.status_code, 403)
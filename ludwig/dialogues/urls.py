@@ -6,9 +6,12 @@ app_name = "dialogues"
 
 urlpatterns = [
     path("create/", views.CreateDialogueView.as_view(), name="create_dialogue"),
+    path("discover/", views.DiscoverView.as_view(), name="discover"),
     path("search-users/", views.SearchForUsersView.as_view(), name="search_users"),
-    path("<str:dialogue_id>/", views.DialogueDetailView.as_view(), name="dialogue_detail"),
-    path("update/<str:dialogue_id>", views.DialogueDetailUpdateView.as_view(), name="dialogue_detail_update"),
-    path("delete/<str:dialogue_id>", views.DeleteDialogueView.as_view(), name="delete_dialogue"),
-    path("toggle-visibility/<str:dialogue_id>", views.ToggleVisibilityView.as_view(), name="toggle_visibility"),
+    path("<str:slug>/", views.DialogueDetailView.as_view(), name="dialogue_detail"),
+    path("update/<str:slug>", views.DialogueDetailUpdateView.as_view(), name="dialogue_detail_update"),
+    path("post/<str:slug>", views.CreatePostView.as_view(), name="create_post"),
+    path("delete/<str:slug>", views.DeleteDialogueView.as_view(), name="delete_dialogue"),
+    path("toggle-visibility/<str:slug>", views.ToggleVisibilityView.as_view(), name="toggle_visibility"),
+    path("subscribe/<str:slug>", views.ToggleSubscriptionView.as_view(), name="toggle_subscription"),
 ]
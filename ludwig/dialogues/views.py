@@ -1,18 +1,144 @@
+import hashlib
+from collections import Counter
+
 from django.contrib.auth import get_user, get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.db.models import Q
 from django.http.response import HttpResponse, HttpResponseRedirect
-from django.shortcuts import get_object_or_404, redirect, render
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.views.generic.base import TemplateView, View
 from django.views.generic.detail import DetailView
 from django.views.generic.edit import CreateView, DeleteView, UpdateView
 
-from .constants import TemplateName
+from ludwig.base.singleflight import SingleFlight
+
+from .cache import (
+    aget_or_set_dialogue_data,
+    bump_dialogue_version,
+    get_dialogue_version,
+)
+from .changes import aget_changes_since, get_posts_at
+from .constants import (
+    MIN_POLLING_INTERVAL,
+    POLL_RESULT_CACHE_TIMEOUT,
+    POLLING_INACTIVITY_RATIO,
+    POLLING_INTERVALS,
+    TemplateName,
+)
+from .cursors import advance_read_cursor
 from .forms import DialogueCreationForm
-from .models import Dialogue, Post
+from .models import Dialogue, ReadCursor, Subscription
+from .ranking import count_view, get_rankings_page
+from .rows import iter_post_rows
+from .snapshots import serve_snapshot
+
+
+def get_seq(params):
+    """
+    Get and validate the `seq` from request parameters, the number of
+    the last change of the dialogue that the client has applied.
+    """
+
+    try:
+        return max(int(params.get("seq", 0)), 0)
+    except (ValueError, TypeError):
+        return 0
+
+
+def get_polling_interval(last_activity_on):
+    """
+    Get the recommended number of seconds between polls of a dialogue
+    from the time of its most recent activity. Dialogues with a live
+    exchange are polled every second, while the interval of quieter
+    dialogues grows with their inactivity through the steps in
+    `POLLING_INTERVALS` up to the maximum.
+    """
+
+    inactivity = (timezone.now() - last_activity_on).total_seconds()
+    interval = inactivity / POLLING_INACTIVITY_RATIO
+
+    return max(
+        (step for step in POLLING_INTERVALS if step <= interval),
+        default=MIN_POLLING_INTERVAL,
+    )
+
+
+def get_current_interval(params):
+    """Get the polling interval the client is currently using."""
+
+    try:
+        return int(params.get("interval", 0))
+    except (ValueError, TypeError):
+        return 0
+
+
+# in-flight poll results shared by identical polls, and counts of poll
+# results by whether they were computed, taken from the cache or shared
+# with a poll in flight
+poll_flight = SingleFlight()
+poll_stats = Counter()
+
+
+def get_poll_coalescing_ratio():
+    """Get the share of polls in this process that shared a result."""
+
+    total = sum(poll_stats.values())
+    return (total - poll_stats["computed"]) / total if total else 0.0
+
+
+async def is_participant(user, dialogue):
+    """
+    Check if a user participates in a dialogue. The participant IDs are
+    cached per dialogue version, so repeated checks by pollers don't
+    query the participants table.
+    """
+
+    async def get_participant_ids():
+        return {
+            user_id
+            async for user_id in dialogue.participants.values_list("id", flat=True)
+        }
+
+    participant_ids = await aget_or_set_dialogue_data(
+        dialogue.id, "participant_ids", get_participant_ids
+    )
+
+    return user.id in participant_ids
+
+
+def get_page_validators(request, dialogue, user):
+    """
+    Get the ETag and last modification time of a dialogue page as seen
+    by a user, without loading any posts. Everything on the page that
+    changes bumps the dialogue's cache version, so the version stands
+    for the posts and participants, and the user for what is rendered
+    differently per viewer. Versions are taken from the time they were
+    bumped, which doubles as the last modification time.
+
+    The forms on the page carry a CSRF token, whose secret is rotated
+    when the user logs in, so the secret is part of the ETag as well
+    and a page with a stale token is never reused.
+    """
+
+    version = get_dialogue_version(dialogue.id)
+    viewer = user.id if user.is_authenticated else "anonymous"
+    csrf_secret = request.META.get("CSRF_COOKIE", "")
+    state = (
+        f"{dialogue.id}:{version}:{viewer}:{csrf_secret}:"
+        f"{dialogue.is_visible}:{dialogue.is_open}"
+    )
+
+    return {
+        "etag": f'"{hashlib.md5(state.encode()).hexdigest()}"',
+        "last_modified": version // 10**9,
+    }
 
 
 class CreateDialogueView(LoginRequiredMixin, CreateView):
@@ -52,7 +178,7 @@ class CreateDialogueView(LoginRequiredMixin, CreateView):
         self._add_participants_to_dialogue(dialogue)
 
         return HttpResponseRedirect(
-            reverse("dialogues:dialogue_detail", args=(dialogue.id,))
+            reverse("dialogues:dialogue_detail", args=(dialogue.slug,))
         )
 
 
@@ -77,15 +203,42 @@ class SearchForUsersView(LoginRequiredMixin, TemplateView):
             # filter users whose display name or username contain the
             # provided query value
             User = get_user_model()
-            users = User.objects.filter(
-                Q(username__icontains=query) | Q(display_name__icontains=query)
-            ).exclude(id=self.request.user.id)[:10]
+            users = (
+                User.objects.filter(
+                    Q(username__icontains=query) | Q(display_name__icontains=query),
+                    deleted_on__isnull=True,
+                )
+                .exclude(id=self.request.user.id)[:10]
+            )
 
             context.update({"query": query, "users": users})
 
         return context
 
 
+class DiscoverView(TemplateView):
+    """
+    Display public dialogues ranked by their recent activity and views,
+    a page at a time. Pages are keyed by the rank of the last dialogue
+    on the previous page, passed as the `after` parameter.
+    """
+
+    template_name = TemplateName.DISCOVER
+
+    def get_context_data(self, **kwargs):
+        """Pass a page of ranked dialogues to context data."""
+        context = super().get_context_data(**kwargs)
+
+        try:
+            after = max(int(self.request.GET["after"]), 0)
+        except (KeyError, ValueError):
+            after = 0
+
+        rankings, next_after = get_rankings_page(after)
+        context.update({"rankings": rankings, "next_after": next_after})
+        return context
+
+
 class DialogueDetailView(DetailView):
     """
     Display a specific dialogue and manage interactivity among
@@ -96,43 +249,101 @@ class DialogueDetailView(DetailView):
     model = Dialogue
     template_name = TemplateName.DIALOGUE_DETAIL
     context_object_name = "dialogue"
-    pk_url_kwarg = "dialogue_id"
+
+    # whether page views count towards the discovery rankings, which
+    # renders of snapshots don't
+    count_views = True
 
     def dispatch(self, request, *args, **kwargs):
+        is_view = request.method in ("GET", "HEAD") and self.count_views
+
+        # serve anonymous visitors the static snapshot of a dormant
+        # public dialogue, if there is one, without any queries
+        if request.method in ("GET", "HEAD") and not request.user.is_authenticated:
+            response = serve_snapshot(request, kwargs.get("slug"))
+            if response:
+                if is_view:
+                    count_view(kwargs.get("slug"))
+                return response
+
         dialogue = self.get_object()
         user = get_user(request)
 
         if user not in dialogue.participants.all() and not dialogue.is_visible:
             raise PermissionDenied
 
+        # views are counted in the cache and flushed to the dialogue by
+        # a periodic job, so viewing a page doesn't write to its row
+        if is_view:
+            count_view(dialogue.slug)
+
+        self.validators = get_page_validators(request, dialogue, user)
+
         return super().dispatch(request, *args, **kwargs)
 
+    def get(self, request, *args, **kwargs):
+        # answer revalidations of an unchanged page before any posts are
+        # loaded or rendered
+        response = get_conditional_response(request, **self.validators)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+
+        response.headers["ETag"] = self.validators["etag"]
+        response.headers["Last-Modified"] = http_date(self.validators["last_modified"])
+
+        # let browsers keep the page, but have them check it's still
+        # current before reusing it
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
     def get_context_data(self, **kwargs):
-        """Pass all dialogue posts and last post ID to context data."""
+        """
+        Pass all dialogue posts and the number of the dialogue's last
+        change, from which the page syncs, to context data.
+        """
 
         # get initial context data, includes dialogue
         context = super().get_context_data(**kwargs)
 
-        # get dialogue object
+        # get dialogue object, along with the number of its last change
+        # from before the posts are loaded
         dialogue = self.get_object()
 
-        # get all posts in the dialogue and cache related author data
-        posts = (
-            Post.objects.filter(dialogue=dialogue)
-            .select_related("author")
-            .order_by("id")
+        # get all posts in the dialogue up to its last change, and the
+        # ID and creation time of the last one on its own, so the posts
+        # can be streamed as compact rows while the page is rendered
+        # rather than loaded as model instances up front
+        posts = get_posts_at(dialogue, dialogue.change_seq)
+        last_post = posts.values("id", "created_on").last()
+
+        # all posts are on the page, so mark them as read
+        user = self.request.user
+        if last_post and user.is_authenticated:
+            ReadCursor.objects.advance(user, dialogue, last_post["id"])
+
+        # poll based on the time of the last post, or the creation of
+        # the dialogue if nobody has posted yet
+        last_activity_on = (
+            last_post["created_on"] if last_post else dialogue.created_on
         )
 
-        # get last post id
-        last_post = posts.last() if posts.exists() else None
-        last_id = last_post.id if last_post else 0
-
-        context.update({"posts": posts, "last_id": last_id})
+        context.update(
+            {
+                "posts": iter_post_rows(posts) if last_post else [],
+                "seq": dialogue.change_seq,
+                "polling_interval": get_polling_interval(last_activity_on),
+                "is_subscribed": user.is_authenticated
+                and Subscription.objects.filter(user=user, dialogue=dialogue).exists(),
+            }
+        )
 
         return context
 
     def post(self, request, *args, **kwargs):
-        """Handle POST requests within a dialogue."""
+        """
+        Handle POST requests within a dialogue when JavaScript is
+        disabled. HTMX submissions are handled by `CreatePostView`.
+        """
 
         # get current user instance
         user = get_user(request)
@@ -140,125 +351,215 @@ class DialogueDetailView(DetailView):
         # get dialogue object
         dialogue = self.get_object()
 
-        if not user.is_authenticated and not user in dialogue.participants.all():
+        if user not in dialogue.participants.all():
             raise PermissionDenied
 
-        # get last post id
-        last_id = request.POST.get("last_id", 0)
+        # get post body from post form and remove surrounding
+        # whitespace the retrieved value
+        post_body = request.POST.get("body", "").strip()
 
-        if user in dialogue.participants.all():
-            # get post body from post form and remove surrounding
-            # whitespace the retrieved value
-            post_body = request.POST.get("body", "").strip()
+        if post_body:
+            # add post to the database
+            dialogue.posts.create(author=user, body=post_body)
 
-            if not post_body:
-                return HttpResponse("")
+        return HttpResponseRedirect(
+            f"{reverse('dialogues:dialogue_detail', args=(dialogue.slug,))}#post_form"
+        )
 
-            # add post to the database
-            post = Post.objects.create(author=user, dialogue=dialogue, body=post_body)
-
-            # if the request is from htmx, get all posts since the last
-            # updated post id, including any posts from other users
-            # that haven't been captured by the polling loop
-            if request.headers.get("HX-Request"):
-                posts = (
-                    Post.objects.filter(dialogue=dialogue, id__gt=last_id)
-                    .select_related("author")
-                    .order_by("created_on")
-                )
 
-                context = {
-                    "posts": posts,
-                    "last_id": posts.last().id,
-                    "dialogue": dialogue,
-                }
+class CreatePostView(View):
+    """
+    Add a post to a dialogue from the HTMX post form and return all
+    changes to the dialogue since the client's last sync. Implemented as
+    an async view so that it doesn't occupy a worker thread under an
+    ASGI server.
+    """
 
-                response = render(request, TemplateName.DIALOGUE_DETAIL_UPDATE, context)
-                response.headers["Vary"] = "HX-Request"
-                return response
+    async def post(self, request, *args, **kwargs):
+        """Create a post and render the dialogue update partial."""
 
-            return HttpResponseRedirect(
-                f"{reverse('dialogues:dialogue_detail', args=(dialogue.id,))}#post_form"
-            )
+        user = await request.auser()
+        dialogue = await aget_object_or_404(Dialogue, slug=kwargs.get("slug"))
+
+        if not await is_participant(user, dialogue):
+            raise PermissionDenied
+
+        # get post body from post form and remove surrounding
+        # whitespace the retrieved value
+        post_body = request.POST.get("body", "").strip()
+
+        if not post_body:
+            return HttpResponse("")
+
+        # add post to the database
+        await dialogue.posts.acreate(author=user, body=post_body)
 
+        # get all changes since the client's last sync, including the
+        # new post and any changes from other users that haven't been
+        # captured by the polling loop
+        changes = await aget_changes_since(dialogue, get_seq(request.POST))
 
-class DialogueDetailUpdateView(TemplateView):
+        context = {
+            **changes,
+            "changed": True,
+            "dialogue": dialogue,
+            "user": user,
+            "polling_interval": MIN_POLLING_INTERVAL,
+        }
+
+        response = render(request, TemplateName.DIALOGUE_DETAIL_UPDATE, context)
+        response.headers["Vary"] = "HX-Request"
+        return response
+
+
+class DialogueDetailUpdateView(View):
     """
     Update the content on the dialogue detail page without a full page
     refresh. This requires JavaScript to be enabled and is triggered
-    by post submissions and a 3 second polling mechanism.
+    by a polling mechanism whose interval adapts to the activity in the
+    dialogue. Implemented as an async view so that a single ASGI worker
+    can serve many concurrent pollers.
     """
-    template_name = TemplateName.DIALOGUE_DETAIL_UPDATE
 
-    def dispatch(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
         """
-        Check if user has permission to view the dialogue before
-        processing the request. If a non-participant is viewing the
+        Check if user has permission to view the dialogue and render
+        the posts added, edited and deleted since the change numbered by
+        the `seq` request parameter. If a non-participant is viewing the
         dialogue in real-time and the visibility settings are set to
         private during the live viewing, the page will update in
         real-time to show the 403 page.
         """
 
-        dialogue_id = kwargs.get("dialogue_id")
-        dialogue = get_object_or_404(Dialogue, id=dialogue_id)
-        user = get_user(request)
+        dialogue = await aget_object_or_404(Dialogue, slug=kwargs.get("slug"))
+
+        # the session and user are only loaded when they're needed, so
+        # polls of public dialogues without new posts never touch the
+        # session or user tables
+        user = None
+
+        if not dialogue.is_visible:
+            user = await request.auser()
+            if not await is_participant(user, dialogue):
+                return render(request, TemplateName.PERMISSION_DENIED)
+
+        seq = get_seq(request.GET)
+        current_interval = get_current_interval(request.GET)
+        computed = False
+
+        async def get_cached_result():
+            async def compute_result():
+                nonlocal computed
+                computed = True
+                return await self._get_poll_result(dialogue, seq, current_interval)
+
+            return await aget_or_set_dialogue_data(
+                dialogue.id,
+                f"poll:{seq}:{current_interval}",
+                compute_result,
+                POLL_RESULT_CACHE_TIMEOUT,
+            )
 
-        if not dialogue.is_visible and not user in dialogue.participants.all():
-            return render(request, TemplateName.PERMISSION_DENIED)
+        # identical polls share one query and render, both while one of
+        # them is in flight and for a few seconds after it's done
+        result, shared = await poll_flight.do(
+            (dialogue.id, seq, current_interval), get_cached_result
+        )
+        source = "coalesced" if shared else "computed" if computed else "cached"
+        poll_stats[source] += 1
 
-        return super().dispatch(request, *args, **kwargs)
+        new_posts = result["context"]["new_posts"]
+        posts = new_posts + result["context"]["edited_posts"]
 
-    def _get_last_id(self):
-        """Get and validate the last_id from request parameters"""
+        if posts:
+            # the user is needed to advance their read cursor and to
+            # highlight their own posts
+            user = user or await request.auser()
 
-        try:
-            last_id = self.request.GET.get("last_id", 0)
-            return int(last_id)
-        except (ValueError, TypeError):
-            return 0
+        if new_posts:
+            await advance_read_cursor(user, dialogue, new_posts[-1].id)
 
-    def get_context_data(self, **kwargs):
-        """Get new posts and pass them to the template"""
+        if any(post.author_id == user.id for post in posts):
+            # the shared result is rendered for a viewer without posts
+            # in it, so posts of the user need their own render to be
+            # highlighted
+            context = {**result["context"], "user": user}
+            response = render(request, TemplateName.DIALOGUE_DETAIL_UPDATE, context)
+        else:
+            response = HttpResponse(result["html"])
 
-        context = super().get_context_data(**kwargs)
+        response.headers["X-Poll-Result"] = source
+        return response
 
-        dialogue_id = self.kwargs.get("dialogue_id")
-        dialogue = get_object_or_404(Dialogue, id=dialogue_id)
+    async def _get_poll_result(self, dialogue, seq, current_interval):
+        """
+        Get the context and rendered update partial of a poll. The
+        result doesn't depend on the user, so it can be shared by all
+        polls of the dialogue with the same `seq` and interval.
+        """
 
-        # to determine whether a post is new, get the ID of the most
-        # recent post in the dialogue
-        last_id = self._get_last_id()
+        # get the posts changed since `seq`, the number of the last
+        # change the client has applied
+        changes = await aget_changes_since(dialogue, seq)
+        new_posts = changes["new_posts"]
 
-        # get all posts with IDs greater than `last_id` and cache the
-        # related author data
-        posts = (
-            Post.objects.filter(dialogue=dialogue, id__gt=last_id)
-            .select_related("author")
-            .order_by("created_on")
-        )
+        if new_posts:
+            polling_interval = get_polling_interval(new_posts[-1].created_on)
+        else:
+            polling_interval = get_polling_interval(
+                await self._get_last_activity_on(dialogue)
+            )
 
-        last_post = posts.last() if posts.exists() else None
-        last_id = last_post.id if last_post else 0
+        # the polling element is only re-rendered if the sequence moved
+        # on, even by changes that cancel out, or the client should
+        # change its polling interval, so polls without any changes keep
+        # an empty response
+        context = {
+            **changes,
+            "changed": changes["seq"] != seq,
+            "dialogue": dialogue,
+            "user": None,
+            "polling_interval": polling_interval,
+            "interval_changed": polling_interval != current_interval,
+        }
+
+        return {
+            "context": context,
+            "html": render_to_string(TemplateName.DIALOGUE_DETAIL_UPDATE, context),
+        }
+
+    async def _get_last_activity_on(self, dialogue):
+        """
+        Get the time of the last post, or creation of the dialogue. The
+        time is cached until the next change to the dialogue, so polls
+        without changes only query the change log since `seq`.
+        """
 
-        context.update(
-            {
-                "posts": posts,
-                "last_id": last_id,
-                "dialogue": dialogue,
-            }
-        )
+        async def get_last_post_created_on():
+            last_post_created_on = await (
+                dialogue.posts.order_by("-id")
+                .values_list("created_on", flat=True)
+                .afirst()
+            )
+            return last_post_created_on or dialogue.created_on
 
-        return context
+        return await aget_or_set_dialogue_data(
+            dialogue.id, "last_activity_on", get_last_post_created_on
+        )
 
 
 class DeleteDialogueView(LoginRequiredMixin, DeleteView):
+    """
+    Delete a dialogue as its author. The dialogue is hidden at once and
+    its posts are purged in the background by `purge_deleted`, so large
+    dialogues don't block the request.
+    """
+
     model = Dialogue
     success_url = reverse_lazy("dashboard:home")
-    pk_url_kwarg = "dialogue_id"
 
     def dispatch(self, request, *args, **kwargs):
-        dialogue_id = kwargs.get("dialogue_id")
-        dialogue = get_object_or_404(Dialogue, id=dialogue_id)
+        dialogue = get_object_or_404(Dialogue, slug=kwargs.get("slug"))
 
         user = get_user(request)
 
@@ -267,11 +568,15 @@ class DeleteDialogueView(LoginRequiredMixin, DeleteView):
 
         return super().dispatch(request, *args, **kwargs)
 
+    def form_valid(self, form):
+        """Soft-delete the dialogue and redirect to the dashboard."""
+        self.object.soft_delete()
+        return HttpResponseRedirect(self.get_success_url())
+
 
 class ToggleVisibilityView(LoginRequiredMixin, View):
     def dispatch(self, request, *args, **kwargs):
-        dialogue_id = kwargs.get("dialogue_id")
-        dialogue = get_object_or_404(Dialogue, id=dialogue_id)
+        dialogue = get_object_or_404(Dialogue, slug=kwargs.get("slug"))
 
         user = get_user(request)
 
@@ -280,8 +585,8 @@ class ToggleVisibilityView(LoginRequiredMixin, View):
 
         return super().dispatch(request, *args, **kwargs)
 
-    def post(self, request, dialogue_id):
-        dialogue = get_object_or_404(Dialogue, id=dialogue_id)
+    def post(self, request, slug):
+        dialogue = get_object_or_404(Dialogue, slug=slug)
 
         if dialogue.author != request.user:
             return
@@ -290,3 +595,36 @@ class ToggleVisibilityView(LoginRequiredMixin, View):
 
         context = {"dialogue": dialogue}
         return render(request, TemplateName.TOGGLE_VISIBILITY, context)
+
+
+class ToggleSubscriptionView(LoginRequiredMixin, View):
+    """
+    Subscribe the user to the posts of a public dialogue, or unsubscribe
+    them if they're subscribed already.
+    """
+
+    def post(self, request, slug):
+        dialogue = get_object_or_404(Dialogue, slug=slug)
+
+        if not dialogue.is_visible:
+            raise PermissionDenied
+
+        # toggle the subscription
+        subscriptions = Subscription.objects.filter(
+            user=request.user, dialogue=dialogue
+        )
+        is_subscribed = not subscriptions.exists()
+        if is_subscribed:
+            Subscription.objects.subscribe(request.user, dialogue)
+        else:
+            Subscription.objects.unsubscribe(request.user, dialogue)
+
+        # the subscription is shown on the dialogue page
+        bump_dialogue_version(dialogue.id)
+
+        # return to the dialogue when JavaScript is disabled
+        if not request.headers.get("HX-Request"):
+            return redirect("dialogues:dialogue_detail", slug=dialogue.slug)
+
+        context = {"dialogue": dialogue, "is_subscribed": is_subscribed}
+        return render(request, TemplateName.SUBSCRIPTION, context)
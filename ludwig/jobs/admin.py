@@ -0,0 +1,6 @@
+from django.contrib import admin
+
+from .models import Job, PeriodicJob
+
+admin.site.register(Job)
+admin.site.register(PeriodicJob)
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "ludwig.jobs"
+
+    def ready(self):
+        # register the jobs defined in the `jobs` module of every app
+        autodiscover_modules("jobs")
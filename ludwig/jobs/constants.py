@@ -0,0 +1,23 @@
+# default number of times a job is attempted before it's marked failed
+MAX_ATTEMPTS = 5
+
+# seconds before the first retry of a failed job, doubled for every
+# further attempt up to the maximum
+RETRY_BACKOFF = 10
+MAX_RETRY_BACKOFF = 60 * 60
+
+# seconds between the heartbeats of a worker for the job it's running
+HEARTBEAT_INTERVAL = 30
+
+# seconds without a heartbeat after which a running job is assumed to be
+# lost with its worker and is picked up again
+JOB_TIMEOUT = 2 * 60
+
+# seconds an idle worker waits before checking for jobs again
+POLL_INTERVAL = 1
+
+# seconds between the throughput reports of a worker
+REPORT_INTERVAL = 60
+
+# days to keep finished jobs for metrics before they're pruned
+FINISHED_JOB_RETENTION_DAYS = 7
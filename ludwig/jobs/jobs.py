@@ -0,0 +1,14 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .constants import FINISHED_JOB_RETENTION_DAYS
+from .models import Job
+from .registry import job
+
+
+@job(every=24 * 60 * 60)
+def prune_finished_jobs():
+    """Delete finished jobs that are no longer needed for metrics."""
+    cutoff = timezone.now() - timedelta(days=FINISHED_JOB_RETENTION_DAYS)
+    Job.objects.filter(finished_on__lt=cutoff).delete()
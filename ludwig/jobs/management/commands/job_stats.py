@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ludwig.jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = "Show the number of jobs per status and the recent job throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--minutes",
+            type=int,
+            default=60,
+            help="Minutes of finished jobs to compute the throughput from.",
+        )
+
+    def handle(self, *args, **options):
+        minutes = options["minutes"]
+        stats = Job.objects.stats(since=timezone.now() - timedelta(minutes=minutes))
+
+        for status, count in stats["counts"].items():
+            self.stdout.write(f"{status}: {count}")
+
+        finished = stats["succeeded"] + stats["failed"]
+        average_duration = stats["average_duration"] or timedelta()
+
+        self.stdout.write(
+            f"Last {minutes} minute(s): {stats['succeeded']} succeeded,"
+            f" {stats['failed']} failed ({finished / minutes:.2f} jobs/min),"
+            f" {average_duration.total_seconds():.2f}s on average"
+        )
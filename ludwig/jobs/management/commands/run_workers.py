@@ -0,0 +1,78 @@
+import multiprocessing
+import os
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from ludwig.jobs.constants import POLL_INTERVAL, REPORT_INTERVAL
+from ludwig.jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs from the job queue in the database with a "
+        "number of worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Number of worker processes.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=POLL_INTERVAL,
+            help="Seconds an idle worker waits before checking for jobs again.",
+        )
+        parser.add_argument(
+            "--report-interval",
+            type=float,
+            default=REPORT_INTERVAL,
+            help="Seconds between the throughput reports of each worker.",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once there are no jobs due instead of waiting for more.",
+        )
+
+    def handle(self, *args, **options):
+        if options["processes"] == 1:
+            self._run_worker("worker-1", options)
+            return
+
+        # forked processes mustn't share the database connections of
+        # the parent, so they're closed and opened again by each worker
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        processes = [
+            context.Process(target=self._run_worker, args=(f"worker-{i}", options))
+            for i in range(1, options["processes"] + 1)
+        ]
+
+        for process in processes:
+            process.start()
+
+        def stop(*args):
+            for process in processes:
+                if process.pid:
+                    os.kill(process.pid, signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        for process in processes:
+            process.join()
+
+    def _run_worker(self, name, options):
+        worker = Worker(
+            name,
+            poll_interval=options["poll_interval"],
+            report_interval=options["report_interval"],
+            report=self.stdout.write,
+        )
+        worker.run(burst=options["burst"])
@@ -0,0 +1,176 @@
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import Avg, Count, F, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .constants import JOB_TIMEOUT, MAX_ATTEMPTS, MAX_RETRY_BACKOFF, RETRY_BACKOFF
+
+
+class JobQuerySet(models.QuerySet):
+    def enqueue(self, name, kwargs=None, run_at=None, max_attempts=MAX_ATTEMPTS):
+        """Add a job to the queue, to be run at `run_at` or right away."""
+        return self.create(
+            name=name,
+            kwargs=kwargs or {},
+            run_at=run_at or timezone.now(),
+            max_attempts=max_attempts,
+        )
+
+    def claim(self):
+        """
+        Claim the next job that is due and mark it as running, or return
+        None if there is none. Jobs locked by another worker are skipped
+        rather than waited for, so workers never block each other. Jobs
+        whose worker hasn't sent a heartbeat for `JOB_TIMEOUT` seconds
+        are assumed to be lost with their worker and are claimed again,
+        or marked failed if they're out of attempts, so that a job that
+        brings down its worker isn't run forever.
+        """
+        while True:
+            now = timezone.now()
+            due = Q(status=Job.Status.QUEUED, run_at__lte=now) | Q(
+                status=Job.Status.RUNNING,
+                last_seen_on__lt=now - timedelta(seconds=JOB_TIMEOUT),
+            )
+
+            with transaction.atomic():
+                job = (
+                    self.select_for_update(skip_locked=True)
+                    .alias(last_seen_on=Coalesce("heartbeat_on", "started_on"))
+                    .filter(due)
+                    .order_by("run_at")
+                    .first()
+                )
+
+                if job is None:
+                    return None
+
+                if (
+                    job.status == Job.Status.RUNNING
+                    and job.attempts >= job.max_attempts
+                ):
+                    job.status = Job.Status.FAILED
+                    job.last_error = f"Lost with its worker on attempt {job.attempts}"
+                    job.finished_on = now
+                    job.save(update_fields=["status", "last_error", "finished_on"])
+                    continue
+
+                job.status = Job.Status.RUNNING
+                job.attempts += 1
+                job.started_on = now
+                job.heartbeat_on = now
+                job.save(
+                    update_fields=["status", "attempts", "started_on", "heartbeat_on"]
+                )
+
+            return job
+
+    def stats(self, since):
+        """
+        Get the number of jobs per status, and the number and average
+        duration of the jobs finished since `since`.
+        """
+        counts = dict(
+            self.values_list("status").annotate(count=Count("id")).order_by()
+        )
+        finished = self.filter(finished_on__gte=since).aggregate(
+            succeeded=Count("id", filter=Q(status=Job.Status.SUCCEEDED)),
+            failed=Count("id", filter=Q(status=Job.Status.FAILED)),
+            average_duration=Avg(F("finished_on") - F("started_on")),
+        )
+
+        return {
+            "counts": {status: counts.get(status, 0) for status in Job.Status},
+            **finished,
+        }
+
+
+class Job(models.Model):
+    """
+    A unit of background work, run by the workers of `run_workers`. The
+    `name` refers to a function registered with the `job` decorator,
+    which is called with `kwargs`.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued"
+        RUNNING = "running"
+        SUCCEEDED = "succeeded"
+        FAILED = "failed"
+
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.QUEUED
+    )
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=MAX_ATTEMPTS)
+    last_error = models.TextField(blank=True)
+    created_on = models.DateTimeField(auto_now_add=True)
+    started_on = models.DateTimeField(null=True, blank=True)
+    heartbeat_on = models.DateTimeField(null=True, blank=True)
+    finished_on = models.DateTimeField(null=True, blank=True)
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # only unfinished jobs are ever claimed, so the index stays
+            # small however many finished jobs are kept
+            models.Index(
+                fields=["run_at"],
+                condition=Q(status__in=["queued", "running"]),
+                name="job_unfinished_run_at_idx",
+            ),
+            models.Index(fields=["finished_on"], name="job_finished_on_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+    def beat(self):
+        """Mark the job as still running, unless it has been reclaimed."""
+        Job.objects.filter(id=self.id, status=self.Status.RUNNING).update(
+            heartbeat_on=timezone.now()
+        )
+
+    def succeed(self):
+        """Mark the job as succeeded."""
+        self.status = self.Status.SUCCEEDED
+        self.finished_on = timezone.now()
+        self.save(update_fields=["status", "finished_on"])
+
+    def fail(self, error):
+        """
+        Schedule a retry of the job with exponential backoff, or mark it
+        as failed once it's out of attempts.
+        """
+        now = timezone.now()
+        self.last_error = error
+
+        if self.attempts < self.max_attempts:
+            backoff = min(RETRY_BACKOFF * 2 ** (self.attempts - 1), MAX_RETRY_BACKOFF)
+            self.status = self.Status.QUEUED
+            self.run_at = now + timedelta(seconds=backoff)
+        else:
+            self.status = self.Status.FAILED
+            self.finished_on = now
+
+        self.save(update_fields=["status", "run_at", "last_error", "finished_on"])
+
+
+class PeriodicJob(models.Model):
+    """
+    The next time a job registered with an `every` interval is due. The
+    row is locked while the job is enqueued, so only one worker enqueues
+    each run.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    next_run_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} at {self.next_run_at}"
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .constants import MAX_ATTEMPTS
+
+# registered jobs by name
+registry = {}
+
+
+class RegisteredJob:
+    """
+    A function that can be run by the job workers. Calling it runs the
+    function directly, while `enqueue` adds it to the job queue.
+    """
+
+    def __init__(self, func, name, max_attempts, every):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.every = every
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def enqueue(self, delay=None, run_at=None, **kwargs):
+        """
+        Add a run of the job to the queue, after `delay` seconds or at
+        `run_at` if either is given. Keyword arguments are passed to the
+        function and have to be serializable to JSON.
+        """
+        from .models import Job
+
+        if delay is not None:
+            run_at = timezone.now() + timedelta(seconds=delay)
+
+        return Job.objects.enqueue(
+            self.name, kwargs, run_at=run_at, max_attempts=self.max_attempts
+        )
+
+
+def job(name=None, max_attempts=MAX_ATTEMPTS, every=None):
+    """
+    Register a function as a job under `name`, which defaults to the
+    name of the function. Jobs with an `every` interval in seconds are
+    enqueued periodically by the workers.
+    """
+
+    def decorator(func):
+        registered_job = RegisteredJob(
+            func, name or func.__name__, max_attempts, every
+        )
+        registry[registered_job.name] = registered_job
+        return registered_job
+
+    return decorator
@@ -0,0 +1,300 @@
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase
+from django.utils import timezone
+
+from ludwig.jobs.constants import JOB_TIMEOUT, RETRY_BACKOFF
+from ludwig.jobs.models import Job, PeriodicJob
+from ludwig.jobs.registry import job, registry
+from ludwig.jobs.worker import (
+    Heartbeat,
+    Worker,
+    register_periodic_jobs,
+    run_next_job,
+    schedule_periodic_jobs,
+)
+
+calls = []
+
+
+@job(name="test_record", max_attempts=3)
+def record(value):
+    calls.append(value)
+
+
+@job(name="test_fail", max_attempts=2)
+def fail():
+    raise ValueError("Job failed")
+
+
+@job(name="test_periodic", every=60)
+def periodic():
+    calls.append("periodic")
+
+
+class JobTestCase(TestCase):
+    """Base class that keeps the jobs registered for testing only."""
+
+    def setUp(self):
+        """
+        Initial setup for the testing suite.
+        """
+        calls.clear()
+        test_jobs = {name for name in registry if name.startswith("test_")}
+        patcher = mock.patch.dict(
+            "ludwig.jobs.worker.registry",
+            {name: registry[name] for name in test_jobs},
+            clear=True,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class RunNextJobTests(JobTestCase):
+    """
+    Testing suite for running queued jobs.
+
+    Tests included:
+        1. Queued jobs run with their arguments
+        2. Jobs scheduled in the future aren't run early
+        3. Failed jobs are retried with exponential backoff
+        4. Jobs out of attempts are marked failed
+        5. Jobs lost with their worker are run again
+        6. Unregistered jobs are retried
+        7. Jobs with recent heartbeats aren't claimed again
+        8. Lost jobs out of attempts are marked failed
+        9. Running jobs send heartbeats
+    """
+
+    def test_run_job(self):
+        """
+        A queued job should be run with its arguments and marked as
+        succeeded.
+        """
+        record.enqueue(value="test")
+
+        queued_job = run_next_job()
+
+        self.assertEqual(calls, ["test"])
+        self.assertEqual(queued_job.status, Job.Status.SUCCEEDED)
+        self.assertIsNone(run_next_job())
+
+    def test_scheduled_job(self):
+        """
+        A job scheduled in the future shouldn't run before it's due.
+        """
+        scheduled_job = record.enqueue(delay=60, value="test")
+
+        self.assertIsNone(run_next_job())
+
+        Job.objects.filter(id=scheduled_job.id).update(run_at=timezone.now())
+        self.assertEqual(run_next_job().id, scheduled_job.id)
+
+    def test_retry_with_backoff(self):
+        """
+        A failed job should be queued again with a delay that doubles
+        with every attempt.
+        """
+        failing_job = record.enqueue(value="test")
+
+        with mock.patch.object(record, "func", side_effect=ValueError):
+            for attempt in [1, 2]:
+                Job.objects.filter(id=failing_job.id).update(run_at=timezone.now())
+                start = timezone.now()
+                run_next_job()
+
+                failing_job.refresh_from_db()
+                backoff = failing_job.run_at - start
+                self.assertEqual(failing_job.status, Job.Status.QUEUED)
+                self.assertGreaterEqual(
+                    backoff, timedelta(seconds=RETRY_BACKOFF * 2 ** (attempt - 1))
+                )
+                self.assertIn("ValueError", failing_job.last_error)
+
+    def test_out_of_attempts(self):
+        """
+        A job that failed as many times as it may be attempted should be
+        marked as failed.
+        """
+        failing_job = fail.enqueue()
+
+        run_next_job()
+        Job.objects.filter(id=failing_job.id).update(run_at=timezone.now())
+        run_next_job()
+
+        failing_job.refresh_from_db()
+        self.assertEqual(failing_job.status, Job.Status.FAILED)
+        self.assertEqual(failing_job.attempts, 2)
+        self.assertIsNotNone(failing_job.finished_on)
+
+    def test_lost_job_run_again(self):
+        """
+        A job that has been running for longer than the timeout should be
+        claimed again.
+        """
+        lost_job = record.enqueue(value="test")
+        Job.objects.filter(id=lost_job.id).update(
+            status=Job.Status.RUNNING,
+            started_on=timezone.now() - timedelta(seconds=JOB_TIMEOUT + 1),
+        )
+
+        self.assertEqual(run_next_job().id, lost_job.id)
+        self.assertEqual(calls, ["test"])
+
+    def test_running_job_not_claimed(self):
+        """
+        A job that has been running for longer than the timeout, but
+        whose worker still sends heartbeats, shouldn't be claimed again.
+        """
+        running_job = record.enqueue(value="test")
+        Job.objects.filter(id=running_job.id).update(
+            status=Job.Status.RUNNING,
+            started_on=timezone.now() - timedelta(seconds=JOB_TIMEOUT * 10),
+            heartbeat_on=timezone.now(),
+        )
+
+        self.assertIsNone(run_next_job())
+        self.assertEqual(calls, [])
+
+    def test_lost_job_out_of_attempts(self):
+        """
+        A lost job that has been attempted as many times as it may be
+        should be marked as failed instead of being run again.
+        """
+        lost_job = record.enqueue(value="test")
+        Job.objects.filter(id=lost_job.id).update(
+            status=Job.Status.RUNNING,
+            attempts=3,
+            started_on=timezone.now() - timedelta(seconds=JOB_TIMEOUT + 1),
+        )
+
+        self.assertIsNone(run_next_job())
+
+        lost_job.refresh_from_db()
+        self.assertEqual(calls, [])
+        self.assertEqual(lost_job.status, Job.Status.FAILED)
+        self.assertIn("Lost", lost_job.last_error)
+        self.assertIsNotNone(lost_job.finished_on)
+
+    def test_heartbeat(self):
+        """
+        A running job should send heartbeats at the interval until it's
+        done.
+        """
+        running_job = record.enqueue(value="test")
+
+        with mock.patch.object(Job, "beat") as beat:
+            with Heartbeat(running_job, interval=0.01):
+                time.sleep(0.1)
+            beats = beat.call_count
+
+            time.sleep(0.05)
+
+        self.assertGreater(beats, 1)
+        self.assertEqual(beat.call_count, beats)
+
+        Job.objects.filter(id=running_job.id).update(status=Job.Status.RUNNING)
+        running_job.beat()
+        running_job.refresh_from_db()
+        self.assertIsNotNone(running_job.heartbeat_on)
+
+    def test_unregistered_job(self):
+        """
+        A job that isn't registered should be queued again for a retry.
+        """
+        unknown_job = Job.objects.enqueue("test_unknown")
+
+        run_next_job()
+
+        unknown_job.refresh_from_db()
+        self.assertEqual(unknown_job.status, Job.Status.QUEUED)
+        self.assertIn("test_unknown", unknown_job.last_error)
+
+
+class PeriodicJobTests(JobTestCase):
+    """
+    Testing suite for periodic jobs.
+
+    Tests included:
+        1. Periodic jobs are enqueued once per interval
+    """
+
+    def test_enqueued_once_per_interval(self):
+        """
+        A periodic job should be enqueued when it's due, and then not
+        again until its interval has passed.
+        """
+        register_periodic_jobs()
+        schedule_periodic_jobs()
+        schedule_periodic_jobs()
+
+        self.assertEqual(Job.objects.filter(name="test_periodic").count(), 1)
+        schedule = PeriodicJob.objects.get(name="test_periodic")
+        self.assertGreater(schedule.next_run_at, timezone.now())
+
+        schedule.next_run_at = timezone.now()
+        schedule.save()
+        schedule_periodic_jobs()
+
+        self.assertEqual(Job.objects.filter(name="test_periodic").count(), 2)
+
+
+class WorkerTests(JobTestCase):
+    """
+    Testing suite for workers and the job commands.
+
+    Tests included:
+        1. Burst workers run all due jobs and report throughput
+        2. Job stats show the number of jobs per status
+        3. Burst workers stop at database errors
+    """
+
+    def test_burst_worker(self):
+        """
+        A worker in burst mode should run all due jobs, including
+        periodic ones, and report the number of jobs it ran.
+        """
+        for value in range(3):
+            record.enqueue(value=value)
+        fail.enqueue()
+        output = StringIO()
+
+        call_command("run_workers", burst=True, stdout=output)
+
+        self.assertEqual(sorted(calls, key=str), [0, 1, 2, "periodic"])
+        self.assertIn("worker-1: 4 succeeded, 1 failed", output.getvalue())
+
+    def test_job_stats(self):
+        """
+        Job stats should show the number of jobs per status and the
+        recently finished jobs, including the periodic job.
+        """
+        record.enqueue(value="test")
+        record.enqueue(delay=60, value="test")
+        Worker("test", report=lambda message: None).run(burst=True)
+        output = StringIO()
+
+        call_command("job_stats", stdout=output)
+
+        self.assertIn("queued: 1", output.getvalue())
+        self.assertIn("succeeded: 2", output.getvalue())
+        self.assertIn("2 succeeded, 0 failed", output.getvalue())
+
+    def test_burst_worker_database_error(self):
+        """
+        A worker in burst mode should stop with a database error instead
+        of waiting for the database to come back.
+        """
+        worker = Worker("test", report=lambda message: None)
+
+        with mock.patch(
+            "ludwig.jobs.worker.schedule_periodic_jobs",
+            side_effect=OperationalError("Connection refused"),
+        ):
+            with self.assertRaises(OperationalError):
+                worker.run(burst=True)
@@ -0,0 +1,202 @@
+import signal
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import timedelta
+
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .constants import HEARTBEAT_INTERVAL, POLL_INTERVAL, REPORT_INTERVAL
+from .models import Job, PeriodicJob
+from .registry import registry
+
+
+def get_periodic_jobs():
+    """Get the registered jobs that run at an interval, by name."""
+    return {name: job for name, job in registry.items() if job.every}
+
+
+def register_periodic_jobs():
+    """Add the schedule of new periodic jobs, due right away."""
+    PeriodicJob.objects.bulk_create(
+        [PeriodicJob(name=name) for name in get_periodic_jobs()],
+        ignore_conflicts=True,
+    )
+
+
+def schedule_periodic_jobs():
+    """
+    Enqueue the periodic jobs that are due and move their schedule to
+    the next run. Schedules locked by another worker are skipped, so
+    every run is only enqueued once.
+    """
+    periodic_jobs = get_periodic_jobs()
+    now = timezone.now()
+
+    with transaction.atomic():
+        due = PeriodicJob.objects.select_for_update(skip_locked=True).filter(
+            name__in=periodic_jobs, next_run_at__lte=now
+        )
+
+        for schedule in due:
+            periodic_job = periodic_jobs[schedule.name]
+            periodic_job.enqueue()
+            schedule.next_run_at = now + timedelta(seconds=periodic_job.every)
+            schedule.save(update_fields=["next_run_at"])
+
+
+class Heartbeat:
+    """
+    Send heartbeats for a running job from a background thread every
+    `interval` seconds, so that the job isn't taken for lost and claimed
+    by another worker however long it runs.
+    """
+
+    def __init__(self, job, interval=HEARTBEAT_INTERVAL):
+        self.job = job
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run, name=f"heartbeat-{job.id}", daemon=True
+        )
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    self.job.beat()
+                except DatabaseError:
+                    # try again with a new connection at the next beat
+                    connection.close()
+        finally:
+            # every thread has a connection of its own
+            connection.close()
+
+
+def run_next_job():
+    """
+    Claim and run the next job that is due. Returns the job, or None if
+    there was no job to run.
+    """
+    job = Job.objects.claim()
+
+    if job is None:
+        return None
+
+    try:
+        if job.name not in registry:
+            # the job may have been enqueued by a newer version of the
+            # code, so it's retried rather than failed right away
+            raise LookupError(f"No job is registered as {job.name!r}")
+
+        with Heartbeat(job):
+            registry[job.name](**job.kwargs)
+    except Exception:
+        job.fail(traceback.format_exc())
+    else:
+        job.succeed()
+
+    return job
+
+
+class Worker:
+    """
+    Run jobs until stopped, checking for new jobs every `poll_interval`
+    seconds while the queue is empty. Periodic jobs are enqueued by
+    whichever worker gets to them first. The number of succeeded and
+    failed jobs and the throughput are reported every `report_interval`
+    seconds through `report`.
+    """
+
+    def __init__(
+        self,
+        name,
+        poll_interval=POLL_INTERVAL,
+        report_interval=REPORT_INTERVAL,
+        report=print,
+    ):
+        self.name = name
+        self.poll_interval = poll_interval
+        self.report_interval = report_interval
+        self.report = report
+        self.stats = Counter()
+        self.stopping = False
+
+    def stop(self, *args):
+        """Stop the worker after the job it's running."""
+        self.stopping = True
+
+    def run(self, burst=False):
+        """
+        Run jobs until the worker is stopped, or until there are no jobs
+        due if `burst` is set.
+        """
+        handlers = {
+            signum: signal.signal(signum, self.stop)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        try:
+            self._run(burst)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def _run(self, burst):
+        register_periodic_jobs()
+        last_report = time.monotonic()
+
+        while not self.stopping:
+            # drop connections that have outlived their maximum age or
+            # broke, as is done at the start of every request, unless the
+            # worker runs in a transaction, as in tests
+            if not connection.in_atomic_block:
+                close_old_connections()
+
+            try:
+                schedule_periodic_jobs()
+                job = run_next_job()
+            except DatabaseError as error:
+                # keep the worker alive through a lost connection or a
+                # database restart and try again after the poll interval,
+                # while a burst ends with the error
+                if burst:
+                    raise
+                self.report(f"{self.name}: {error}")
+                time.sleep(self.poll_interval)
+                continue
+
+            if job is not None:
+                self.stats[job.status] += 1
+            elif burst:
+                break
+            else:
+                time.sleep(self.poll_interval)
+
+            if time.monotonic() - last_report >= self.report_interval:
+                self._report(time.monotonic() - last_report)
+                self.stats.clear()
+                last_report = time.monotonic()
+
+        self._report(time.monotonic() - last_report)
+
+    def _report(self, elapsed):
+        """Report the jobs run since the last report."""
+        # jobs that are retried are queued again after running
+        succeeded = self.stats[Job.Status.SUCCEEDED]
+        failed = self.stats[Job.Status.FAILED] + self.stats[Job.Status.QUEUED]
+        throughput = (succeeded + failed) / elapsed if elapsed else 0
+
+        self.report(
+            f"{self.name}: {succeeded} succeeded, {failed} failed"
+            f" in {elapsed:.0f}s ({throughput:.2f} jobs/s)"
+        )
@@ -0,0 +1,51 @@
+// seconds per unit of relative times, from the largest unit down
+const RELATIVE_TIME_UNITS = [
+    ["year", 60 * 60 * 24 * 365],
+    ["month", 60 * 60 * 24 * 30],
+    ["week", 60 * 60 * 24 * 7],
+    ["day", 60 * 60 * 24],
+    ["hour", 60 * 60],
+    ["minute", 60],
+];
+
+// relative times are shown to the minute, so refreshing them more often
+// wouldn't change anything
+const RELATIVE_TIME_REFRESH_INTERVAL = 60 * 1000;
+
+const relativeTimeFormat = new Intl.RelativeTimeFormat(
+    document.documentElement.lang || undefined,
+    { numeric: "auto" },
+);
+
+document.addEventListener("DOMContentLoaded", () => {
+    updateRelativeTimes();
+    setInterval(updateRelativeTimes, RELATIVE_TIME_REFRESH_INTERVAL);
+});
+
+// format the times in posts added by polling and posting
+document.addEventListener("htmx:load", () => {
+    updateRelativeTimes();
+});
+
+function updateRelativeTimes() {
+    const times = document.querySelectorAll("time[data-relative-time]");
+
+    for (const time of times) {
+        time.textContent = formatRelativeTime(new Date(time.dateTime));
+    }
+}
+
+function formatRelativeTime(date) {
+    const seconds = Math.round((date - Date.now()) / 1000);
+
+    for (const [unit, unitSeconds] of RELATIVE_TIME_UNITS) {
+        if (Math.abs(seconds) >= unitSeconds) {
+            return relativeTimeFormat.format(
+                Math.trunc(seconds / unitSeconds),
+                unit,
+            );
+        }
+    }
+
+    return relativeTimeFormat.format(0, "minute");
+}